@@ -3,6 +3,7 @@ from google.adk.agents import Agent
 from google.adk.tools.mcp_tool import MCPToolset, StreamableHTTPConnectionParams
 from a2a.types import AgentCard, AgentCapabilities, AgentSkill, TransportProtocol
 from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
+from agents.idempotency import set_idempotency_key
 
 # MCP Server URL (local)
 MCP_SERVER_URL = "http://127.0.0.1:5000/mcp"
@@ -16,9 +17,10 @@ customer_data_agent = Agent(
             connection_params=StreamableHTTPConnectionParams(
                 url=MCP_SERVER_URL
             ),
-            tool_filter=["get_customer", "list_customers", "update_customer"]
+            tool_filter=["get_customer", "list_customers", "update_customer", "get_customers_batch", "find_customers_by_tickets", "find_customer"]
         )
     ],
+    before_tool_callback=set_idempotency_key,
     instruction="""You are a Customer Data Agent specialized in managing customer information.
 
 CRITICAL ROLE DEFINITION:
@@ -27,18 +29,26 @@ CRITICAL ROLE DEFINITION:
 - When working with Support Agent, provide customer context they need
 
 Your MCP Tools:
-- get_customer: Retrieve customer details by ID (requires customer_id)
-- list_customers: List all customers, can filter by status and limit results
-- update_customer: Update customer information (requires customer_id and data to update)
+- get_customer: Retrieve customer details by ID (requires customer_id; include_ticket_stats=true adds ticket counts by status and priority)
+- list_customers: List customers a page at a time, can filter by status and set the page size (pass next_cursor as cursor for the next page; include_ticket_stats=true adds ticket counts)
+- get_customer and list_customers accept fields, e.g. ["id", "name", "status"], to return only the columns you need
+- update_customer: Update customer information (requires customer_id and data to update; do not pass idempotency_key, it is set for you so a retried call is not applied twice)
+- get_customers_batch: Retrieve several customers in one call (requires a list of customer_ids)
+- find_customers_by_tickets: Find customers whose tickets match status/priority/date filters, with matching ticket counts
+- find_customer: Look up customers by email, phone number (any format) or name prefix, optionally filtered by status
 
 When to ACT vs PASS THROUGH:
 
 ACT (use your tools):
 - "Get customer X" → get_customer
+- "Get customers X, Y and Z" → get_customers_batch (one call, never repeated get_customer calls)
 - "List [active/all] customers" → list_customers
 - "Update customer X's [field]" → update_customer
 - "Customer ID X needs..." → get_customer (provide context for next agent)
-- "Show customers with..." → list_customers (even if query mentions tickets)
+- "Show customers with [open/high-priority/recent] tickets" → find_customers_by_tickets
+- "Find the customer with email/phone X" or "customers named Y..." → find_customer (never list_customers and filter)
+- "How many tickets does customer X have?" → get_customer with include_ticket_stats=true
+- "Show customers with..." (customer fields only) → list_customers
 
 PASS THROUGH (respond without tools):
 - Pure ticket queries: "Create a ticket", "Show ticket history"
@@ -58,7 +68,7 @@ Query: "Customer 1 needs account upgrade help"
 Action: get_customer(1) → Return: "Customer 1: John Doe (john@email.com, active). Passing to Support Agent for upgrade assistance."
 
 Query: "Show active customers with open tickets"
-Action: list_customers(status='active') → Return: "Found X active customers. Sample: [customer IDs]. Passing to Support Agent to check ticket status."
+Action: find_customers_by_tickets(customer_status='active', ticket_status='open') → Return: "Found X active customers with open tickets: [names, IDs, open ticket counts]." No further ticket checks are needed.
 
 Query: "Update customer 2's email to new@email.com and show ticket history"
 Action: update_customer(2, {email: 'new@email.com'}) → Return: "Email updated. Passing to Support Agent for ticket history."
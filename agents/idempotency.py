@@ -0,0 +1,24 @@
+"""Idempotency keys for the MCP write tools, derived from the agent turn."""
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+# MCP tools that accept an idempotency_key
+IDEMPOTENT_TOOLS = {"create_ticket", "update_customer"}
+
+
+def set_idempotency_key(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
+    """before_tool_callback that keys a write on its turn and arguments.
+
+    A call repeated within the same invocation (for example after a timeout)
+    gets the same key and replays the stored result, while a different write
+    in that turn gets its own. Any key the model supplied is replaced.
+    """
+    if tool.name in IDEMPOTENT_TOOLS:
+        args.pop("idempotency_key", None)
+        request = json.dumps([tool_context.invocation_id, tool.name, args], sort_keys=True, separators=(",", ":"))
+        args["idempotency_key"] = hashlib.sha256(request.encode()).hexdigest()
+    return None
@@ -12,7 +12,7 @@ remote_customer_data_agent = RemoteA2aAgent(
 
 remote_support_agent = RemoteA2aAgent(
     name="support_agent",
-    description="Handles support operations: create tickets, get ticket history, provide support guidance",
+    description="Handles support operations: create tickets, get ticket history, search tickets, ticket statistics, provide support guidance",
     agent_card=f"http://localhost:10021{AGENT_CARD_WELL_KNOWN_PATH}",
 )
 
@@ -0,0 +1,307 @@
+"""Check the query plan of every SQL statement the MCP tools run.
+
+Calls each tool (every filter/cursor variant) against a generated dataset,
+capturing the statements it executes through the connection pool's statement
+hook, then runs EXPLAIN QUERY PLAN on each one. Fails if a plan does a full
+SCAN of a table, walks a whole index without a LIMIT to stop it, or builds a
+temp B-tree for ORDER BY / GROUP BY / DISTINCT, unless the case is listed in
+ALLOWED with the reason it is inherent.
+
+A SEARCH also fails when it does not use the key the statement constrains:
+a lookup by id (id = ? / id IN (...)) must go through the INTEGER PRIMARY KEY,
+and an index search must not stop at a prefix of the index when the WHERE
+clause also constrains a later index column (e.g. seeking (status=?) on
+(status, priority, created_at) while created_at is range-filtered, which
+visits every row with that status).
+
+Write tools run inside a transaction that is rolled back, so the dataset is
+left unchanged.
+
+Usage:
+    python database_setup.py --db plans.db --generate --customers 100000 --tickets 1000000
+    python benchmarks/check_query_plans.py --db plans.db [--verbose] [--json]
+
+tests/test_query_plans.py runs the same scenarios under pytest against a small
+generated dataset.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from database_setup import DatabaseSetup
+from db_pool import SlowQueryLog
+
+# Plan problems that are inherent to a tool: (tool, plan detail regex) -> reason
+ALLOWED = {
+    ("find_customer", r"USE TEMP B-TREE FOR ORDER BY"):
+        "orders the few rows found by an email or phone index seek by name",
+    ("search_tickets", r"USE TEMP B-TREE FOR ORDER BY"):
+        "bm25 rank is computed per match, so relevance order cannot come from an index",
+    ("find_customers_by_tickets", r"USE TEMP B-TREE FOR GROUP BY"):
+        "the join is driven from the ticket index, so matching tickets arrive in "
+        "(status, priority, created_at) order and are grouped per customer afterwards",
+    ("find_customers_by_tickets", r"USE TEMP B-TREE FOR ORDER BY"):
+        "orders the grouped customers (at most the result limit + 1 kept) by name",
+    ("ticket_stats", r"USE TEMP B-TREE FOR (GROUP BY|ORDER BY)"):
+        "groups the already aggregated day buckets, at most nine rows per day",
+    ("ticket_stats", r"^SCAN ticket_daily_stats$"):
+        "totals without a date range read the whole rollup, at most nine rows per day",
+}
+
+# A SEARCH detail: alias, index (None for the rowid) and its constraints
+SEARCH_DETAIL = re.compile(
+    r"^SEARCH (\w+) USING (?:(?:COVERING )?INDEX (\w+)|INTEGER PRIMARY KEY)(?: \((.*)\))?$"
+)
+
+# Statements that have no query plan worth checking
+SKIP = re.compile(r"^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA)\b", re.IGNORECASE)
+
+
+class StatementCapture(SlowQueryLog):
+    """SlowQueryLog that keeps every statement with its raw parameters."""
+
+    def __init__(self):
+        super().__init__(threshold=0.0)
+        self.statements: List[Tuple[str, Any]] = []
+
+    def record(self, sql: str, parameters: Any, seconds: float):
+        if not SKIP.match(sql) and parameters != "<executemany>":
+            self.statements.append((sql, parameters))
+
+
+def sample_ids(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Pick realistic arguments from the dataset."""
+    busiest = conn.execute(
+        "SELECT customer_id FROM customer_ticket_stats ORDER BY total_tickets DESC LIMIT 1"
+    ).fetchone()
+    ids = [row[0] for row in conn.execute("SELECT id FROM customers ORDER BY id LIMIT 20")]
+    day = conn.execute("SELECT MAX(day) FROM ticket_daily_stats").fetchone()[0]
+    return {"busiest": busiest[0] if busiest else ids[0], "ids": ids, "day": day}
+
+
+def next_cursor(tool: Callable[..., Dict[str, Any]], **arguments: Any) -> str:
+    """Return the cursor for the second page of a paginated tool."""
+    return tool(**arguments, limit=5)["next_cursor"]
+
+
+def phone_lookup(customer: int) -> Dict[str, Any]:
+    """Store a phone number with unusual separators and check find_customer resolves it.
+
+    Guards that _phone_candidates and the phone_normalized column strip the
+    same characters; a mismatch is reported as a failed call.
+    """
+    stored = mcp_server.update_customer(customer, {"phone": "555/0101_22 Ext. 7"})
+    if not stored["success"]:
+        return stored
+    found = mcp_server.find_customer(phone="(555) 0101-22 ext 7")
+    if not found["success"] or customer not in [row["id"] for row in found["customers"]]:
+        return {"success": False, "error": "phone lookup does not match the normalized column"}
+    return found
+
+
+def scenarios(sample: Dict[str, Any]) -> List[Tuple[str, Callable[[], Any]]]:
+    """(tool, call) pairs covering each tool's query variants."""
+    s = mcp_server
+    customer, ids, day = sample["busiest"], sample["ids"], sample["day"]
+    since = f"{day[:4]}-01-01" if day else "2025-01-01"
+    return [
+        ("get_customer", lambda: s.get_customer(customer)),
+        ("get_customer", lambda: s.get_customer(customer, include_ticket_stats=True)),
+        ("list_customers", lambda: s.list_customers()),
+        ("list_customers", lambda: s.list_customers(status="active", include_ticket_stats=True)),
+        ("list_customers", lambda: s.list_customers(cursor=next_cursor(s.list_customers))),
+        ("list_customers", lambda: s.list_customers(
+            status="disabled", cursor=next_cursor(s.list_customers, status="disabled"))),
+        ("list_customers", lambda: list(s.stream_list_customers(status="active", limit=500)[1] or [])),
+        ("list_customers", lambda: s.list_customers(status="active", fields=["id", "status"])),
+        ("list_customers", lambda: s.list_customers(fields=["email"], cursor=next_cursor(s.list_customers))),
+        ("get_customer_history", lambda: s.get_customer_history(customer)),
+        ("get_customer_history", lambda: s.get_customer_history(
+            customer, cursor=next_cursor(s.get_customer_history, customer_id=customer))),
+        ("get_customer_history", lambda: list(s.stream_customer_history(customer, limit=500)[1] or [])),
+        ("get_customer_history", lambda: s.get_customer_history(customer, fields=["id", "created_at"])),
+        ("get_customer_history", lambda: list(s.stream_customer_history(
+            customer, limit=500, fields=["status", "priority"])[1] or [])),
+        ("get_customers_batch", lambda: s.get_customers_batch(ids)),
+        ("find_customer", lambda: s.find_customer(email="someone@example.com")),
+        ("find_customer", lambda: s.find_customer(phone="(555) 010-2030", status="active")),
+        ("find_customer", lambda: phone_lookup(customer)),
+        ("find_customer", lambda: s.find_customer(name_prefix="jo")),
+        ("find_customer", lambda: s.find_customer(name_prefix="Mary S", status="active")),
+        ("get_customer_histories_batch", lambda: s.get_customer_histories_batch(ids)),
+        ("get_customer_histories_batch", lambda: s.get_customer_histories_batch(ids, ticket_status="open")),
+        ("find_customers_by_tickets", lambda: s.find_customers_by_tickets(ticket_status="open")),
+        ("find_customers_by_tickets", lambda: s.find_customers_by_tickets(
+            customer_status="active", ticket_status="open", priority="high")),
+        ("find_customers_by_tickets", lambda: s.find_customers_by_tickets(
+            ticket_status="resolved", created_after=since)),
+        ("search_tickets", lambda: s.search_tickets("payment")),
+        ("search_tickets", lambda: s.search_tickets("login error", match="all", status="open", priority="high")),
+        ("find_similar_resolved_tickets", lambda: s.find_similar_resolved_tickets("payment failed at checkout")),
+        ("ticket_stats", lambda: s.ticket_stats()),
+        ("ticket_stats", lambda: s.ticket_stats(start_date=since, end_date=day, group_by=["day", "status"],
+                                                priority="high")),
+        ("update_customer", lambda: s.update_customer(customer, {"phone": "+1-555-0100"})),
+        ("create_ticket", lambda: s.create_ticket(customer, "Plan check ticket", "low")),
+    ]
+
+
+def constrained(sql: str, alias: str, column: str, operators: str = r"[<>]?=|[<>]|\bIN\b|\bBETWEEN\b") -> bool:
+    """Return whether the statement's WHERE clause filters alias.column by a parameter or list.
+
+    Matches the column qualified by the plan's alias, or unqualified when the
+    alias is the table named in FROM.
+    """
+    where = re.search(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)", sql, re.IGNORECASE | re.DOTALL)
+    if not where:
+        return False
+    source = re.search(r"\bFROM\s+(\w+)", sql, re.IGNORECASE)
+    qualifier = rf"\b{alias}\." if not source or source.group(1) != alias else rf"(?:\b{alias}\.|(?<![\w.]))"
+    return re.search(rf"{qualifier}{column}\s*(?:{operators})\s*[(?]", where.group(1), re.IGNORECASE) is not None
+
+
+def search_problem(conn: sqlite3.Connection, sql: str, detail: str) -> str:
+    """Return why a SEARCH detail misses a key the statement constrains, or an empty string."""
+    match = SEARCH_DETAIL.match(detail)
+    if not match:
+        return ""
+    alias, index, constraints = match.groups()
+    if index and constrained(sql, alias, "id", r"=|\bIN\b"):
+        return "id lookup does not use the INTEGER PRIMARY KEY"
+    if not index:
+        return ""
+    used = set(re.findall(r"(\w+)(?:=|>|<|\bIN\b)", constraints or ""))
+    columns = [row[2] for row in conn.execute(f"PRAGMA index_info({index})")]
+    prefix = 0
+    while prefix < len(columns) and columns[prefix] in used:
+        prefix += 1
+    unused = [column for column in columns[prefix:] if column and constrained(sql, alias, column)]
+    if unused:
+        return f"stops at the first {prefix} column(s) of {index} but {', '.join(unused)} is also filtered"
+    return ""
+
+
+def plan_problems(conn: sqlite3.Connection, sql: str, parameters: Any) -> Tuple[List[str], List[str]]:
+    """Return (plan details, problem details) for one statement."""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+    limited = re.search(r"\bLIMIT\b", sql, re.IGNORECASE) is not None
+    problems = []
+    for detail in plan:
+        # Plans name tables by their alias; virtual tables (FTS, json_each)
+        # and constant rows are not table scans
+        if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail and detail != "SCAN CONSTANT ROW":
+            # An index walk in ORDER BY order is fine when LIMIT stops it early
+            if " INDEX " not in detail or not limited:
+                problems.append(detail)
+        elif "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+        else:
+            reason = search_problem(conn, sql, detail)
+            if reason:
+                problems.append(f"{detail}: {reason}")
+    return plan, problems
+
+
+def allowed_reason(tool: str, detail: str) -> str:
+    """Return why a problem is accepted for a tool, or an empty string."""
+    for (allowed_tool, pattern), reason in ALLOWED.items():
+        if allowed_tool == tool and re.search(pattern, detail):
+            return reason
+    return ""
+
+
+def prepare(db_path: str) -> StatementCapture:
+    """Migrate the dataset and point mcp_server at it, capturing every statement."""
+    db = DatabaseSetup(db_path)
+    db.connect()
+    db.migrate()
+    db.close()
+
+    capture = StatementCapture()
+    mcp_server.DB_PATH = db_path
+    mcp_server.configure_pool(pool_size=1, slow_query_log=capture)
+    mcp_server.configure_cache(max_entries=0)
+    return capture
+
+
+def check_scenario(explain: sqlite3.Connection, capture: StatementCapture, tool: str,
+                   call: Callable[[], Any], checked: set) -> List[Dict[str, Any]]:
+    """Run one scenario in a rolled-back transaction and check each new statement's plan.
+
+    Raises RuntimeError when the tool call itself fails.
+    """
+    capture.statements.clear()
+    with mcp_server.get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            outcome = call()
+        finally:
+            conn.rollback()
+    if isinstance(outcome, dict) and not outcome.get("success", True):
+        raise RuntimeError(f"{tool} failed: {outcome.get('error')}")
+
+    results = []
+    for sql, parameters in capture.statements:
+        if (tool, sql) in checked:
+            continue  # e.g. the similarity index catching up in chunks
+        checked.add((tool, sql))
+        plan, problems = plan_problems(explain, sql, parameters)
+        accepted = {detail: allowed_reason(tool, detail) for detail in problems}
+        results.append({
+            "tool": tool,
+            "sql": " ".join(sql.split()),
+            "plan": plan,
+            "failed": [detail for detail, reason in accepted.items() if not reason],
+            "allowed": {detail: reason for detail, reason in accepted.items() if reason},
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="generated dataset (see database_setup.py --generate)")
+    parser.add_argument("--verbose", action="store_true", help="print every statement and plan")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db} not found; create it with database_setup.py --generate")
+    capture = prepare(args.db)
+    explain = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+
+    results = []
+    checked: set = set()
+    try:
+        for tool, call in scenarios(sample_ids(explain)):
+            results.extend(check_scenario(explain, capture, tool, call, checked))
+    except RuntimeError as e:
+        sys.exit(str(e))
+    finally:
+        explain.close()
+    failures = sum(len(result["failed"]) for result in results)
+
+    if args.json:
+        print(json.dumps({"statements": results, "failures": failures}, indent=2))
+    else:
+        for result in results:
+            if result["failed"] or args.verbose:
+                print(f"[{result['tool']}] {result['sql']}")
+                for detail in result["plan"]:
+                    failed = [problem for problem in result["failed"] if problem.startswith(detail)]
+                    print(f"  FAIL {failed[0]}" if failed else f"       {detail}")
+            for detail, reason in result["allowed"].items():
+                if args.verbose:
+                    print(f"  allowed: {detail} ({reason})")
+        print(f"{len(results)} statements checked, {failures} plan problems")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Load-test the MCP server's /mcp endpoint and report latency percentiles per tool.
+
+Drives tools/call requests directly (no LLM) from concurrent clients for a
+fixed duration, with a configurable tool mix and read/write ratio, and writes
+a JSON report that can be compared against an earlier run.
+
+Usage:
+    python database_setup.py --db bench.db --generate --customers 100000 --tickets 2000000
+    python benchmarks/mcp_load_test.py --server-db bench.db --concurrency 32 --duration 30 \\
+        --output results.json [--baseline previous.json]
+
+Without --server-db the server at --url must already be running.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_READ_MIX = "get_customer=4,list_customers=2,get_customer_history=3"
+DEFAULT_WRITE_MIX = "create_ticket=3,update_customer=1"
+
+SEARCH_WORDS = ["payment", "refund", "login", "timeout", "dashboard", "slow", "error", "billing", "crash", "export"]
+
+
+class ArgumentFactory:
+    """Builds realistic arguments for each tool from the dataset's id range."""
+
+    def __init__(self, max_customer_id: int, rng: random.Random):
+        self.max_customer_id = max_customer_id
+        self.rng = rng
+
+    def customer_id(self) -> int:
+        return self.rng.randint(1, self.max_customer_id)
+
+    def build(self, tool: str) -> Dict[str, Any]:
+        rng = self.rng
+        builders: Dict[str, Callable[[], Dict[str, Any]]] = {
+            "get_customer": lambda: {"customer_id": self.customer_id()},
+            "list_customers": lambda: {"status": rng.choice(["active", "disabled"]), "limit": 50},
+            "get_customer_history": lambda: {"customer_id": self.customer_id(), "limit": 50},
+            "update_customer": lambda: {
+                "customer_id": self.customer_id(),
+                "data": {"phone": f"+1-555-{rng.randint(1000000, 9999999)}"},
+            },
+            "create_ticket": lambda: {
+                "customer_id": self.customer_id(),
+                "issue": f"Load test: {rng.choice(SEARCH_WORDS)} {rng.choice(SEARCH_WORDS)} issue",
+                "priority": rng.choice(["low", "medium", "high"]),
+            },
+            "get_customers_batch": lambda: {"customer_ids": [self.customer_id() for _ in range(20)]},
+            "get_customer_histories_batch": lambda: {
+                "customer_ids": [self.customer_id() for _ in range(10)], "ticket_status": "open",
+            },
+            "find_customers_by_tickets": lambda: {
+                "customer_status": "active", "ticket_status": "open", "priority": "high", "limit": 50,
+            },
+            "search_tickets": lambda: {"query": rng.choice(SEARCH_WORDS), "limit": 20},
+            "find_similar_resolved_tickets": lambda: {
+                "issue": f"{rng.choice(SEARCH_WORDS)} {rng.choice(SEARCH_WORDS)} problem",
+            },
+            "ticket_stats": lambda: {"group_by": ["status", "priority"]},
+        }
+        if tool not in builders:
+            raise SystemExit(f"No argument builder for tool: {tool}")
+        return builders[tool]()
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse 'tool=weight,...' into a dict."""
+    try:
+        mix = {name.strip(): float(weight) for name, weight in (item.split("=") for item in value.split(","))}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected tool=weight pairs, got {value!r}")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def response_ok(body: str) -> bool:
+    """Return True if the final SSE event is a successful tool result."""
+    events = [line[6:] for line in body.splitlines() if line.startswith("data: ")]
+    if not events:
+        return False
+    message = json.loads(events[-1])
+    if "error" in message:
+        return False
+    result = message.get("result", {})
+    if result.get("isError"):
+        return False
+    text = result.get("content", [{}])[0].get("text", "")
+    return '"success":false' not in text.replace(" ", "")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles (ms) for one tool or the whole run."""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / seconds, 1) if seconds else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+async def run_load(args) -> Dict[str, Any]:
+    """Run the clients and collect per-tool latencies."""
+    rng = random.Random(args.seed)
+    factory = ArgumentFactory(args.max_customer_id, rng)
+    read_tools, read_weights = list(args.read_mix), list(args.read_mix.values())
+    write_tools, write_weights = list(args.write_mix), list(args.write_mix.values())
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    request_id = 0
+
+    def pick() -> Tuple[str, Dict[str, Any]]:
+        if write_tools and rng.random() < args.write_ratio:
+            tool = rng.choices(write_tools, write_weights)[0]
+        else:
+            tool = rng.choices(read_tools, read_weights)[0]
+        return tool, factory.build(tool)
+
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+
+    async def client(session: aiohttp.ClientSession):
+        nonlocal request_id
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            tool, arguments = pick()
+            request_id += 1
+            payload = {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "tools/call",
+                "params": {"name": tool, "arguments": arguments},
+            }
+            sent = time.perf_counter()
+            try:
+                async with session.post(args.url, json=payload) as response:
+                    body = await response.text()
+                ok = response.status == 200 and response_ok(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                ok = False
+            elapsed = time.perf_counter() - sent
+            if sent >= measure_from:
+                latencies.setdefault(tool, []).append(elapsed)
+                if not ok:
+                    errors[tool] = errors.get(tool, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*(client(session) for _ in range(args.concurrency)))
+
+    seconds = args.duration
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "overall": summarize(all_latencies, sum(errors.values()), seconds),
+        "tools": {tool: summarize(values, errors.get(tool, 0), seconds)
+                  for tool, values in sorted(latencies.items())},
+    }
+
+
+def max_customer_id(db_path: str) -> int:
+    """Read the customer id range from the dataset."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT COALESCE(MAX(id), 1) FROM customers").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def git_revision() -> Optional[str]:
+    """Return the current commit, to label the report."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(args) -> subprocess.Popen:
+    """Start mcp_server.py on the --url port against --server-db and wait for /health."""
+    url = urlparse(args.url)
+    command = [sys.executable, os.path.join(ROOT, "mcp_server.py"), "--db", args.server_db,
+               "--host", url.hostname, "--port", str(url.port or 80)]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    if args.backend:
+        command += ["--backend", args.backend]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    async def wait_healthy():
+        health = f"{url.scheme}://{url.netloc}/health"
+        async with aiohttp.ClientSession() as session:
+            for _ in range(300):
+                if process.poll() is not None:
+                    raise SystemExit("Server exited during startup")
+                try:
+                    async with session.get(health) as response:
+                        if response.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise SystemExit("Server did not become healthy in 30s")
+
+    asyncio.run(wait_healthy())
+    return process
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Return regressions in p95 latency or throughput beyond max_regression."""
+    problems = []
+    for tool, current in report["results"]["tools"].items():
+        previous = baseline["results"]["tools"].get(tool)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            problems.append(f"{tool}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - max_regression):
+            problems.append(f"{tool}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return problems
+
+
+def print_table(results: Dict[str, Any]):
+    """Print the per-tool summary."""
+    print(f"{'tool':<30} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(results["tools"].items()) + [("overall", results["overall"])]
+    for tool, row in rows:
+        print(f"{tool:<30} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>9} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000/mcp", help="MCP endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds first")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="fraction of calls that are writes")
+    parser.add_argument("--read-mix", type=parse_mix, default=parse_mix(DEFAULT_READ_MIX))
+    parser.add_argument("--write-mix", type=parse_mix, default=parse_mix(DEFAULT_WRITE_MIX))
+    parser.add_argument("--db", help="dataset to read the customer id range from")
+    parser.add_argument("--max-customer-id", type=int, default=15, help="used when --db is not given")
+    parser.add_argument("--server-db", help="start mcp_server.py on this database for the run")
+    parser.add_argument("--workers", type=int, help="server worker processes (with --server-db)")
+    parser.add_argument("--backend", choices=["asgi", "flask"], help="server backend (with --server-db)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed p95/throughput regression vs --baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.db or args.server_db:
+        args.max_customer_id = max_customer_id(args.db or args.server_db)
+
+    server = start_server(args) if args.server_db else None
+    try:
+        results = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "config": {
+            "url": args.url,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "write_ratio": args.write_ratio,
+            "read_mix": args.read_mix,
+            "write_mix": args.write_mix,
+            "max_customer_id": args.max_customer_id,
+            "workers": args.workers,
+            "backend": args.backend,
+        },
+        "results": results,
+    }
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
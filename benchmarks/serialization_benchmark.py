@@ -0,0 +1,97 @@
+"""Compare payload size and encode time of the MCP tool result formats.
+
+Usage:
+    python benchmarks/serialization_benchmark.py [--rows 200] [--repeat 200] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+
+
+def sample_result(rows: int):
+    """Build a list_customers-shaped result with the given number of rows."""
+    customers = [
+        {
+            "id": i,
+            "name": f"Customer {i:06d}",
+            "email": f"customer{i}@example.com",
+            "phone": f"+1-555-{i % 10000:04d}",
+            "status": "active" if i % 5 else "disabled",
+            "created_at": "2025-12-02 08:11:29",
+            "updated_at": "2025-12-02 08:11:29",
+        }
+        for i in range(1, rows + 1)
+    ]
+    return {"success": True, "count": rows, "customers": customers, "has_more": False, "next_cursor": None}
+
+
+def envelope(text: str) -> str:
+    """Wrap result text the way tools/call does, to measure bytes on the wire."""
+    return serialization.dumps({
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {"content": [{"type": "text", "text": text}]},
+    })
+
+
+def measure(encode, result, repeat: int):
+    """Return (best encode time in microseconds, result bytes, SSE payload bytes)."""
+    text = encode(result)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(result)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6, len(text.encode()), len(envelope(text).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200, help="rows in the sample result")
+    parser.add_argument("--repeat", type=int, default=200, help="timed iterations per mode")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    result = sample_result(args.rows)
+    modes = {
+        "pretty (legacy)": lambda r: serialization.encode_result(r, "pretty"),
+        "json (stdlib)": lambda r: json.dumps(r, separators=(',', ':'), ensure_ascii=False),
+        "columnar (stdlib)": lambda r: json.dumps(
+            serialization.to_columnar(r), separators=(',', ':'), ensure_ascii=False
+        ),
+    }
+    if serialization.orjson is not None:
+        modes["json (orjson)"] = lambda r: serialization.orjson.dumps(r).decode()
+        modes["columnar (orjson)"] = lambda r: serialization.orjson.dumps(serialization.to_columnar(r)).decode()
+
+    report = []
+    for name, encode in modes.items():
+        micros, result_bytes, wire_bytes = measure(encode, result, args.repeat)
+        report.append({
+            "mode": name,
+            "encode_us": round(micros, 1),
+            "result_bytes": result_bytes,
+            "wire_bytes": wire_bytes,
+        })
+
+    if args.json:
+        print(json.dumps({"rows": args.rows, "encoder": serialization.encoder_name(), "results": report}, indent=2))
+        return
+
+    baseline = report[0]
+    print(f"{args.rows} rows, active encoder: {serialization.encoder_name()}")
+    print(f"{'mode':<20} {'encode us':>10} {'result B':>10} {'wire B':>10} {'size vs legacy':>15}")
+    for row in report:
+        ratio = row["result_bytes"] / baseline["result_bytes"]
+        print(f"{row['mode']:<20} {row['encode_us']:>10} {row['result_bytes']:>10} "
+              f"{row['wire_bytes']:>10} {ratio:>14.0%}")
+
+
+if __name__ == "__main__":
+    main()
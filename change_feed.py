@@ -0,0 +1,124 @@
+"""Change-data-capture feed over the change_log table.
+
+Triggers on customers and tickets append every change to change_log (see
+DatabaseSetup.create_change_log), numbered by an AUTOINCREMENT sequence that
+follows commit order. ChangeFeed reads the log forward from a sequence number,
+which is a primary-key range scan, and formats entries as SSE events whose id
+is the sequence number, so a client that reconnects with Last-Event-ID
+resumes exactly where it stopped.
+"""
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Tables whose changes are captured
+CHANGE_TABLES = ("customers", "tickets")
+
+
+class ChangeFeed:
+    """Reads change_log entries after a sequence number."""
+
+    def __init__(self, connection, batch_size: int = 500):
+        """Set up a reader.
+
+        Args:
+            connection: Zero-argument callable returning a connection context
+                manager (e.g. mcp_server.get_db_connection)
+            batch_size: Maximum entries returned by one read()
+        """
+        self._connection = connection
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._subscribers = 0
+        self._delivered = 0
+
+    def bounds(self) -> Tuple[int, int]:
+        """Return (oldest retained seq, latest seq); (0, 0) for an empty log."""
+        with self._connection() as conn:
+            # Separate subqueries: MIN and MAX together are not answered from
+            # the ends of the primary key and would scan the log
+            oldest, latest = conn.execute(
+                "SELECT (SELECT MIN(seq) FROM change_log), (SELECT MAX(seq) FROM change_log)"
+            ).fetchone()
+        return oldest or 0, latest or 0
+
+    def read(self, after: int, tables: Optional[Iterable[str]] = None) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """Return (changes, new position, gap) for entries after a sequence number.
+
+        The position advances past entries filtered out by tables, so a
+        filtered reader does not scan them again. gap is True when entries
+        after `after` were already trimmed from the log, including a reader
+        starting from 0 after the log's first entries are gone; the reader has
+        missed changes and should resynchronize before applying the ones
+        returned. Sequence numbers are contiguous (AUTOINCREMENT, and only the
+        oldest entries are ever deleted), so a first entry past after + 1
+        means the ones before it were trimmed.
+        """
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, table_name, row_id, operation, customer_id, data, changed_at "
+                "FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after, self.batch_size),
+            ).fetchall()
+        if not rows:
+            return [], after, False
+
+        gap = rows[0][0] > after + 1
+        wanted = set(tables) if tables else None
+        changes = [
+            {
+                "seq": seq,
+                "table": table_name,
+                "id": row_id,
+                "operation": operation,
+                "customer_id": customer_id,
+                "data": json.loads(data) if data is not None else None,
+                "changed_at": changed_at,
+            }
+            for seq, table_name, row_id, operation, customer_id, data, changed_at in rows
+            if wanted is None or table_name in wanted
+        ]
+        with self._lock:
+            self._delivered += len(changes)
+        return changes, rows[-1][0], gap
+
+    def subscribed(self, delta: int):
+        """Count a subscriber joining (1) or leaving (-1)."""
+        with self._lock:
+            self._subscribers += delta
+
+    def stats(self) -> Dict[str, Any]:
+        """Return log bounds and subscriber counters."""
+        oldest, latest = self.bounds()
+        with self._lock:
+            return {
+                "oldest_seq": oldest,
+                "latest_seq": latest,
+                "subscribers": self._subscribers,
+                "delivered": self._delivered,
+            }
+
+
+def change_event(change: Dict[str, Any]) -> str:
+    """Format a change as an SSE event whose id is its sequence number."""
+    return f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change, separators=(',', ':'))}\n\n"
+
+
+def reset_event(after: int) -> str:
+    """Format the event sent when changes after `after` were trimmed from the log.
+
+    The subscriber has missed changes and should resynchronize (e.g. drop its
+    cache); the changes that follow continue from the oldest retained entry.
+    """
+    return f"event: reset\ndata: {json.dumps({'after': after})}\n\n"
+
+
+def parse_tables(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated table filter; None or empty means all tables."""
+    if not value:
+        return None
+    tables = [table.strip() for table in value.split(",") if table.strip()]
+    unknown = [table for table in tables if table not in CHANGE_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(unknown)} (expected {', '.join(CHANGE_TABLES)})")
+    return tables
@@ -1,6 +1,80 @@
+import argparse
+import json
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Latest schema version; see DatabaseSetup.migrate()
+SCHEMA_VERSION = 12
+
+# Most recent change_log entries kept; older ones are trimmed every 1000 changes
+CHANGE_LOG_RETAIN = 100000
+
+# Seconds a write result is kept under its idempotency key; older keys are
+# deleted as new ones are stored
+IDEMPOTENCY_TTL = 24 * 60 * 60
+
+# Characters stripped from phone numbers before they are compared; shared by
+# the phone_normalized column and find_customer's lookup so both agree
+PHONE_SEPARATORS = "+-(). /_"
+
+# customers.phone_normalized: the phone number lowercased with PHONE_SEPARATORS
+# stripped, e.g. "+1 (555) 010-2030" -> "15550102030", "555/0101 Ext. 7" -> "5550101ext7"
+PHONE_NORMALIZED_SQL = "phone"
+for _separator in PHONE_SEPARATORS:
+    PHONE_NORMALIZED_SQL = f"replace({PHONE_NORMALIZED_SQL}, '{_separator}', '')"
+PHONE_NORMALIZED_SQL = f"lower({PHONE_NORMALIZED_SQL})"
+
+# Pragmas for generate_dataset(): no rollback journal or fsync, a large page
+# cache, and no per-row foreign key lookups (generated ids are valid)
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "foreign_keys": "OFF",
+    "cache_size": -262144,      # 256 MB
+    "temp_store": "MEMORY",
+}
+
+# Default ticket mixes for generated datasets
+DEFAULT_STATUS_MIX = {"open": 0.15, "in_progress": 0.10, "resolved": 0.75}
+DEFAULT_PRIORITY_MIX = {"low": 0.35, "medium": 0.45, "high": 0.20}
+
+# Vocabulary for generated customers and tickets
+SYNTHETIC_FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Karen",
+    "Wei", "Aisha", "Raj", "Yuki", "Olga", "Mateo", "Fatima", "Liam", "Chloe", "Noah",
+]
+SYNTHETIC_LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Chen", "Kumar", "Nguyen", "Ivanova", "Okafor",
+]
+SYNTHETIC_EMAIL_DOMAINS = ["example.com", "mail.com", "company.org", "business.net", "startup.io", "corp.com"]
+SYNTHETIC_AREAS = [
+    "dashboard", "billing page", "mobile app", "API", "checkout", "login page", "reports",
+    "settings page", "CSV export", "email notifications", "search", "invoice PDF",
+]
+SYNTHETIC_ISSUES = [
+    "Cannot access the {area}",
+    "{area} loading very slowly",
+    "Error 500 when opening the {area}",
+    "Payment processing failing on the {area}",
+    "Charged twice, refund requested via {area}",
+    "Password reset link broken on the {area}",
+    "Feature request: dark mode for the {area}",
+    "Data missing from the {area}",
+    "Timeout errors in the {area}",
+    "Question about pricing shown on the {area}",
+    "Security concern about the {area}",
+    "{area} crashes on startup",
+    "Wrong totals shown in the {area}",
+    "Request access to beta features in the {area}",
+]
 
 
 class DatabaseSetup:
@@ -27,7 +101,7 @@ class DatabaseSetup:
         """Create customers and tickets tables."""
 
         # Create customers table
-        self.cursor.execute("""
+        self.cursor.execute(f"""
             CREATE TABLE IF NOT EXISTS customers (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -35,7 +109,8 @@ class DatabaseSetup:
                 phone TEXT,
                 status TEXT NOT NULL DEFAULT 'active' CHECK(status IN ('active', 'disabled')),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                phone_normalized TEXT GENERATED ALWAYS AS ({PHONE_NORMALIZED_SQL}) VIRTUAL
             )
         """)
 
@@ -52,38 +127,671 @@ class DatabaseSetup:
             )
         """)
 
-        # Create indexes for better query performance
+        self.create_indexes()
+        self.create_customer_ticket_stats_table()
+        self.create_ticket_daily_stats_table()
+        self.create_ticket_search_index()
+        self.create_cache_invalidations_table()
+        self.create_change_log()
+        self.create_idempotency_keys_table()
+
+        self.conn.commit()
+        print("Tables created successfully!")
+
+    def create_indexes(self):
+        """Create indexes for better query performance."""
+
         self.cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email)
         """)
 
+        # Name ordering for keyset pages; the implicit rowid suffix makes
+        # (name, id) the index order
         self.cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_tickets_customer_id ON tickets(customer_id)
+            CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name)
         """)
 
+        # Customer status filter plus name ordering (list_customers, set queries)
         self.cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status)
+            CREATE INDEX IF NOT EXISTS idx_customers_status_name ON customers(status, name)
         """)
 
-        self.conn.commit()
-        print("Tables created successfully!")
+        # find_customer: normalized phone lookups and case-insensitive name
+        # prefixes (a range scan over the NOCASE order)
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_customers_phone_normalized ON customers(phone_normalized)
+        """)
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_customers_name_nocase ON customers(name COLLATE NOCASE)
+        """)
+
+        # Per-customer ticket history in (created_at, id) order. Also serves
+        # plain customer_id lookups, replacing idx_tickets_customer_id.
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tickets_customer_created ON tickets(customer_id, created_at)
+        """)
+
+        # Covers ticket status/priority/date-range filters and yields the
+        # customer_id for the join without touching the tickets table.
+        # Supersedes the former single-column idx_tickets_status.
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tickets_status_priority_created
+            ON tickets(status, priority, created_at, customer_id)
+        """)
+
+    def create_customer_ticket_stats_table(self):
+        """Create the per-customer ticket counters maintained by create_triggers()."""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS customer_ticket_stats (
+                customer_id INTEGER PRIMARY KEY,
+                total_tickets INTEGER NOT NULL DEFAULT 0,
+                open_tickets INTEGER NOT NULL DEFAULT 0,
+                in_progress_tickets INTEGER NOT NULL DEFAULT 0,
+                resolved_tickets INTEGER NOT NULL DEFAULT 0,
+                low_priority_tickets INTEGER NOT NULL DEFAULT 0,
+                medium_priority_tickets INTEGER NOT NULL DEFAULT 0,
+                high_priority_tickets INTEGER NOT NULL DEFAULT 0,
+                last_ticket_at DATETIME,
+                FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
+            )
+        """)
+
+    def create_ticket_daily_stats_table(self):
+        """Create the daily ticket rollup maintained by create_triggers().
+
+        One row per (day, status, priority) bucket; a date range is answered
+        by summing at most 9 rows per day, read in primary-key order.
+        """
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ticket_daily_stats (
+                day TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                ticket_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, status, priority)
+            ) WITHOUT ROWID
+        """)
+
+    def create_ticket_search_index(self):
+        """Create the FTS5 index over ticket issues and the triggers that maintain it.
+
+        tickets_fts is an external-content table: it stores only the index and
+        reads issue text back from tickets by rowid, so ticket text is not
+        stored twice.
+        """
+        self.cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+                issue,
+                content='tickets',
+                content_rowid='id',
+                tokenize='porter unicode61'
+            )
+        """)
+
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_insert
+            AFTER INSERT ON tickets
+            BEGIN
+                INSERT INTO tickets_fts(rowid, issue) VALUES (NEW.id, NEW.issue);
+            END
+        """)
+
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_delete
+            AFTER DELETE ON tickets
+            BEGIN
+                INSERT INTO tickets_fts(tickets_fts, rowid, issue) VALUES ('delete', OLD.id, OLD.issue);
+            END
+        """)
+
+        # Only issue changes touch the index; status/priority updates do not
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_update
+            AFTER UPDATE OF issue ON tickets
+            BEGIN
+                INSERT INTO tickets_fts(tickets_fts, rowid, issue) VALUES ('delete', OLD.id, OLD.issue);
+                INSERT INTO tickets_fts(rowid, issue) VALUES (NEW.id, NEW.issue);
+            END
+        """)
+
+    def create_cache_invalidations_table(self):
+        """Create the log MCP server processes use to invalidate each other's caches."""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cache_invalidations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin INTEGER NOT NULL,
+                tags TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def create_idempotency_keys_table(self):
+        """Create the table of write results stored under client idempotency keys."""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                request_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys(created_at)
+        """)
+
+        # Each insert deletes the keys that expired since the previous one: a
+        # short range of idx_idempotency_keys_created, usually empty
+        self.cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS idempotency_keys_expire
+            AFTER INSERT ON idempotency_keys
+            BEGIN
+                DELETE FROM idempotency_keys WHERE created_at <= datetime('now', '-{IDEMPOTENCY_TTL} seconds');
+            END
+        """)
+
+    def create_change_log(self):
+        """Create the change-data-capture log and the triggers that fill it.
+
+        Every insert, update and delete on customers and tickets appends one
+        row in the same transaction, so change_log.seq (AUTOINCREMENT, never
+        reused) orders changes exactly as they were committed. data holds the
+        row after the change as JSON (NULL for deletes). The log keeps the
+        last CHANGE_LOG_RETAIN entries.
+        """
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                operation TEXT NOT NULL CHECK(operation IN ('insert', 'update', 'delete')),
+                customer_id INTEGER,
+                data TEXT,
+                changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Trimming every 1000th entry keeps the cost at about one delete per change
+        self.cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS change_log_trim
+            AFTER INSERT ON change_log
+            WHEN NEW.seq % 1000 = 0
+            BEGIN
+                DELETE FROM change_log WHERE seq <= NEW.seq - {CHANGE_LOG_RETAIN};
+            END
+        """)
+
+        # phone_normalized is derived, so it is left out of the captured row
+        customer_row = ("json_object('id', NEW.id, 'name', NEW.name, 'email', NEW.email, 'phone', NEW.phone, "
+                        "'status', NEW.status, 'created_at', NEW.created_at, 'updated_at', NEW.updated_at)")
+        ticket_row = ("json_object('id', NEW.id, 'customer_id', NEW.customer_id, 'issue', NEW.issue, "
+                      "'status', NEW.status, 'priority', NEW.priority, 'created_at', NEW.created_at)")
+        captured = {
+            "customers": ("NEW.id", customer_row, "OLD.id"),
+            "tickets": ("NEW.customer_id", ticket_row, "OLD.customer_id"),
+        }
+        for table, (customer_id, row, old_customer_id) in captured.items():
+            for operation in ("insert", "update"):
+                self.cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS change_log_{table}_{operation}
+                    AFTER {operation.upper()} ON {table}
+                    BEGIN
+                        INSERT INTO change_log (table_name, row_id, operation, customer_id, data)
+                        VALUES ('{table}', NEW.id, '{operation}', {customer_id}, {row});
+                    END
+                """)
+            self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS change_log_{table}_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, operation, customer_id)
+                    VALUES ('{table}', OLD.id, 'delete', {old_customer_id});
+                END
+            """)
 
     def create_triggers(self):
-        """Create triggers for automatic timestamp updates."""
+        """Create triggers that keep derived data in sync.
 
-        # Trigger to update updated_at on customers table
+        customers.updated_at is not trigger-maintained: writers set it in the
+        same UPDATE statement, which avoids a second write per update.
+        """
+
+        # customer_ticket_stats: add the new ticket to its customer's counters
         self.cursor.execute("""
-            CREATE TRIGGER IF NOT EXISTS update_customer_timestamp
-            AFTER UPDATE ON customers
-            FOR EACH ROW
+            CREATE TRIGGER IF NOT EXISTS customer_ticket_stats_insert
+            AFTER INSERT ON tickets
             BEGIN
-                UPDATE customers SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+                INSERT INTO customer_ticket_stats (
+                    customer_id, total_tickets, open_tickets, in_progress_tickets, resolved_tickets,
+                    low_priority_tickets, medium_priority_tickets, high_priority_tickets, last_ticket_at
+                ) VALUES (
+                    NEW.customer_id, 1,
+                    NEW.status = 'open', NEW.status = 'in_progress', NEW.status = 'resolved',
+                    NEW.priority = 'low', NEW.priority = 'medium', NEW.priority = 'high',
+                    NEW.created_at
+                )
+                ON CONFLICT (customer_id) DO UPDATE SET
+                    total_tickets = total_tickets + 1,
+                    open_tickets = open_tickets + excluded.open_tickets,
+                    in_progress_tickets = in_progress_tickets + excluded.in_progress_tickets,
+                    resolved_tickets = resolved_tickets + excluded.resolved_tickets,
+                    low_priority_tickets = low_priority_tickets + excluded.low_priority_tickets,
+                    medium_priority_tickets = medium_priority_tickets + excluded.medium_priority_tickets,
+                    high_priority_tickets = high_priority_tickets + excluded.high_priority_tickets,
+                    last_ticket_at = CASE
+                        WHEN last_ticket_at IS NULL OR excluded.last_ticket_at > last_ticket_at
+                        THEN excluded.last_ticket_at ELSE last_ticket_at END;
+            END
+        """)
+
+        # Remove the ticket from its customer's counters; last_ticket_at is
+        # re-read through idx_tickets_customer_created
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS customer_ticket_stats_delete
+            AFTER DELETE ON tickets
+            BEGIN
+                UPDATE customer_ticket_stats SET
+                    total_tickets = total_tickets - 1,
+                    open_tickets = open_tickets - (OLD.status = 'open'),
+                    in_progress_tickets = in_progress_tickets - (OLD.status = 'in_progress'),
+                    resolved_tickets = resolved_tickets - (OLD.status = 'resolved'),
+                    low_priority_tickets = low_priority_tickets - (OLD.priority = 'low'),
+                    medium_priority_tickets = medium_priority_tickets - (OLD.priority = 'medium'),
+                    high_priority_tickets = high_priority_tickets - (OLD.priority = 'high'),
+                    last_ticket_at = (SELECT MAX(created_at) FROM tickets WHERE customer_id = OLD.customer_id)
+                WHERE customer_id = OLD.customer_id;
+            END
+        """)
+
+        # A status/priority change (or a move to another customer) is the
+        # old ticket leaving the counters and the new one entering them
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS customer_ticket_stats_update
+            AFTER UPDATE OF customer_id, status, priority, created_at ON tickets
+            BEGIN
+                UPDATE customer_ticket_stats SET
+                    total_tickets = total_tickets - 1,
+                    open_tickets = open_tickets - (OLD.status = 'open'),
+                    in_progress_tickets = in_progress_tickets - (OLD.status = 'in_progress'),
+                    resolved_tickets = resolved_tickets - (OLD.status = 'resolved'),
+                    low_priority_tickets = low_priority_tickets - (OLD.priority = 'low'),
+                    medium_priority_tickets = medium_priority_tickets - (OLD.priority = 'medium'),
+                    high_priority_tickets = high_priority_tickets - (OLD.priority = 'high')
+                WHERE customer_id = OLD.customer_id;
+
+                INSERT INTO customer_ticket_stats (
+                    customer_id, total_tickets, open_tickets, in_progress_tickets, resolved_tickets,
+                    low_priority_tickets, medium_priority_tickets, high_priority_tickets
+                ) VALUES (
+                    NEW.customer_id, 1,
+                    NEW.status = 'open', NEW.status = 'in_progress', NEW.status = 'resolved',
+                    NEW.priority = 'low', NEW.priority = 'medium', NEW.priority = 'high'
+                )
+                ON CONFLICT (customer_id) DO UPDATE SET
+                    total_tickets = total_tickets + 1,
+                    open_tickets = open_tickets + excluded.open_tickets,
+                    in_progress_tickets = in_progress_tickets + excluded.in_progress_tickets,
+                    resolved_tickets = resolved_tickets + excluded.resolved_tickets,
+                    low_priority_tickets = low_priority_tickets + excluded.low_priority_tickets,
+                    medium_priority_tickets = medium_priority_tickets + excluded.medium_priority_tickets,
+                    high_priority_tickets = high_priority_tickets + excluded.high_priority_tickets;
+
+                UPDATE customer_ticket_stats
+                SET last_ticket_at = (SELECT MAX(created_at) FROM tickets WHERE customer_id = customer_ticket_stats.customer_id)
+                WHERE customer_id IN (OLD.customer_id, NEW.customer_id);
+            END
+        """)
+
+        # ticket_daily_stats: count each ticket in the bucket of its creation
+        # day, status and priority
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS ticket_daily_stats_insert
+            AFTER INSERT ON tickets
+            BEGIN
+                INSERT INTO ticket_daily_stats (day, status, priority, ticket_count)
+                VALUES (date(NEW.created_at), NEW.status, NEW.priority, 1)
+                ON CONFLICT (day, status, priority) DO UPDATE SET ticket_count = ticket_count + 1;
+            END
+        """)
+
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS ticket_daily_stats_delete
+            AFTER DELETE ON tickets
+            BEGIN
+                UPDATE ticket_daily_stats SET ticket_count = ticket_count - 1
+                WHERE day = date(OLD.created_at) AND status = OLD.status AND priority = OLD.priority;
+            END
+        """)
+
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS ticket_daily_stats_update
+            AFTER UPDATE OF status, priority, created_at ON tickets
+            BEGIN
+                UPDATE ticket_daily_stats SET ticket_count = ticket_count - 1
+                WHERE day = date(OLD.created_at) AND status = OLD.status AND priority = OLD.priority;
+
+                INSERT INTO ticket_daily_stats (day, status, priority, ticket_count)
+                VALUES (date(NEW.created_at), NEW.status, NEW.priority, 1)
+                ON CONFLICT (day, status, priority) DO UPDATE SET ticket_count = ticket_count + 1;
             END
         """)
 
         self.conn.commit()
         print("Triggers created successfully!")
 
+    def migrate(self):
+        """Bring the database schema up to SCHEMA_VERSION.
+
+        A database without tables gets the current schema directly. Existing
+        databases run each pending migration step in order; the applied
+        version is tracked in PRAGMA user_version.
+        """
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers'"
+        )
+        if not self.cursor.fetchone():
+            self.create_tables()
+            self.create_triggers()
+
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        migrations = {
+            1: self._migrate_composite_indexes,
+            2: self._migrate_keyset_indexes,
+            3: self._migrate_customer_timestamp_trigger,
+            4: self.create_cache_invalidations_table,
+            5: self._migrate_ticket_search,
+            6: self._migrate_customer_ticket_stats,
+            7: self._migrate_ticket_daily_stats,
+            8: self._migrate_customer_lookup,
+            9: self.create_change_log,
+            10: self.create_idempotency_keys_table,
+            11: self._migrate_phone_separators,
+            12: self.create_idempotency_keys_table,
+        }
+
+        for target in sorted(migrations):
+            if version < target:
+                migrations[target]()
+                self.cursor.execute(f"PRAGMA user_version = {target}")
+                self.conn.commit()
+                print(f"Migrated schema to version {target}")
+
+    def _migrate_composite_indexes(self):
+        """v1: composite indexes for set queries over customers and tickets."""
+        self.create_indexes()
+        self.cursor.execute("DROP INDEX IF EXISTS idx_tickets_status")
+
+    def _migrate_keyset_indexes(self):
+        """v2: indexes that make keyset pagination a single range scan."""
+        self.create_indexes()
+        self.cursor.execute("DROP INDEX IF EXISTS idx_tickets_customer_id")
+
+    def _migrate_customer_timestamp_trigger(self):
+        """v3: drop the trigger that re-updated updated_at after every update."""
+        self.cursor.execute("DROP TRIGGER IF EXISTS update_customer_timestamp")
+
+    def _migrate_ticket_search(self):
+        """v5: full-text index over ticket issues, backfilled from existing tickets."""
+        self.create_ticket_search_index()
+        self.cursor.execute("INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')")
+
+    def _migrate_customer_ticket_stats(self):
+        """v6: per-customer ticket counters, filled from existing tickets."""
+        self.create_customer_ticket_stats_table()
+        self.create_triggers()
+        self.rebuild_customer_ticket_stats()
+
+    def _migrate_ticket_daily_stats(self):
+        """v7: daily ticket rollup by status and priority, filled from existing tickets."""
+        self.create_ticket_daily_stats_table()
+        self.create_triggers()
+        self.rebuild_ticket_daily_stats()
+
+    def _migrate_customer_lookup(self):
+        """v8: normalized phone column and the indexes behind find_customer."""
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_xinfo(customers)").fetchall()]
+        if "phone_normalized" not in columns:
+            self.cursor.execute(
+                f"ALTER TABLE customers ADD COLUMN phone_normalized TEXT "
+                f"GENERATED ALWAYS AS ({PHONE_NORMALIZED_SQL}) VIRTUAL"
+            )
+        self.create_indexes()
+
+    def _migrate_phone_separators(self):
+        """v11: rebuild phone_normalized so it strips exactly PHONE_SEPARATORS."""
+        table_sql = self.cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'customers'"
+        ).fetchone()[0]
+        if PHONE_NORMALIZED_SQL not in table_sql:
+            self.cursor.execute("DROP INDEX IF EXISTS idx_customers_phone_normalized")
+            self.cursor.execute("ALTER TABLE customers DROP COLUMN phone_normalized")
+            self.cursor.execute(
+                f"ALTER TABLE customers ADD COLUMN phone_normalized TEXT "
+                f"GENERATED ALWAYS AS ({PHONE_NORMALIZED_SQL}) VIRTUAL"
+            )
+        self.create_indexes()
+
+    def rebuild_ticket_daily_stats(self):
+        """Recompute ticket_daily_stats from the tickets table."""
+        self.cursor.execute("DELETE FROM ticket_daily_stats")
+        self.cursor.execute("""
+            INSERT INTO ticket_daily_stats (day, status, priority, ticket_count)
+            SELECT date(created_at), status, priority, COUNT(*)
+            FROM tickets
+            GROUP BY date(created_at), status, priority
+        """)
+        self.conn.commit()
+        print(f"Rebuilt {self.cursor.rowcount} daily ticket stat buckets")
+
+    def rebuild_customer_ticket_stats(self):
+        """Recompute customer_ticket_stats from the tickets table."""
+        self.cursor.execute("DELETE FROM customer_ticket_stats")
+        self.cursor.execute("""
+            INSERT INTO customer_ticket_stats (
+                customer_id, total_tickets, open_tickets, in_progress_tickets, resolved_tickets,
+                low_priority_tickets, medium_priority_tickets, high_priority_tickets, last_ticket_at
+            )
+            SELECT customer_id, COUNT(*),
+                   SUM(status = 'open'), SUM(status = 'in_progress'), SUM(status = 'resolved'),
+                   SUM(priority = 'low'), SUM(priority = 'medium'), SUM(priority = 'high'),
+                   MAX(created_at)
+            FROM tickets
+            GROUP BY customer_id
+        """)
+        self.conn.commit()
+        print(f"Rebuilt ticket stats for {self.cursor.rowcount} customers")
+
+    def rebuild_ticket_search_index(self):
+        """Re-index every ticket in tickets_fts."""
+        self.cursor.execute("INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')")
+        self.conn.commit()
+        print("Rebuilt ticket search index")
+
+    def generate_dataset(self, customers: int = 10000, tickets: int = 200000, zipf_exponent: float = 1.1,
+                         days: int = 365, disabled_ratio: float = 0.1,
+                         status_mix: Optional[Dict[str, float]] = None,
+                         priority_mix: Optional[Dict[str, float]] = None,
+                         seed: int = 42, chunk_size: int = 50000) -> Dict[str, Any]:
+        """Bulk-load a synthetic, realistically skewed dataset and report throughput.
+
+        Ticket counts per customer follow a Zipf distribution (a few customers
+        file most tickets), statuses and priorities follow the given mixes, and
+        ticket creation times are spread over the last `days` days in id order.
+        Rows are appended after any existing ones.
+
+        Secondary indexes and triggers are dropped for the load and recreated
+        afterwards, derived tables are rebuilt once at the end, and the load
+        runs with journaling and fsync off, so the database must not be in use.
+
+        Args:
+            customers: Number of customers to add
+            tickets: Number of tickets to add
+            zipf_exponent: Skew of tickets per customer (0 is uniform)
+            days: Time span of ticket creation dates, ending now
+            disabled_ratio: Fraction of customers with status 'disabled'
+            status_mix: Ticket status weights (default DEFAULT_STATUS_MIX)
+            priority_mix: Ticket priority weights (default DEFAULT_PRIORITY_MIX)
+            seed: Random seed, so a dataset can be regenerated exactly
+            chunk_size: Rows per executemany call
+        """
+        rng = np.random.default_rng(seed)
+        report: Dict[str, Any] = {"customers": customers, "tickets": tickets}
+        started = time.perf_counter()
+
+        deferred = self._drop_deferred_schema()
+        self._set_bulk_load_pragmas(True)
+        try:
+            phase = time.perf_counter()
+            first_customer = self._load_customers(rng, customers, days, disabled_ratio, chunk_size)
+            report["customer_load_seconds"] = round(time.perf_counter() - phase, 2)
+
+            phase = time.perf_counter()
+            self._load_tickets(rng, first_customer, customers, tickets, zipf_exponent, days,
+                               status_mix or DEFAULT_STATUS_MIX, priority_mix or DEFAULT_PRIORITY_MIX,
+                               chunk_size)
+            report["ticket_load_seconds"] = round(time.perf_counter() - phase, 2)
+        finally:
+            phase = time.perf_counter()
+            for sql in deferred:
+                self.cursor.execute(sql)
+            self.conn.commit()
+            report["index_build_seconds"] = round(time.perf_counter() - phase, 2)
+
+            phase = time.perf_counter()
+            self.rebuild_customer_ticket_stats()
+            self.rebuild_ticket_daily_stats()
+            self.rebuild_ticket_search_index()
+            report["derived_rebuild_seconds"] = round(time.perf_counter() - phase, 2)
+
+            self._set_bulk_load_pragmas(False)
+
+        total = time.perf_counter() - started
+        report["total_seconds"] = round(total, 2)
+        if report["customer_load_seconds"]:
+            report["customer_rows_per_second"] = round(customers / report["customer_load_seconds"])
+        if report["ticket_load_seconds"]:
+            report["ticket_rows_per_second"] = round(tickets / report["ticket_load_seconds"])
+        report["overall_rows_per_second"] = round((customers + tickets) / total) if total else None
+        return report
+
+    def _drop_deferred_schema(self) -> List[str]:
+        """Drop secondary indexes and triggers on customers/tickets, returning their SQL."""
+        self.cursor.execute("""
+            SELECT type, name, sql FROM sqlite_master
+            WHERE type IN ('index', 'trigger') AND tbl_name IN ('customers', 'tickets')
+              AND sql IS NOT NULL
+            ORDER BY type, name
+        """)
+        objects = self.cursor.fetchall()
+        for object_type, name, _ in objects:
+            self.cursor.execute(f"DROP {object_type.upper()} {name}")
+        self.conn.commit()
+        return [sql for _, _, sql in objects]
+
+    def _set_bulk_load_pragmas(self, enabled: bool):
+        """Switch between bulk-load pragmas and the normal serving settings."""
+        self.conn.commit()
+        if enabled:
+            pragmas = BULK_LOAD_PRAGMAS
+        else:
+            pragmas = {"journal_mode": "WAL", "synchronous": "NORMAL", "foreign_keys": "ON", "cache_size": -2000}
+        for name, value in pragmas.items():
+            self.cursor.execute(f"PRAGMA {name} = {value}")
+
+    def _next_id(self, table: str) -> int:
+        """Return the first id after the existing rows of a table."""
+        self.cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+        return self.cursor.fetchone()[0]
+
+    def _load_customers(self, rng, count: int, days: int, disabled_ratio: float, chunk_size: int) -> int:
+        """Insert synthetic customers with explicit ids; return the first id."""
+        first_id = self._next_id("customers")
+        now = int(time.time())
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            ids = range(first_id + start, first_id + start + size)
+            first_names = rng.integers(len(SYNTHETIC_FIRST_NAMES), size=size).tolist()
+            last_names = rng.integers(len(SYNTHETIC_LAST_NAMES), size=size).tolist()
+            domains = rng.integers(len(SYNTHETIC_EMAIL_DOMAINS), size=size).tolist()
+            phones = rng.integers(1000000, 10000000, size=size).tolist()
+            disabled = (rng.random(size) < disabled_ratio).tolist()
+            # Customers sign up before (and during) the ticket period
+            created = _format_timestamps(now - rng.integers(0, 2 * days * 86400, size=size))
+
+            rows = []
+            for i, customer_id in enumerate(ids):
+                first = SYNTHETIC_FIRST_NAMES[first_names[i]]
+                last = SYNTHETIC_LAST_NAMES[last_names[i]]
+                rows.append((
+                    customer_id,
+                    f"{first} {last}",
+                    f"{first.lower()}.{last.lower()}{customer_id}@{SYNTHETIC_EMAIL_DOMAINS[domains[i]]}",
+                    f"+1-555-{phones[i]}",
+                    "disabled" if disabled[i] else "active",
+                    created[i],
+                    created[i],
+                ))
+            self.cursor.executemany("""
+                INSERT INTO customers (id, name, email, phone, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            self.conn.commit()
+            print(f"  customers: {start + size}/{count}")
+        return first_id
+
+    def _load_tickets(self, rng, first_customer: int, customers: int, count: int, zipf_exponent: float,
+                      days: int, status_mix: Dict[str, float], priority_mix: Dict[str, float],
+                      chunk_size: int):
+        """Insert synthetic tickets in chunks of increasing creation time."""
+        if count and not customers:
+            raise ValueError("Tickets need at least one generated customer")
+
+        # Zipf weights over a random permutation, so the heaviest customers
+        # are spread across the id range rather than being the lowest ids
+        weights = 1.0 / np.arange(1, customers + 1) ** zipf_exponent
+        cdf = np.cumsum(weights / weights.sum())
+        owners = first_customer + rng.permutation(customers)
+
+        statuses, status_p = list(status_mix), np.array(list(status_mix.values()), dtype=float)
+        priorities, priority_p = list(priority_mix), np.array(list(priority_mix.values()), dtype=float)
+
+        issue_texts = [issue.format(area=area) for issue in SYNTHETIC_ISSUES for area in SYNTHETIC_AREAS]
+
+        first_id = self._next_id("tickets")
+        end = int(time.time())
+        span = days * 86400
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            ranks = np.minimum(np.searchsorted(cdf, rng.random(size)), customers - 1)
+            customer_ids = owners[ranks].tolist()
+            status = rng.choice(len(statuses), size=size, p=status_p / status_p.sum()).tolist()
+            priority = rng.choice(len(priorities), size=size, p=priority_p / priority_p.sum()).tolist()
+            issues = rng.integers(len(issue_texts), size=size).tolist()
+            # Each chunk covers the next slice of the time span, sorted, so
+            # created_at grows with the ticket id as in a live system
+            slice_start = end - span + span * start // count
+            slice_end = end - span + span * (start + size) // count
+            created = _format_timestamps(np.sort(rng.integers(slice_start, max(slice_end, slice_start + 1), size=size)))
+
+            rows = [
+                (
+                    first_id + start + i,
+                    customer_ids[i],
+                    issue_texts[issues[i]],
+                    statuses[status[i]],
+                    priorities[priority[i]],
+                    created[i],
+                )
+                for i in range(size)
+            ]
+            self.cursor.executemany("""
+                INSERT INTO tickets (id, customer_id, issue, status, priority, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+            if (start // chunk_size) % 10 == 9 or start + size == count:
+                self.conn.commit()
+            print(f"  tickets: {start + size}/{count}")
+
     def insert_sample_data(self):
         """Insert sample data for testing."""
 
@@ -227,10 +935,9 @@ class DatabaseSetup:
         print("\n3. Customers with Most Tickets:")
         print("-" * 60)
         self.cursor.execute("""
-            SELECT c.id, c.name, c.email, COUNT(t.id) as ticket_count
+            SELECT c.id, c.name, c.email, COALESCE(s.total_tickets, 0) as ticket_count
             FROM customers c
-            LEFT JOIN tickets t ON c.id = t.customer_id
-            GROUP BY c.id, c.name, c.email
+            LEFT JOIN customer_ticket_stats s ON s.customer_id = c.id
             ORDER BY ticket_count DESC
             LIMIT 5
         """)
@@ -351,11 +1058,47 @@ class DatabaseSetup:
             print("Database connection closed.")
 
 
-def main():
+def _format_timestamps(epoch_seconds: np.ndarray) -> List[str]:
+    """Format Unix times as the 'YYYY-MM-DD HH:MM:SS' strings SQLite stores."""
+    return np.char.replace(np.datetime_as_string(epoch_seconds.astype("datetime64[s]")), "T", " ").tolist()
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    """Parse a weight mix such as 'open=0.2,in_progress=0.1,resolved=0.7'."""
+    try:
+        return {name.strip(): float(weight) for name, weight in (item.split("=") for item in value.split(","))}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected name=weight pairs, got {value!r}")
+
+
+def generate(db_path: str, **options: Any) -> Dict[str, Any]:
+    """Create or migrate a database and bulk-load a generated dataset into it."""
+    db = DatabaseSetup(db_path)
+    try:
+        db.connect()
+        db.migrate()
+        return db.generate_dataset(**options)
+    finally:
+        db.close()
+
+
+def rebuild_stats(db_path: str = "support.db"):
+    """Bring a database up to date and recompute its derived ticket counters."""
+    db = DatabaseSetup(db_path)
+    try:
+        db.connect()
+        db.migrate()
+        db.rebuild_customer_ticket_stats()
+        db.rebuild_ticket_daily_stats()
+    finally:
+        db.close()
+
+
+def main(db_path: str = "support.db"):
     """Main function to setup the database."""
 
     # Initialize database
-    db = DatabaseSetup("support.db")
+    db = DatabaseSetup(db_path)
 
     try:
         # Connect to database
@@ -367,6 +1110,9 @@ def main():
         # Create triggers
         db.create_triggers()
 
+        # Apply schema migrations
+        db.migrate()
+
         # Display schema
         db.display_schema()
 
@@ -404,4 +1150,39 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Set up the customer support database")
+    parser.add_argument("--db", default="support.db", help="Path to the SQLite database file")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Recompute customer_ticket_stats and ticket_daily_stats, then exit")
+    generation = parser.add_argument_group("synthetic dataset (non-interactive)")
+    generation.add_argument("--generate", action="store_true",
+                            help="Bulk-load a generated dataset instead of prompting")
+    generation.add_argument("--customers", type=int, default=10000)
+    generation.add_argument("--tickets", type=int, default=200000)
+    generation.add_argument("--zipf", type=float, default=1.1, dest="zipf_exponent",
+                            help="Skew of tickets per customer (0 is uniform)")
+    generation.add_argument("--days", type=int, default=365, help="Span of ticket creation dates")
+    generation.add_argument("--disabled-ratio", type=float, default=0.1)
+    generation.add_argument("--status-mix", type=_parse_mix, default=None,
+                            help="e.g. open=0.15,in_progress=0.1,resolved=0.75")
+    generation.add_argument("--priority-mix", type=_parse_mix, default=None,
+                            help="e.g. low=0.35,medium=0.45,high=0.2")
+    generation.add_argument("--seed", type=int, default=42)
+    generation.add_argument("--chunk-size", type=int, default=50000, help="Rows per executemany call")
+    generation.add_argument("--report", help="Also write the throughput report to this JSON file")
+    args = parser.parse_args()
+
+    if args.rebuild_stats:
+        rebuild_stats(args.db)
+    elif args.generate:
+        report = generate(
+            args.db, customers=args.customers, tickets=args.tickets, zipf_exponent=args.zipf_exponent,
+            days=args.days, disabled_ratio=args.disabled_ratio, status_mix=args.status_mix,
+            priority_mix=args.priority_mix, seed=args.seed, chunk_size=args.chunk_size,
+        )
+        print(json.dumps(report, indent=2))
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+    else:
+        main(args.db)
@@ -0,0 +1,385 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Pragmas applied to every pooled connection. WAL lets readers proceed while a
+# writer holds the lock; NORMAL synchronous is durable across application
+# crashes in WAL mode and avoids an fsync per commit.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -16000,       # negative values are KiB, i.e. 16 MB per connection
+    "mmap_size": 268435456,     # 256 MB
+    "temp_store": "MEMORY",
+}
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class SlowQueryLog:
+    """Records statements that took at least `threshold` seconds.
+
+    Entries go to the "db_pool.slow_queries" logger and to a bounded buffer
+    of the most recent ones, reported on /health.
+    """
+
+    logger = logging.getLogger("db_pool.slow_queries")
+
+    def __init__(self, threshold: float = 0.1, keep: int = 100):
+        """Initialize an empty log.
+
+        Args:
+            threshold: Seconds a statement must take to be recorded
+            keep: Number of most recent entries kept in memory
+        """
+        self.threshold = threshold
+        self._recent: "deque[Dict[str, Any]]" = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def record(self, sql: str, parameters: Any, seconds: float):
+        """Add a slow statement."""
+        entry = {
+            "sql": " ".join(sql.split()),
+            "parameters": _truncate(parameters),
+            "duration_ms": round(seconds * 1000, 3),
+            "at": time.time(),
+        }
+        with self._lock:
+            self._count += 1
+            self._recent.append(entry)
+        self.logger.warning("slow query (%.1f ms): %s %s", seconds * 1000, entry["sql"], entry["parameters"])
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """Return the most recent entries, oldest first."""
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the threshold and number of slow statements seen."""
+        with self._lock:
+            return {"threshold_ms": self.threshold * 1000, "count": self._count}
+
+
+def _truncate(parameters: Any, limit: int = 200) -> Any:
+    """Shorten long parameter values for logging."""
+    if isinstance(parameters, dict):
+        return {key: _truncate(value, limit) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_truncate(value, limit) for value in parameters]
+    if isinstance(parameters, (str, bytes)) and len(parameters) > limit:
+        return f"{parameters[:limit]!r}... ({len(parameters)} chars)"
+    return parameters
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports statements slower than its connection's threshold.
+
+    A statement's time covers execute() and every fetch until the result is
+    exhausted, so lazily stepped queries are measured too. It is checked when
+    the statement finishes: fetchall(), a fetch that exhausts the rows, the
+    next execute(), or the cursor being closed or collected.
+    """
+
+    _statement = None
+    _elapsed = 0.0
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._statement, self._elapsed = (sql, parameters), 0.0
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self._statement, self._elapsed = (sql, "<executemany>"), 0.0
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._elapsed += time.perf_counter() - started
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        """Record the current statement if it was slow."""
+        statement, self._statement = self._statement, None
+        if statement is not None:
+            log = getattr(self.connection, "slow_query_log", None)
+            if log is not None and self._elapsed >= log.threshold:
+                log.record(statement[0], statement[1], self._elapsed)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including conn.execute(), are TimedCursors."""
+
+    slow_query_log: Optional[SlowQueryLog] = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections."""
+
+    def __init__(self, db_path: str, pool_size: int = 8, timeout: float = 10.0,
+                 pragmas: Optional[Dict[str, Any]] = None, cached_statements: int = 256,
+                 slow_query_log: Optional[SlowQueryLog] = None):
+        """Initialize the pool. Connections are opened lazily.
+
+        Args:
+            db_path: Path to the SQLite database file
+            pool_size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection before giving up
+            pragmas: Overrides merged on top of DEFAULT_PRAGMAS
+            cached_statements: Size of each connection's prepared statement cache
+            slow_query_log: Where to record slow statements; None disables
+                statement timing
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.cached_statements = cached_statements
+        self.slow_query_log = slow_query_log
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+        self._acquisitions = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        # isolation_level=None puts the connection in autocommit mode; write
+        # transactions are opened explicitly through transaction().
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.pragmas.get("busy_timeout", 5000) / 1000,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=self.cached_statements,
+            factory=TimedConnection if self.slow_query_log is not None else sqlite3.Connection,
+        )
+        if self.slow_query_log is not None:
+            conn.slow_query_log = self.slow_query_log
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take a connection from the pool, opening one if below pool_size."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._all) < self.pool_size:
+                    conn = self._connect()
+                    self._all.append(conn)
+            if conn is None:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool_size={self.pool_size})"
+                    )
+                with self._lock:
+                    self._waits += 1
+                    self._wait_time += time.perf_counter() - started
+
+        with self._lock:
+            self._acquisitions += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, discarding any open transaction."""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of a with-block.
+
+        Nested calls on the same thread share the outer connection, so a
+        caller can run several tool functions inside one transaction or
+        read snapshot.
+        """
+        bound = getattr(self._local, "conn", None)
+        if bound is not None:
+            yield bound
+            return
+
+        conn = self.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool usage counters."""
+        with self._lock:
+            opened = len(self._all)
+            idle = self._idle.qsize()
+            return {
+                "pool_size": self.pool_size,
+                "open": opened,
+                "idle": idle,
+                "in_use": opened - idle,
+                "acquisitions": self._acquisitions,
+                "waits": self._waits,
+                "avg_wait_ms": round(self._wait_time / self._waits * 1000, 3) if self._waits else 0.0,
+                "timeouts": self._timeouts,
+                "cached_statements": self.cached_statements,
+                "slow_queries": self.slow_query_log.stats()["count"] if self.slow_query_log is not None else 0,
+            }
+
+    def health(self) -> Dict[str, Any]:
+        """Run a trivial query and report the effective journal settings."""
+        try:
+            with self.connection() as conn:
+                conn.execute("SELECT 1").fetchone()
+                journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+            return {
+                "status": "healthy",
+                "journal_mode": journal_mode,
+                "synchronous": synchronous,
+                **self.stats(),
+            }
+        except sqlite3.Error as e:
+            return {
+                "status": "unhealthy",
+                "error": str(e),
+                **self.stats(),
+            }
+
+    def bound(self) -> Optional[sqlite3.Connection]:
+        """Return the connection the calling thread is inside a with-block for, if any."""
+        return getattr(self._local, "conn", None)
+
+    def close(self):
+        """Close every connection owned by the pool."""
+        self._closed = True
+        with self._lock:
+            connections, self._all = self._all, []
+        for conn in connections:
+            conn.close()
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Run a block as one write transaction on a pooled connection.
+
+    Opens BEGIN IMMEDIATE so the write lock is taken up front instead of being
+    upgraded mid-transaction. When a transaction is already open (for example
+    an enclosing batch), a savepoint is used so the block can still roll back
+    on its own without ending the outer transaction.
+    """
+    if conn.in_transaction:
+        name = f"sp_{threading.get_ident()}_{time.perf_counter_ns()}"
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        conn.execute(f"RELEASE {name}")
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+@contextmanager
+def read_snapshot(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Run a block of reads against one consistent snapshot of the database.
+
+    In WAL mode a deferred transaction pins the snapshot at its first read, so
+    every query in the block sees the same data even if writers commit
+    meanwhile. Does nothing extra when a transaction is already open.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute("BEGIN DEFERRED")
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
@@ -0,0 +1,212 @@
+"""ASGI front end for the MCP server.
+
+Serves the same /mcp, /changes, /health and /metrics routes as the Flask app in
+mcp_server.py and reuses its message processing. The event loop only handles
+HTTP and SSE framing; every call into SQLite runs on a bounded thread pool, so
+thousands of open SSE requests can be held while at most DB_WORKERS execute
+queries.
+"""
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import mcp_server
+from metrics import PROMETHEUS_CONTENT_TYPE
+
+# Threads available for database work; see configure_executor()
+DB_WORKERS = 32
+
+# SSE events buffered per request before the producing thread waits
+STREAM_BUFFER = 16
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="mcp-db")
+
+
+def configure_executor(workers: int) -> ThreadPoolExecutor:
+    """Replace the database thread pool with one of the given size."""
+    global _executor, DB_WORKERS
+    DB_WORKERS = workers
+    old, _executor = _executor, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-db")
+    old.shutdown(wait=False)
+    return _executor
+
+
+async def run_blocking(fn, *args) -> Any:
+    """Run a blocking call on the database thread pool in a fresh context."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, contextvars.Context().run, fn, *args)
+
+
+async def iterate_in_executor(make_iterator) -> AsyncIterator[Any]:
+    """Drive a blocking iterator on one pool thread, yielding its items here.
+
+    The whole iterator runs on a single thread because the pooled connection
+    it borrows is bound to that thread until the iterator finishes. A bounded
+    queue provides backpressure; if the consumer goes away the producer is
+    told to stop and closes the iterator, releasing its connection.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+    stopped = threading.Event()
+    done = object()
+
+    def produce():
+        iterator: Iterator[Any] = make_iterator()
+        try:
+            for item in iterator:
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+                if stopped.is_set():
+                    return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            if not stopped.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+    producer = loop.run_in_executor(_executor, contextvars.Context().run, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+        await producer
+    finally:
+        if not producer.done():
+            stopped.set()
+            # Unblock a producer waiting on a full queue so it can see the flag
+            while not queue.empty():
+                queue.get_nowait()
+
+
+async def mcp_endpoint(request: Request) -> Response:
+    """Main MCP endpoint for communication."""
+    session_id: Optional[str] = request.headers.get("Mcp-Session-Id")
+    try:
+        message = json.loads(await request.body())
+    except ValueError as e:
+        error_response = {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {
+                "code": -32700,
+                "message": f"Parse error: {str(e)}"
+            }
+        }
+        return Response(mcp_server.create_sse_message(error_response), media_type="text/event-stream")
+
+    if mcp_server.is_initialize(message):
+        response, headers = await run_blocking(mcp_server.initialize_session, message)
+        return Response(mcp_server.create_sse_message(response), media_type="text/event-stream",
+                        headers=headers)
+
+    if isinstance(message, dict) and not mcp_server.is_streaming_call(message):
+        # A single response: one executor hop, no producer thread or queue
+        events = await run_blocking(lambda: list(mcp_server.sse_events(message, session_id)))
+        return Response("".join(events), media_type="text/event-stream")
+
+    events = iterate_in_executor(lambda: mcp_server.sse_events(message, session_id))
+    return StreamingResponse(events, media_type="text/event-stream")
+
+
+async def follow_changes(after: int, tables: Optional[List[str]]) -> AsyncIterator[str]:
+    """Async counterpart of mcp_server.change_feed_events.
+
+    Each poll is one hop to the thread pool; between polls the subscription
+    only holds a sleeping coroutine, so idle feeds cost no threads.
+    """
+    mcp_server.change_feed.subscribed(1)
+    try:
+        # Reconnect after a second; EventSource resumes with Last-Event-ID
+        yield "retry: 1000\n\n"
+        last_sent = time.monotonic()
+        while True:
+            events, position = await run_blocking(mcp_server.change_feed_poll, after, tables)
+            if events:
+                yield "".join(events)
+                last_sent = time.monotonic()
+            if position != after:
+                after = position
+                continue
+            if time.monotonic() - last_sent >= mcp_server.CHANGE_FEED_HEARTBEAT:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(mcp_server.CHANGE_FEED_POLL_INTERVAL)
+    finally:
+        mcp_server.change_feed.subscribed(-1)
+
+
+async def changes_endpoint(request: Request) -> Response:
+    """Change-data-capture feed: customer and ticket changes as SSE events."""
+    try:
+        after, tables = await run_blocking(mcp_server.change_feed_start, request.query_params.get("after"),
+                                           request.headers.get("Last-Event-ID"),
+                                           request.query_params.get("tables"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return StreamingResponse(follow_changes(after, tables), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+async def health_check(request: Request) -> Response:
+    """Health check endpoint."""
+    return JSONResponse(await run_blocking(mcp_server.health_status))
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus metrics endpoint."""
+    return Response(await run_blocking(mcp_server.metrics_text),
+                    headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+
+app = Starlette(
+    routes=[
+        Route("/mcp", mcp_endpoint, methods=["POST"]),
+        Route("/changes", changes_endpoint, methods=["GET"]),
+        Route("/health", health_check, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["Mcp-Session-Id"]),
+    ],
+)
+
+
+def create_server(host: str = "127.0.0.1", port: int = 5000) -> uvicorn.Server:
+    """Build a uvicorn server for the ASGI app."""
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_level="error",
+        # Plain asyncio so the server also runs inside nest_asyncio-patched
+        # processes such as demo.py
+        loop="asyncio",
+        backlog=4096,
+        timeout_keep_alive=30,
+    )
+    return uvicorn.Server(config)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 5000):
+    """Serve the ASGI app on the running event loop (e.g. alongside A2A agents)."""
+    await create_server(host, port).serve()
+
+
+def run(host: str = "127.0.0.1", port: int = 5000):
+    """Serve the ASGI app on a new event loop, blocking until shutdown."""
+    create_server(host, port).run()
@@ -0,0 +1,304 @@
+"""Prefork (multi-process) serving mode for the MCP server.
+
+A supervisor process binds the listening socket once and forks N workers that
+all accept on it, so the kernel spreads connections across processes and the
+GIL stops being the ceiling. Every worker opens its own connection pool on the
+shared WAL database (connections are never inherited across fork) and keeps a
+private result cache; caches stay coherent through the cache_invalidations
+log (see result_cache.CacheInvalidationLog).
+
+Signals sent to the supervisor:
+    SIGHUP           graceful restart: start a new set of workers, then let the
+                     old ones finish their in-flight requests and exit
+    SIGTERM, SIGINT  graceful shutdown
+
+Workers write a stats snapshot to a shared directory; /health on any worker
+reports the totals across all of them under "workers", and /metrics reports
+the sum of every worker's metrics.
+"""
+import json
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+import mcp_server
+
+# Seconds between worker stats snapshots
+SNAPSHOT_INTERVAL = 1.0
+
+# Seconds a retiring worker gets to finish in-flight requests before SIGKILL
+GRACEFUL_TIMEOUT = 30.0
+
+# Stats directory and generation of the current worker process
+_stats_dir: Optional[str] = None
+_generation = 0
+_started_at = 0.0
+
+
+def create_listener(host: str, port: int, backlog: int = 4096) -> socket.socket:
+    """Bind the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_snapshot() -> Dict[str, Any]:
+    """Return this worker's current stats."""
+    return {
+        "pid": os.getpid(),
+        "generation": _generation,
+        "uptime_seconds": round(time.time() - _started_at, 1),
+        **mcp_server.metrics_snapshot(),
+    }
+
+
+def write_snapshot():
+    """Atomically replace this worker's stats file."""
+    path = os.path.join(_stats_dir, f"{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(worker_snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def read_snapshots() -> List[Dict[str, Any]]:
+    """Load the latest stats of every live worker, this one fresh."""
+    snapshots = [worker_snapshot()]
+    for name in os.listdir(_stats_dir):
+        if not name.endswith(".json") or name == f"{os.getpid()}.json":
+            continue
+        try:
+            with open(os.path.join(_stats_dir, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # worker exited or is mid-replace
+    return snapshots
+
+
+def _sum_counters(sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum the integer fields of the same stats section across workers."""
+    totals: Dict[str, Any] = {}
+    for section in sections:
+        for key, value in section.items():
+            if isinstance(value, int) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def aggregate_stats() -> Dict[str, Any]:
+    """Build the "workers" section of /health."""
+    snapshots = read_snapshots()
+    cache = _sum_counters([s["cache"] for s in snapshots])
+    lookups = cache.get("hits", 0) + cache.get("misses", 0)
+    cache["hit_rate"] = round(cache.get("hits", 0) / lookups, 4) if lookups else 0.0
+    return {
+        "count": len(snapshots),
+        "serving_pid": os.getpid(),
+        "database": _sum_counters([s["database"] for s in snapshots]),
+        "cache": cache,
+        "write_queue": _sum_counters([s["write_queue"] for s in snapshots]),
+        "per_worker": [
+            {key: s[key] for key in ("pid", "generation", "uptime_seconds")} for s in snapshots
+        ],
+    }
+
+
+def _snapshot_loop():
+    """Refresh this worker's stats file until the process exits."""
+    while True:
+        try:
+            write_snapshot()
+        except OSError:
+            pass
+        time.sleep(SNAPSHOT_INTERVAL)
+
+
+def _run_worker(sock: socket.socket, backend: str, pool_size: Optional[int],
+                pragmas: Optional[Dict[str, Any]]):
+    """Serve requests on the shared socket in a forked worker process."""
+    global _started_at
+    _started_at = time.time()
+    # Workers ignore restart requests; a no-op handler (rather than the default
+    # action) lets uvicorn re-raise SIGTERM/SIGINT after its graceful shutdown
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    signal.signal(signal.SIGINT, lambda signum, frame: None)
+
+    mcp_server.configure_pool(pool_size=pool_size, pragmas=pragmas)
+    mcp_server.configure_cache(mcp_server.result_cache.max_entries, mcp_server.result_cache.ttl)
+    mcp_server.enable_shared_invalidation()
+    mcp_server.configure_write_queue()
+    mcp_server.build_similarity_index()
+    mcp_server.HEALTH_EXTENSIONS["workers"] = aggregate_stats
+    mcp_server.METRICS_SOURCE = read_snapshots
+    threading.Thread(target=_snapshot_loop, name="mcp-stats", daemon=True).start()
+
+    if backend == "asgi":
+        import mcp_asgi
+        mcp_asgi.create_server().run(sockets=[sock])
+    else:
+        from werkzeug.serving import make_server
+        server = make_server(*sock.getsockname()[:2], mcp_server.app, threaded=True, fd=sock.fileno())
+        # Let in-flight request threads finish on shutdown
+        server.daemon_threads = False
+        server.block_on_close = True
+        stop = lambda signum, frame: threading.Thread(target=server.shutdown).start()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        server.serve_forever()
+        server.server_close()
+    mcp_server.get_pool().close()
+
+
+class PreforkServer:
+    """Supervisor that keeps `workers` processes serving one listening socket."""
+
+    def __init__(self, host: str, port: int, workers: int, backend: str = "asgi",
+                 pool_size: Optional[int] = None, pragmas: Optional[Dict[str, Any]] = None):
+        """Configure the supervisor.
+
+        Args:
+            host: Interface to bind
+            port: Port to listen on
+            workers: Number of worker processes
+            backend: "asgi" or "flask", as in mcp_server.start_mcp_server
+            pool_size: Connection pool size of each worker
+            pragmas: SQLite pragma overrides for pooled connections
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.backend = backend
+        self.pool_size = pool_size
+        self.pragmas = pragmas
+        self.generation = 0
+
+        self._sock: Optional[socket.socket] = None
+        self._stats_dir: Optional[str] = None
+        self._active: Dict[int, float] = {}    # pid -> start time
+        self._retiring: Dict[int, float] = {}  # pid -> SIGKILL deadline
+        self._stopping = False
+        self._reload = False
+
+    def spawn(self) -> int:
+        """Fork one worker of the current generation."""
+        global _stats_dir, _generation
+        pid = os.fork()
+        if pid == 0:
+            _stats_dir, _generation = self._stats_dir, self.generation
+            status = 0
+            try:
+                _run_worker(self._sock, self.backend, self.pool_size, self.pragmas)
+            except BaseException:
+                status = 1
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        self._active[pid] = time.monotonic()
+        return pid
+
+    def restart(self):
+        """Replace every worker without closing the listening socket."""
+        self.generation += 1
+        old = list(self._active)
+        for _ in range(self.workers):
+            self.spawn()
+        for pid in old:
+            self._active.pop(pid, None)
+            self._retire(pid)
+        print(f"Restarted workers (generation {self.generation})")
+
+    def _retire(self, pid: int):
+        """Ask a worker to finish its in-flight requests and exit."""
+        self._retiring[pid] = time.monotonic() + GRACEFUL_TIMEOUT
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self._retiring.pop(pid, None)
+
+    def _reap(self):
+        """Collect exited workers and replace any that died unexpectedly."""
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            try:
+                os.unlink(os.path.join(self._stats_dir, f"{pid}.json"))
+            except OSError:
+                pass
+            if self._retiring.pop(pid, None) is not None:
+                continue
+            started = self._active.pop(pid, None)
+            if started is not None and not self._stopping:
+                print(f"Worker {pid} exited unexpectedly; starting a replacement")
+                if time.monotonic() - started < 1.0:
+                    time.sleep(1.0)  # don't spin on a worker that fails at startup
+                self.spawn()
+
+    def _kill_overdue(self):
+        """SIGKILL retiring workers that outlived GRACEFUL_TIMEOUT."""
+        now = time.monotonic()
+        for pid, deadline in list(self._retiring.items()):
+            if now > deadline:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _on_signal(self, signum, frame):
+        """Record a shutdown or restart request for the supervisor loop."""
+        if signum == signal.SIGHUP:
+            self._reload = True
+        else:
+            self._stopping = True
+
+    def serve(self):
+        """Run the supervisor until SIGTERM/SIGINT."""
+        if not hasattr(os, "fork"):
+            raise RuntimeError("Prefork mode requires os.fork (POSIX)")
+        self._sock = create_listener(self.host, self.port)
+        self._stats_dir = tempfile.mkdtemp(prefix="mcp-prefork-")
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._on_signal)
+        try:
+            for _ in range(self.workers):
+                self.spawn()
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self.restart()
+                self._reap()
+                self._kill_overdue()
+                time.sleep(0.2)
+
+            for pid in list(self._active):
+                self._active.pop(pid)
+                self._retire(pid)
+            while self._retiring:
+                self._reap()
+                self._kill_overdue()
+                time.sleep(0.1)
+        finally:
+            self._sock.close()
+            shutil.rmtree(self._stats_dir, ignore_errors=True)
+
+
+def serve(host: str = "127.0.0.1", port: int = 5000, workers: Optional[int] = None,
+          backend: str = "asgi", pool_size: Optional[int] = None,
+          pragmas: Optional[Dict[str, Any]] = None):
+    """Serve the MCP server from `workers` processes (default: one per CPU)."""
+    workers = workers or os.cpu_count() or 1
+    PreforkServer(host, port, workers, backend=backend, pool_size=pool_size, pragmas=pragmas).serve()
@@ -1,12 +1,83 @@
 import sqlite3
 import json
+import base64
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 from flask import Flask, request, Response, jsonify
 from flask_cors import CORS
 
+from change_feed import ChangeFeed, change_event, parse_tables, reset_event
+from database_setup import IDEMPOTENCY_TTL, PHONE_SEPARATORS, DatabaseSetup
+from db_pool import ConnectionPool, SlowQueryLog, read_snapshot, transaction
+from metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry, merge_snapshots, render_prometheus
+from result_cache import CacheInvalidationLog, ResultCache, SingleFlight
+from schema_validation import compile_schema
+from serialization import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS, dumps, encode_result
+from ticket_similarity import TicketSimilarityIndex
+from write_queue import WriteQueue
+
 DB_PATH = "support.db"
 
+# Connection pool settings; see configure_pool()
+DB_POOL_SIZE = 8
+DB_PRAGMAS: Dict[str, Any] = {}
+
+# Statements taking at least this many seconds are logged; 0 disables
+SLOW_QUERY_THRESHOLD = 0.1
+
+_pool: Optional[ConnectionPool] = None
+
+# Read-through cache for read-only tool results; see configure_cache()
+result_cache = ResultCache()
+
+# Coalesces identical concurrent read calls; see configure_cache()
+read_flights: Optional[SingleFlight] = SingleFlight()
+
+# Cross-process invalidation, enabled when several server processes share
+# DB_PATH; see enable_shared_invalidation()
+invalidation_log: Optional[CacheInvalidationLog] = None
+
+# In-memory TF-IDF index over ticket text for find_similar_resolved_tickets;
+# catches up with inserted tickets and edited issues on each use
+similarity_index = TicketSimilarityIndex()
+
+# Group-commit queue for single write tool calls; see configure_write_queue()
+write_queue: Optional[WriteQueue] = None
+
+# Change-data-capture feed served on /changes; see change_feed_events()
+change_feed = ChangeFeed(lambda: get_db_connection())
+
+# Seconds between change_log polls while a /changes subscriber is caught up,
+# and between keepalive comments on an idle feed
+CHANGE_FEED_POLL_INTERVAL = 0.25
+CHANGE_FEED_HEARTBEAT = 15.0
+
+# Extra sections for the /health payload, e.g. per-worker stats in prefork mode
+HEALTH_EXTENSIONS: Dict[str, Callable[[], Any]] = {}
+
+# Request, tool and phase timings of this process, exported on /metrics
+request_metrics = MetricsRegistry()
+
+# Snapshots summed on /metrics (see metrics_snapshot()); prefork workers
+# replace it to report every worker
+METRICS_SOURCE: Callable[[], List[Dict[str, Any]]] = lambda: [metrics_snapshot()]
+
+# Output format negotiated per session at initialize (Mcp-Session-Id header)
+MAX_SESSIONS = 10000
+_sessions: "OrderedDict[str, str]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+# Output format for the request being processed; set by the HTTP layer
+request_output_format: ContextVar[str] = ContextVar("request_output_format", default=DEFAULT_OUTPUT_FORMAT)
+
 app = Flask(__name__)
 CORS(app)
 
@@ -14,12 +85,23 @@ MCP_TOOLS = [
     {
         "name": "get_customer",
         "description": "Retrieve a specific customer by their ID. Returns customer details including name, email, phone, and status.",
+        "annotations": {"readOnlyHint": True},
         "inputSchema": {
             "type": "object",
             "properties": {
                 "customer_id": {
                     "type": "integer",
                     "description": "The unique ID of the customer to retrieve"
+                },
+                "include_ticket_stats": {
+                    "type": "boolean",
+                    "description": "Also return ticket counters: total, open, in_progress, resolved, per priority, and last_ticket_at"
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["id", "name", "email", "phone", "status", "created_at", "updated_at"]},
+                    "minItems": 1,
+                    "description": "Only return these customer columns (default: all)"
                 }
             },
             "required": ["customer_id"]
@@ -27,7 +109,8 @@ MCP_TOOLS = [
     },
     {
         "name": "list_customers",
-        "description": "List all customers in the database. Can optionally filter by status (active or disabled) and limit results.",
+        "description": "List customers in the database ordered by name, one page at a time. Can optionally filter by status (active or disabled). If has_more is true, pass next_cursor back as cursor to get the next page.",
+        "annotations": {"readOnlyHint": True},
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -38,7 +121,22 @@ MCP_TOOLS = [
                 },
                 "limit": {
                     "type": "integer",
-                    "description": "Maximum number of customers to return (default: all)"
+                    "minimum": 1,
+                    "description": "Page size (default: 50, max: 200)"
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Opaque next_cursor value from a previous page"
+                },
+                "include_ticket_stats": {
+                    "type": "boolean",
+                    "description": "Also return ticket counters: total, open, in_progress, resolved, per priority, and last_ticket_at"
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["id", "name", "email", "phone", "status", "created_at", "updated_at"]},
+                    "minItems": 1,
+                    "description": "Only return these customer columns (default: all)"
                 }
             }
         }
@@ -46,6 +144,7 @@ MCP_TOOLS = [
     {
         "name": "update_customer",
         "description": "Update an existing customer's information. Provide the customer ID and the fields to update (name, email, phone, or status).",
+        "annotations": {"readOnlyHint": False},
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -62,6 +161,10 @@ MCP_TOOLS = [
                         "status": {"type": "string", "enum": ["active", "disabled"]}
                     },
                     "description": "Fields to update"
+                },
+                "idempotency_key": {
+                    "type": "string",
+                    "description": "Optional key for this change that stays the same across retries (e.g. derived from the conversation turn). Retrying with the same key and arguments returns the original result instead of writing again"
                 }
             },
             "required": ["customer_id", "data"]
@@ -70,6 +173,7 @@ MCP_TOOLS = [
     {
         "name": "create_ticket",
         "description": "Create a new support ticket for a customer. Requires customer ID, issue description, and priority level.",
+        "annotations": {"readOnlyHint": False},
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -85,6 +189,10 @@ MCP_TOOLS = [
                     "type": "string",
                     "enum": ["low", "medium", "high"],
                     "description": "Priority level of the ticket"
+                },
+                "idempotency_key": {
+                    "type": "string",
+                    "description": "Optional key for this change that stays the same across retries (e.g. derived from the conversation turn). Retrying with the same key and arguments returns the original result instead of writing again"
                 }
             },
             "required": ["customer_id", "issue", "priority"]
@@ -92,43 +200,479 @@ MCP_TOOLS = [
     },
     {
         "name": "get_customer_history",
-        "description": "Get all support tickets for a specific customer, showing their complete ticket history.",
+        "description": "Get the support tickets for a specific customer, newest first, one page at a time. If has_more is true, pass next_cursor back as cursor to get older tickets.",
+        "annotations": {"readOnlyHint": True},
         "inputSchema": {
             "type": "object",
             "properties": {
                 "customer_id": {
                     "type": "integer",
                     "description": "The customer ID to get ticket history for"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "Page size (default: 50, max: 200)"
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Opaque next_cursor value from a previous page"
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["id", "customer_id", "issue", "status", "priority", "created_at"]},
+                    "minItems": 1,
+                    "description": "Only return these ticket columns (default: all)"
                 }
             },
             "required": ["customer_id"]
         }
+    },
+    {
+        "name": "get_customers_batch",
+        "description": "Retrieve several customers at once by their IDs. Use this instead of calling get_customer repeatedly.",
+        "annotations": {"readOnlyHint": True},
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_ids": {
+                    "type": "array",
+                    "items": {"type": "integer"},
+                    "minItems": 1,
+                    "maxItems": 100,
+                    "description": "The customer IDs to retrieve (max 100)"
+                }
+            },
+            "required": ["customer_ids"]
+        }
+    },
+    {
+        "name": "find_customer",
+        "description": "Find customers by email address, phone number, or the start of their name (case-insensitive). Use this when the user identifies themselves by anything other than a customer ID. When several criteria are given, customers must match all of them.",
+        "annotations": {"readOnlyHint": True},
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "email": {
+                    "type": "string",
+                    "description": "Exact email address"
+                },
+                "phone": {
+                    "type": "string",
+                    "description": "Phone number in any format, e.g. +1-555-0101 or (555) 0101"
+                },
+                "name_prefix": {
+                    "type": "string",
+                    "description": "Beginning of the customer's name, e.g. 'jane' or 'Jane Sm'"
+                },
+                "status": {
+                    "type": "string",
+                    "enum": ["active", "disabled"],
+                    "description": "Optional filter by customer status"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of customers to return (default: 10, max: 50)"
+                }
+            }
+        }
+    },
+    {
+        "name": "get_customer_histories_batch",
+        "description": "Get the support ticket histories of several customers at once. Use this instead of calling get_customer_history repeatedly.",
+        "annotations": {"readOnlyHint": True},
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_ids": {
+                    "type": "array",
+                    "items": {"type": "integer"},
+                    "minItems": 1,
+                    "maxItems": 100,
+                    "description": "The customer IDs to get ticket histories for (max 100)"
+                },
+                "ticket_status": {
+                    "type": "string",
+                    "enum": ["open", "in_progress", "resolved"],
+                    "description": "Optional filter to only include tickets with this status"
+                }
+            },
+            "required": ["customer_ids"]
+        }
+    },
+    {
+        "name": "find_customers_by_tickets",
+        "description": "Find customers that have tickets matching the given filters, e.g. active customers with open high-priority tickets. Returns each matching customer once with the number of matching tickets. Use this instead of listing customers and checking each history.",
+        "annotations": {"readOnlyHint": True},
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_status": {
+                    "type": "string",
+                    "enum": ["active", "disabled"],
+                    "description": "Optional filter by customer status"
+                },
+                "ticket_status": {
+                    "type": "string",
+                    "enum": ["open", "in_progress", "resolved"],
+                    "description": "Optional filter by ticket status"
+                },
+                "priority": {
+                    "type": "string",
+                    "enum": ["low", "medium", "high"],
+                    "description": "Optional filter by ticket priority"
+                },
+                "created_after": {
+                    "type": "string",
+                    "description": "Only count tickets created at or after this ISO date/time (e.g. 2025-01-31)"
+                },
+                "created_before": {
+                    "type": "string",
+                    "description": "Only count tickets created before this ISO date/time"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "Maximum number of customers to return (default: 50, max: 500)"
+                }
+            }
+        }
+    },
+    {
+        "name": "search_tickets",
+        "description": "Full-text search over ticket issue descriptions across all customers, best matches first. Each word matches itself and any word starting with its root, so 'failures' also finds 'failed', 'failing' and 'fail'; tickets containing the exact words rank first. Can filter by ticket status and priority. If has_more is true, pass next_cursor back as cursor to get the next page.",
+        "annotations": {"readOnlyHint": True},
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Words to search for, e.g. 'payment processing failure'"
+                },
+                "match": {
+                    "type": "string",
+                    "enum": ["all", "any"],
+                    "description": "Require all words (default) or any of them"
+                },
+                "status": {
+                    "type": "string",
+                    "enum": ["open", "in_progress", "resolved"],
+                    "description": "Optional filter by ticket status"
+                },
+                "priority": {
+                    "type": "string",
+                    "enum": ["low", "medium", "high"],
+                    "description": "Optional filter by ticket priority"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "Page size (default: 50, max: 200)"
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Opaque next_cursor value from a previous page"
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "find_similar_resolved_tickets",
+        "description": "Find resolved tickets whose issue text is most similar to a given issue, to show the problem is known and has been resolved before. Returns the top matching tickets (issue, status, priority, dates; no resolution notes are stored) with a similarity score between 0 and 1.",
+        "annotations": {"readOnlyHint": True},
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "issue": {
+                    "type": "string",
+                    "description": "Issue description to compare against"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of tickets to return (default: 5, max: 20)"
+                }
+            },
+            "required": ["issue"]
+        }
+    },
+    {
+        "name": "ticket_stats",
+        "description": "Count tickets created in a date range, grouped by any of status, priority and day (e.g. ticket volume by priority this week). Served from daily rollups, so it is cheap for any range. Dates are UTC, inclusive, in YYYY-MM-DD form.",
+        "annotations": {"readOnlyHint": True},
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "start_date": {
+                    "type": "string",
+                    "description": "First day to include, e.g. 2025-01-01 (default: earliest)"
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "Last day to include, e.g. 2025-01-07 (default: latest)"
+                },
+                "group_by": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["status", "priority", "day"]},
+                    "maxItems": 3,
+                    "description": "Dimensions to group counts by (default: none, just the total)"
+                },
+                "status": {
+                    "type": "string",
+                    "enum": ["open", "in_progress", "resolved"],
+                    "description": "Optional filter by ticket status"
+                },
+                "priority": {
+                    "type": "string",
+                    "enum": ["low", "medium", "high"],
+                    "description": "Optional filter by ticket priority"
+                }
+            }
+        }
     }
 ]
 
+# Page size bounds for paginated read tools
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Value types of each cursor kind (see decode_cursor): customers resume after
+# (name, id), tickets before (created_at, id), and search_tickets carries its
+# FTS query, status and priority filters and an offset
+CUSTOMER_CURSOR = (str, int)
+TICKET_CURSOR = (str, int)
+SEARCH_CURSOR = (str, (str, type(None)), (str, type(None)), int)
+
+# Rows fetched from SQLite and emitted per SSE event when streaming
+STREAM_CHUNK_SIZE = 100
+
+# Upper bound on IDs accepted by the batch lookup tools
+MAX_BATCH_IDS = 100
+
+# Columns returned for a customer. Listed explicitly rather than selected with
+# * so internal columns such as phone_normalized are not returned
+CUSTOMER_COLUMNS = ('id', 'name', 'email', 'phone', 'status', 'created_at', 'updated_at')
+
+# Columns of a ticket, the whitelist for get_customer_history's fields
+TICKET_COLUMNS = ('id', 'customer_id', 'issue', 'status', 'priority', 'created_at')
+
+# Longest idempotency key accepted
+MAX_IDEMPOTENCY_KEY_LENGTH = 200
+
+# Result size bounds for find_customer
+DEFAULT_FIND_CUSTOMER_LIMIT = 10
+MAX_FIND_CUSTOMER_LIMIT = 50
+
+# Counter columns of customer_ticket_stats, returned by include_ticket_stats
+TICKET_STATS_COUNTERS = (
+    'total_tickets', 'open_tickets', 'in_progress_tickets', 'resolved_tickets',
+    'low_priority_tickets', 'medium_priority_tickets', 'high_priority_tickets',
+)
+
+# str.translate table removing the characters phone_normalized strips
+PHONE_SEPARATOR_TABLE = str.maketrans('', '', PHONE_SEPARATORS)
+
+# Inflections trimmed from search_tickets words to form the prefix matched
+# alongside the exact word, longest first
+SEARCH_SUFFIXES = ('ures', 'ure', 'ings', 'ing', 'ions', 'ion', 'ed', 'es', 's')
+
+# Result size bounds for find_similar_resolved_tickets, and how many of the
+# most similar tickets (any status) are checked for resolved ones
+DEFAULT_SIMILAR_TICKETS = 5
+MAX_SIMILAR_TICKETS = 20
+SIMILAR_CANDIDATES = 1000
+
+# Longest date range ticket_stats will break down by day
+MAX_STATS_DAYS = 366
+
+# Result size bounds for set queries
+DEFAULT_SET_QUERY_LIMIT = 50
+MAX_SET_QUERY_LIMIT = 500
+
+READ_ONLY_TOOLS = {tool["name"] for tool in MCP_TOOLS if tool["annotations"]["readOnlyHint"]}
+
+
+def configure_pool(pool_size: Optional[int] = None, pragmas: Optional[Dict[str, Any]] = None,
+                   slow_query_threshold: Optional[float] = None, **options: Any) -> ConnectionPool:
+    """(Re)create the shared connection pool with the given settings.
+
+    Args:
+        pool_size: Maximum number of pooled connections
+        pragmas: SQLite pragma overrides, e.g. {"cache_size": -64000}
+        slow_query_threshold: Seconds from which statements are logged (see
+            db_pool.SlowQueryLog); 0 turns statement timing off
+        options: Extra ConnectionPool arguments (timeout, cached_statements,
+            slow_query_log)
+    """
+    global _pool, DB_POOL_SIZE, DB_PRAGMAS, SLOW_QUERY_THRESHOLD
+    if pool_size is not None:
+        DB_POOL_SIZE = pool_size
+    if pragmas is not None:
+        DB_PRAGMAS = pragmas
+    if slow_query_threshold is not None:
+        SLOW_QUERY_THRESHOLD = slow_query_threshold
+    if _pool is not None:
+        _pool.close()
+    if SLOW_QUERY_THRESHOLD > 0:
+        options.setdefault("slow_query_log", SlowQueryLog(SLOW_QUERY_THRESHOLD))
+    _pool = ConnectionPool(DB_PATH, pool_size=DB_POOL_SIZE, pragmas=DB_PRAGMAS, **options)
+    return _pool
+
+
+def configure_cache(max_entries: int = 1024, ttl: float = 30.0, coalesce_reads: bool = True) -> ResultCache:
+    """Replace the tool result cache. max_entries=0 disables caching.
+
+    With coalesce_reads, identical read calls running at the same time share
+    one execution, whether or not caching is enabled.
+    """
+    global result_cache, read_flights
+    result_cache = ResultCache(max_entries=max_entries, ttl=ttl)
+    read_flights = SingleFlight() if coalesce_reads else None
+    return result_cache
+
+
+def configure_write_queue(max_batch: int = 64, max_delay: float = 0.001) -> Optional[WriteQueue]:
+    """(Re)create the group-commit write queue. max_batch=0 disables it.
+
+    Args:
+        max_batch: Most write tool calls committed in one transaction
+        max_delay: Seconds the writer waits for more calls after the first
+    """
+    global write_queue
+    if write_queue is not None:
+        write_queue.close()
+    write_queue = WriteQueue(get_db_connection, max_batch=max_batch, max_delay=max_delay) if max_batch > 0 else None
+    return write_queue
+
+
+def build_similarity_index() -> threading.Thread:
+    """Index existing tickets for find_similar_resolved_tickets on a background thread.
+
+    Called at server startup so the first call does not pay for the initial
+    build; calls made while it runs wait for it rather than building again.
+    """
+    thread = threading.Thread(target=similarity_index.sync, args=(get_db_connection,),
+                              name="similarity-index", daemon=True)
+    thread.start()
+    return thread
+
+
+def enable_shared_invalidation(min_interval: float = 0.05) -> CacheInvalidationLog:
+    """Share cache invalidations with other server processes using DB_PATH.
+
+    Another process's writes reach this cache within min_interval seconds.
+    """
+    global invalidation_log
+    invalidation_log = CacheInvalidationLog(get_db_connection, origin=os.getpid(), min_interval=min_interval)
+    return invalidation_log
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared connection pool, creating it on first use."""
+    if _pool is None:
+        return configure_pool()
+    return _pool
+
 
 def get_db_connection():
-    """Create a database connection."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Borrow a pooled database connection for use in a with-block."""
+    return get_pool().connection()
+
+
+def row_to_dict(row: sqlite3.Row, keys: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Convert a SQLite row to a dictionary, optionally keeping only some keys."""
+    return {key: row[key] for key in (keys or row.keys())}
+
+
+def projected_columns(fields: Optional[List[str]], allowed: Tuple[str, ...]) -> List[str]:
+    """Validate a fields argument against a column whitelist.
+
+    Returns the requested columns without duplicates, or all of allowed when
+    fields is None. The result is safe to interpolate into a SELECT list.
+    """
+    if fields is None:
+        return list(allowed)
+    if not isinstance(fields, list) or not fields or any(field not in allowed for field in fields):
+        raise ValueError(f'fields must be a non-empty list of: {", ".join(allowed)}')
+    return list(dict.fromkeys(fields))
+
+
+def hidden_keys(rows: List[sqlite3.Row], hidden: List[str]) -> Optional[List[str]]:
+    """Keys to return for rows whose SELECT added hidden keyset columns."""
+    if not hidden or not rows:
+        return None
+    return [key for key in rows[0].keys() if key not in hidden]
+
+
+def encode_cursor(kind: str, values: List[Any]) -> str:
+    """Encode a keyset position as an opaque continuation cursor."""
+    payload = json.dumps({"k": kind, "v": values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
 
+def decode_cursor(kind: str, cursor: str, types: Tuple[Any, ...]) -> List[Any]:
+    """Decode a cursor produced by encode_cursor for the same kind of listing.
+
+    types holds the expected type (or tuple of types) of each value, so a
+    cursor of the wrong shape raises ValueError('Invalid cursor') here rather
+    than failing where its values are unpacked or bound.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values = payload["v"]
+        if payload["k"] != kind or not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        if any(isinstance(value, bool) or not isinstance(value, expected)
+               for value, expected in zip(values, types)):
+            raise ValueError
+        return values
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError('Invalid cursor')
 
-def row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
-    """Convert a SQLite row to a dictionary."""
-    return {key: row[key] for key in row.keys()}
+
+def page_size(limit: Optional[int]) -> int:
+    """Clamp a requested page size to the server's bounds."""
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
 
 
 # Tool Implementations
 
-def get_customer(customer_id: int) -> Dict[str, Any]:
+def customer_columns(table: str = 'customers', columns: Tuple[str, ...] = CUSTOMER_COLUMNS) -> str:
+    """Return customer columns qualified with a table name or alias, for a SELECT list."""
+    return ', '.join(f'{table}.{column}' for column in columns)
+
+
+def customer_select(include_ticket_stats: bool = False, columns: Tuple[str, ...] = CUSTOMER_COLUMNS) -> str:
+    """Return the SELECT ... FROM clause for customer rows.
+
+    With include_ticket_stats the trigger-maintained counters are attached by
+    a primary-key lookup in customer_ticket_stats, so no tickets are read.
+    columns must already be validated (see projected_columns).
+    """
+    if not include_ticket_stats:
+        return f'SELECT {customer_columns(columns=columns)} FROM customers'
+    counters = ', '.join(f'COALESCE(s.{column}, 0) AS {column}' for column in TICKET_STATS_COUNTERS)
+    return (f'SELECT {customer_columns(columns=columns)}, {counters}, s.last_ticket_at FROM customers '
+            'LEFT JOIN customer_ticket_stats s ON s.customer_id = customers.id')
+
+
+def get_customer(customer_id: int, include_ticket_stats: bool = False,
+                 fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Retrieve a specific customer by ID."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
-        row = cursor.fetchone()
-        conn.close()
+        try:
+            columns = projected_columns(fields, CUSTOMER_COLUMNS)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(customer_select(include_ticket_stats, tuple(columns)) + ' WHERE customers.id = ?',
+                           (customer_id,))
+            row = cursor.fetchone()
         
         if row:
             return {
@@ -147,14 +691,23 @@ def get_customer(customer_id: int) -> Dict[str, Any]:
         }
 
 
-def list_customers(status: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
-    """List all customers, optionally filtered by status."""
+def list_customers(status: Optional[str] = None, limit: Optional[int] = None,
+                   cursor: Optional[str] = None, include_ticket_stats: bool = False,
+                   fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """List customers ordered by name, one keyset page at a time."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        conditions = []
+        params: List[Any] = []
         
-        query = 'SELECT * FROM customers'
-        params = []
+        try:
+            columns = projected_columns(fields, CUSTOMER_COLUMNS)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        # The cursor needs (name, id) even when they were not requested
+        hidden = [column for column in ('name', 'id') if column not in columns]
         
         if status:
             if status not in ['active', 'disabled']:
@@ -162,25 +715,46 @@ def list_customers(status: Optional[str] = None, limit: Optional[int] = None) ->
                     'success': False,
                     'error': 'Status must be "active" or "disabled"'
                 }
-            query += ' WHERE status = ?'
+            conditions.append('status = ?')
             params.append(status)
         
-        query += ' ORDER BY name'
+        if cursor:
+            try:
+                after_name, after_id = decode_cursor('customers', cursor, CUSTOMER_CURSOR)
+            except ValueError as e:
+                return {
+                    'success': False,
+                    'error': str(e)
+                }
+            conditions.append('(name, id) > (?, ?)')
+            params.extend([after_name, after_id])
         
-        if limit:
-            query += ' LIMIT ?'
-            params.append(limit)
+        size = page_size(limit)
+        query = customer_select(include_ticket_stats, tuple(columns + hidden))
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        # (name, id) is a total order, and the name indexes carry id as their
+        # rowid suffix, so each page is a single index range scan. Without
+        # ticket stats, fields drawn from id, name and status are read from
+        # the index alone.
+        query += ' ORDER BY name, id LIMIT ?'
+        params.append(size + 1)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        with get_db_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
         
-        customers = [row_to_dict(row) for row in rows]
+        has_more = len(rows) > size
+        page = rows[:size]
+        keys = hidden_keys(page, hidden)
+        customers = [row_to_dict(row, keys) for row in page]
+        last = page[-1] if page else None
         
         return {
             'success': True,
             'count': len(customers),
-            'customers': customers
+            'customers': customers,
+            'has_more': has_more,
+            'next_cursor': encode_cursor('customers', [last['name'], last['id']]) if has_more else None
         }
     except Exception as e:
         return {
@@ -189,21 +763,58 @@ def list_customers(status: Optional[str] = None, limit: Optional[int] = None) ->
         }
 
 
-def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+def idempotent_write(tool_name: str, idempotency_key: Optional[str], arguments: Dict[str, Any],
+                     write: Callable[[sqlite3.Connection], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run a write tool's statement at most once per idempotency key.
+
+    Without a key, write runs as a single autocommit statement. With one, the
+    key lookup, the write and storing its result share a transaction (a
+    savepoint inside a write queue batch), so a retry either replays the
+    committed result or performs the write itself. A key is bound to the tool
+    and its arguments; only successful results are stored, so a failed call
+    can be retried under the same key.
+    """
+    if idempotency_key is None:
+        with get_db_connection() as conn:
+            return write(conn)
+    
+    if not isinstance(idempotency_key, str) or not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        return {
+            'success': False,
+            'error': f'idempotency_key must be a string of 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters'
+        }
+    request_hash = hashlib.sha256(
+        json.dumps([tool_name, arguments], sort_keys=True, separators=(',', ':')).encode()
+    ).hexdigest()
+    expiry = f'-{IDEMPOTENCY_TTL} seconds'
+    
+    with get_db_connection() as conn, transaction(conn):
+        row = conn.execute(
+            "SELECT request_hash, result FROM idempotency_keys WHERE key = ? AND created_at > datetime('now', ?)",
+            (idempotency_key, expiry)
+        ).fetchone()
+        if row is not None:
+            if row['request_hash'] != request_hash:
+                return {
+                    'success': False,
+                    'error': 'idempotency_key was already used for a different request'
+                }
+            return {**json.loads(row['result']), 'idempotent_replay': True}
+        
+        result = write(conn)
+        if result.get('success'):
+            # The idempotency_keys_expire trigger deletes expired keys
+            conn.execute(
+                'INSERT OR REPLACE INTO idempotency_keys (key, tool, request_hash, result) VALUES (?, ?, ?, ?)',
+                (idempotency_key, tool_name, request_hash, json.dumps(result))
+            )
+        return result
+
+
+def update_customer(customer_id: int, data: Dict[str, Any],
+                    idempotency_key: Optional[str] = None) -> Dict[str, Any]:
     """Update customer information."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if customer exists
-        cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
-        if not cursor.fetchone():
-            conn.close()
-            return {
-                'success': False,
-                'error': f'Customer with ID {customer_id} not found'
-            }
-        
         # Build update query
         updates = []
         params = []
@@ -214,7 +825,6 @@ def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
                 params.append(data[field])
         
         if not updates:
-            conn.close()
             return {
                 'success': False,
                 'error': 'No fields to update'
@@ -224,21 +834,30 @@ def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
         updates.append('updated_at = CURRENT_TIMESTAMP')
         params.append(customer_id)
         
+        # One statement: the WHERE clause doubles as the existence check and
+        # RETURNING replaces the re-SELECT. fetchall() steps the statement to
+        # completion so the write lock is released immediately.
         update_clause = ', '.join(updates)
-        query = f'UPDATE customers SET {update_clause} WHERE id = ?'
-        cursor.execute(query, params)
-        conn.commit()
         
-        # Fetch updated customer
-        cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
-        row = cursor.fetchone()
-        conn.close()
+        def write(conn: sqlite3.Connection) -> Dict[str, Any]:
+            rows = conn.execute(
+                f'UPDATE customers SET {update_clause} WHERE id = ? RETURNING {customer_columns()}', params
+            ).fetchall()
+            
+            if not rows:
+                return {
+                    'success': False,
+                    'error': f'Customer with ID {customer_id} not found'
+                }
+            
+            return {
+                'success': True,
+                'message': f'Customer {customer_id} updated successfully',
+                'customer': row_to_dict(rows[0])
+            }
         
-        return {
-            'success': True,
-            'message': f'Customer {customer_id} updated successfully',
-            'customer': row_to_dict(row)
-        }
+        return idempotent_write('update_customer', idempotency_key,
+                                {'customer_id': customer_id, 'data': data}, write)
     except Exception as e:
         return {
             'success': False,
@@ -246,7 +865,8 @@ def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
-def create_ticket(customer_id: int, issue: str, priority: str) -> Dict[str, Any]:
+def create_ticket(customer_id: int, issue: str, priority: str,
+                  idempotency_key: Optional[str] = None) -> Dict[str, Any]:
     """Create a new support ticket."""
     try:
         if priority not in ['low', 'medium', 'high']:
@@ -255,37 +875,32 @@ def create_ticket(customer_id: int, issue: str, priority: str) -> Dict[str, Any]
                 'error': 'Priority must be "low", "medium", or "high"'
             }
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if customer exists
-        cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
-        if not cursor.fetchone():
-            conn.close()
+        def write(conn: sqlite3.Connection) -> Dict[str, Any]:
+            # The customers foreign key performs the existence check
+            try:
+                rows = conn.execute('''
+                    INSERT INTO tickets (customer_id, issue, status, priority)
+                    VALUES (?, ?, 'open', ?)
+                    RETURNING *
+                ''', (customer_id, issue, priority)).fetchall()
+            except sqlite3.IntegrityError as e:
+                if 'FOREIGN KEY' not in str(e):
+                    raise
+                return {
+                    'success': False,
+                    'error': f'Customer with ID {customer_id} not found'
+                }
+            
+            ticket = row_to_dict(rows[0])
+            
             return {
-                'success': False,
-                'error': f'Customer with ID {customer_id} not found'
+                'success': True,
+                'message': f'Ticket #{ticket["id"]} created successfully',
+                'ticket': ticket
             }
         
-        # Create ticket
-        cursor.execute('''
-            INSERT INTO tickets (customer_id, issue, status, priority)
-            VALUES (?, ?, 'open', ?)
-        ''', (customer_id, issue, priority))
-        
-        ticket_id = cursor.lastrowid
-        conn.commit()
-        
-        # Fetch the created ticket
-        cursor.execute('SELECT * FROM tickets WHERE id = ?', (ticket_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
-        return {
-            'success': True,
-            'message': f'Ticket #{ticket_id} created successfully',
-            'ticket': row_to_dict(row)
-        }
+        return idempotent_write('create_ticket', idempotency_key,
+                                {'customer_id': customer_id, 'issue': issue, 'priority': priority}, write)
     except Exception as e:
         return {
             'success': False,
@@ -293,39 +908,535 @@ def create_ticket(customer_id: int, issue: str, priority: str) -> Dict[str, Any]
         }
 
 
-def get_customer_history(customer_id: int) -> Dict[str, Any]:
-    """Get all tickets for a customer."""
+def get_customer_history(customer_id: int, limit: Optional[int] = None,
+                         cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get a customer's tickets, newest first, one keyset page at a time."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if customer exists
-        cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
-        customer_row = cursor.fetchone()
-        
-        if not customer_row:
-            conn.close()
+        try:
+            columns = projected_columns(fields, TICKET_COLUMNS)
+        except ValueError as e:
             return {
                 'success': False,
-                'error': f'Customer with ID {customer_id} not found'
+                'error': str(e)
             }
+        # The cursor needs (created_at, id) even when they were not requested
+        hidden = [column for column in ('created_at', 'id') if column not in columns]
+        select_list = ', '.join(columns + hidden)
         
-        # Get all tickets for this customer
-        cursor.execute('''
-            SELECT * FROM tickets
-            WHERE customer_id = ?
-            ORDER BY created_at DESC
-        ''', (customer_id,))
+        params: List[Any] = [customer_id]
+        keyset = ''
+        if cursor:
+            try:
+                before_created, before_id = decode_cursor('tickets', cursor, TICKET_CURSOR)
+            except ValueError as e:
+                return {
+                    'success': False,
+                    'error': str(e)
+                }
+            keyset = ' AND (created_at, id) < (?, ?)'
+            params.extend([before_created, before_id])
         
-        ticket_rows = cursor.fetchall()
-        conn.close()
+        size = page_size(limit)
+        params.append(size + 1)
         
-        tickets = [row_to_dict(row) for row in ticket_rows]
+        with get_db_connection() as conn:
+            # Check if customer exists
+            customer_row = conn.execute(
+                customer_select() + ' WHERE customers.id = ?', (customer_id,)
+            ).fetchone()
+            
+            if not customer_row:
+                return {
+                    'success': False,
+                    'error': f'Customer with ID {customer_id} not found'
+                }
+            
+            # Walk idx_tickets_customer_created backwards from the cursor;
+            # fields drawn from id, customer_id and created_at need no table
+            # lookups
+            ticket_rows = conn.execute(f'''
+                SELECT {select_list} FROM tickets
+                WHERE customer_id = ?{keyset}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            ''', params).fetchall()
+        
+        has_more = len(ticket_rows) > size
+        page = ticket_rows[:size]
+        keys = hidden_keys(page, hidden)
+        tickets = [row_to_dict(row, keys) for row in page]
+        last = page[-1] if page else None
         
         return {
             'success': True,
             'customer': row_to_dict(customer_row),
             'ticket_count': len(tickets),
+            'tickets': tickets,
+            'has_more': has_more,
+            'next_cursor': encode_cursor('tickets', [last['created_at'], last['id']]) if has_more else None
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }
+
+
+def _validate_customer_ids(customer_ids: List[int]) -> Optional[str]:
+    """Return an error message if customer_ids is unusable for a batch lookup."""
+    if not isinstance(customer_ids, list) or not customer_ids:
+        return 'customer_ids must be a non-empty list of integers'
+    if any(not isinstance(cid, int) or isinstance(cid, bool) for cid in customer_ids):
+        return 'customer_ids must be a non-empty list of integers'
+    if len(customer_ids) > MAX_BATCH_IDS:
+        return f'At most {MAX_BATCH_IDS} customer IDs can be requested at once'
+    return None
+
+
+def get_customers_batch(customer_ids: List[int]) -> Dict[str, Any]:
+    """Retrieve several customers by ID with a single query."""
+    try:
+        error = _validate_customer_ids(customer_ids)
+        if error:
+            return {
+                'success': False,
+                'error': error
+            }
+        
+        ids = list(dict.fromkeys(customer_ids))
+        placeholders = ', '.join('?' * len(ids))
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(customer_select() + f' WHERE customers.id IN ({placeholders})', ids)
+            rows = cursor.fetchall()
+        
+        found = {row['id']: row_to_dict(row) for row in rows}
+        
+        return {
+            'success': True,
+            'count': len(found),
+            'customers': [found[cid] for cid in ids if cid in found],
+            'not_found': [cid for cid in ids if cid not in found]
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }
+
+
+def _phone_candidates(phone: str) -> List[str]:
+    """Return the phone_normalized values a phone number may be stored as.
+
+    Normalized exactly as customers.phone_normalized is (PHONE_SEPARATORS
+    stripped, lowercased); a plain number given without a leading + may also
+    be stored with the default country code 1.
+    """
+    normalized = phone.translate(PHONE_SEPARATOR_TABLE).lower()
+    if not any(char.isdigit() for char in normalized):
+        return []
+    if phone.strip().startswith('+') or normalized.startswith('1') or not normalized.isdigit():
+        return [normalized]
+    return [normalized, '1' + normalized]
+
+
+def find_customer(email: Optional[str] = None, phone: Optional[str] = None,
+                  name_prefix: Optional[str] = None, status: Optional[str] = None,
+                  limit: Optional[int] = None) -> Dict[str, Any]:
+    """Find customers by exact email, normalized phone and/or name prefix, using an index for each."""
+    try:
+        conditions = []
+        params: List[Any] = []
+        
+        if email is not None and email.strip():
+            # Stored addresses are usually lowercase; both spellings are index seeks
+            candidates = list(dict.fromkeys([email.strip(), email.strip().lower()]))
+            conditions.append(f"email IN ({', '.join('?' * len(candidates))})")
+            params.extend(candidates)
+        
+        if phone is not None:
+            candidates = _phone_candidates(phone)
+            if not candidates:
+                return {
+                    'success': False,
+                    'error': 'phone must contain digits'
+                }
+            conditions.append(f"phone_normalized IN ({', '.join('?' * len(candidates))})")
+            params.extend(candidates)
+        
+        if name_prefix is not None and name_prefix.strip():
+            # A range over the NOCASE index rather than LIKE, so the prefix
+            # needs no escaping and the plan does not depend on the pattern
+            prefix = name_prefix.strip()
+            conditions.append('name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE')
+            params.extend([prefix, prefix + '\U0010ffff'])
+        
+        if not conditions:
+            return {
+                'success': False,
+                'error': 'Provide at least one of email, phone or name_prefix'
+            }
+        
+        if status:
+            # Unary + keeps the planner on the selective lookup above instead
+            # of walking every customer with this status
+            conditions.append('+status = ?')
+            params.append(status)
+        
+        limit = max(1, min(limit or DEFAULT_FIND_CUSTOMER_LIMIT, MAX_FIND_CUSTOMER_LIMIT))
+        params.append(limit + 1)
+        
+        with get_db_connection() as conn:
+            rows = conn.execute(f'''
+                {customer_select()}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY name COLLATE NOCASE, id
+                LIMIT ?
+            ''', params).fetchall()
+        
+        customers = [row_to_dict(row) for row in rows[:limit]]
+        
+        return {
+            'success': True,
+            'count': len(customers),
+            'customers': customers,
+            'truncated': len(rows) > limit
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }
+
+
+def get_customer_histories_batch(customer_ids: List[int], ticket_status: Optional[str] = None) -> Dict[str, Any]:
+    """Get ticket histories for several customers with a single join query."""
+    try:
+        error = _validate_customer_ids(customer_ids)
+        if error:
+            return {
+                'success': False,
+                'error': error
+            }
+        if ticket_status and ticket_status not in ['open', 'in_progress', 'resolved']:
+            return {
+                'success': False,
+                'error': 'Ticket status must be "open", "in_progress", or "resolved"'
+            }
+        
+        ids = list(dict.fromkeys(customer_ids))
+        placeholders = ', '.join('?' * len(ids))
+        
+        # The status filter lives in the ON clause so customers without
+        # matching tickets still come back with an empty history.
+        join_filter = ' AND t.status = ?' if ticket_status else ''
+        params = ([ticket_status] if ticket_status else []) + ids
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT c.id, c.name, c.email, c.phone, c.status,
+                       c.created_at, c.updated_at,
+                       t.id AS ticket_id, t.issue, t.status AS ticket_status,
+                       t.priority, t.created_at AS ticket_created_at
+                FROM customers c
+                LEFT JOIN tickets t ON t.customer_id = c.id{join_filter}
+                WHERE c.id IN ({placeholders})
+                ORDER BY c.id, t.created_at DESC
+            ''', params)
+            rows = cursor.fetchall()
+        
+        histories: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            history = histories.get(row['id'])
+            if history is None:
+                history = histories[row['id']] = {
+                    'customer': {
+                        'id': row['id'],
+                        'name': row['name'],
+                        'email': row['email'],
+                        'phone': row['phone'],
+                        'status': row['status'],
+                        'created_at': row['created_at'],
+                        'updated_at': row['updated_at']
+                    },
+                    'ticket_count': 0,
+                    'tickets': []
+                }
+            if row['ticket_id'] is not None:
+                history['tickets'].append({
+                    'id': row['ticket_id'],
+                    'customer_id': row['id'],
+                    'issue': row['issue'],
+                    'status': row['ticket_status'],
+                    'priority': row['priority'],
+                    'created_at': row['ticket_created_at']
+                })
+                history['ticket_count'] += 1
+        
+        return {
+            'success': True,
+            'count': len(histories),
+            'histories': [histories[cid] for cid in ids if cid in histories],
+            'not_found': [cid for cid in ids if cid not in histories]
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }
+
+
+def _parse_timestamp(value: str) -> str:
+    """Normalize an ISO date/time string to the format SQLite stores."""
+    return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def find_customers_by_tickets(customer_status: Optional[str] = None, ticket_status: Optional[str] = None,
+                              priority: Optional[str] = None, created_after: Optional[str] = None,
+                              created_before: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Find distinct customers with tickets matching the filters, in one query."""
+    try:
+        if customer_status and customer_status not in ['active', 'disabled']:
+            return {
+                'success': False,
+                'error': 'Customer status must be "active" or "disabled"'
+            }
+        if ticket_status and ticket_status not in ['open', 'in_progress', 'resolved']:
+            return {
+                'success': False,
+                'error': 'Ticket status must be "open", "in_progress", or "resolved"'
+            }
+        if priority and priority not in ['low', 'medium', 'high']:
+            return {
+                'success': False,
+                'error': 'Priority must be "low", "medium", or "high"'
+            }
+        
+        conditions = []
+        params: List[Any] = []
+        
+        # idx_tickets_status_priority_created only bounds a date range when
+        # status and priority are fixed, so without those filters a date range
+        # is expanded over every status/priority value: one bounded range
+        # each, instead of scanning the whole status (or table) range
+        dated = bool(created_after or created_before)
+        if ticket_status:
+            conditions.append('t.status = ?')
+            params.append(ticket_status)
+        elif dated:
+            conditions.append("t.status IN ('open', 'in_progress', 'resolved')")
+        if priority:
+            conditions.append('t.priority = ?')
+            params.append(priority)
+        elif dated:
+            conditions.append("t.priority IN ('low', 'medium', 'high')")
+        try:
+            if created_after:
+                conditions.append('t.created_at >= ?')
+                params.append(_parse_timestamp(created_after))
+            if created_before:
+                conditions.append('t.created_at < ?')
+                params.append(_parse_timestamp(created_before))
+        except ValueError:
+            return {
+                'success': False,
+                'error': 'created_after and created_before must be ISO dates, e.g. 2025-01-31'
+            }
+        if customer_status:
+            conditions.append('c.status = ?')
+            params.append(customer_status)
+        
+        limit = max(1, min(DEFAULT_SET_QUERY_LIMIT if limit is None else limit, MAX_SET_QUERY_LIMIT))
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        # Drive the join from the ticket index so only matching tickets are
+        # visited; GROUP BY collapses them to one row per customer.
+        query = f'''
+            SELECT {customer_columns('c')}, COUNT(*) AS matching_tickets,
+                   MAX(t.created_at) AS latest_ticket_at
+            FROM tickets t
+            JOIN customers c ON c.id = t.customer_id
+            {where_clause}
+            GROUP BY c.id
+            ORDER BY c.name, c.id
+            LIMIT ?
+        '''
+        params.append(limit + 1)
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+        customers = [row_to_dict(row) for row in rows[:limit]]
+        
+        return {
+            'success': True,
+            'count': len(customers),
+            'truncated': len(rows) > limit,
+            'customers': customers
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }
+
+
+def _search_root(word: str) -> str:
+    """Trim a common inflection from a search word, keeping at least 3 letters.
+
+    The porter tokenizer does not stem every form of a word to the same token
+    ('failures' becomes 'failur' but 'failed' becomes 'fail'), so searches also
+    match the trimmed root as a prefix instead of relying on the stem alone.
+    """
+    word = word.lower()
+    for suffix in SEARCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            # Keep the s of words like 'access', 'status' and 'analysis'
+            if suffix == 's' and word[-2] in 'siu':
+                continue
+            return word[:-len(suffix)]
+    return word
+
+
+def _fts_term(word: str) -> str:
+    """Match a word exactly, or by its trimmed root as a prefix.
+
+    The root alone over-broadens some words ('string' would match 'strap' and
+    'stream'), so the exact term is kept alongside it and bm25 ranks the
+    tickets containing it first.
+    """
+    word = word.lower()
+    root = _search_root(word)
+    if root == word:
+        return f'"{word}"'
+    return f'("{word}" OR "{root}"*)'
+
+
+def _fts_query(text: str, match: str) -> str:
+    """Turn free text into an FTS5 query of quoted terms, so punctuation and
+    FTS5 operators in the input are matched literally instead of parsed."""
+    terms = [_fts_term(term) for term in re.findall(r'\w+', text)]
+    return (' OR ' if match == 'any' else ' AND ').join(terms)
+
+
+def search_tickets(query: str, match: Optional[str] = None, status: Optional[str] = None,
+                   priority: Optional[str] = None, limit: Optional[int] = None,
+                   cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Search ticket issues through the tickets_fts index, ranked by bm25."""
+    try:
+        fts_query = _fts_query(query, match or 'all')
+        if not fts_query:
+            return {
+                'success': False,
+                'error': 'Query must contain at least one word'
+            }
+        if status and status not in ['open', 'in_progress', 'resolved']:
+            return {
+                'success': False,
+                'error': 'Status must be "open", "in_progress", or "resolved"'
+            }
+        if priority and priority not in ['low', 'medium', 'high']:
+            return {
+                'success': False,
+                'error': 'Priority must be "low", "medium", or "high"'
+            }
+        
+        # Relevance changes as tickets are added, so there is no stable key
+        # to seek from; the cursor carries an offset tied to the query and
+        # its filters.
+        search = [fts_query, status, priority]
+        offset = 0
+        if cursor:
+            try:
+                *cursor_search, offset = decode_cursor('search_tickets', cursor, SEARCH_CURSOR)
+                if cursor_search != search or offset < 0:
+                    raise ValueError('Invalid cursor')
+            except ValueError as e:
+                return {
+                    'success': False,
+                    'error': str(e)
+                }
+        
+        conditions = ['tickets_fts MATCH ?']
+        params: List[Any] = [fts_query]
+        if status:
+            conditions.append('t.status = ?')
+            params.append(status)
+        if priority:
+            conditions.append('t.priority = ?')
+            params.append(priority)
+        
+        size = page_size(limit)
+        sql = f'''
+            SELECT t.*, -bm25(tickets_fts) AS score
+            FROM tickets_fts
+            JOIN tickets t ON t.id = tickets_fts.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY bm25(tickets_fts), t.id
+            LIMIT ? OFFSET ?
+        '''
+        params.extend([size + 1, offset])
+        
+        with get_db_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        
+        has_more = len(rows) > size
+        tickets = [row_to_dict(row) for row in rows[:size]]
+        for ticket in tickets:
+            ticket['score'] = round(ticket['score'], 4)
+        
+        return {
+            'success': True,
+            'count': len(tickets),
+            'tickets': tickets,
+            'has_more': has_more,
+            'next_cursor': encode_cursor('search_tickets', search + [offset + size]) if has_more else None
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }
+
+
+def find_similar_resolved_tickets(issue: str, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Return the resolved tickets most similar to an issue by TF-IDF cosine similarity."""
+    try:
+        limit = max(1, min(limit or DEFAULT_SIMILAR_TICKETS, MAX_SIMILAR_TICKETS))
+        tickets: List[Dict[str, Any]] = []
+        
+        # Catches up with new tickets and edited issues; the initial build
+        # normally ran at startup (see build_similarity_index)
+        similarity_index.sync(get_db_connection)
+        candidates = similarity_index.top_candidates(issue, SIMILAR_CANDIDATES)
+        
+        with get_db_connection() as conn, read_snapshot(conn):
+            # The index covers every ticket; status is checked here so tickets
+            # resolved after they were indexed are still found. The unary +
+            # keeps these rowid lookups off the status index, which would walk
+            # every resolved ticket
+            for start in range(0, len(candidates), MAX_BATCH_IDS):
+                chunk = candidates[start:start + MAX_BATCH_IDS]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT * FROM tickets WHERE id IN ({placeholders}) AND +status = 'resolved'",
+                    [ticket_id for ticket_id, _ in chunk]
+                ).fetchall()
+                resolved = {row['id']: row_to_dict(row) for row in rows}
+                for ticket_id, similarity in chunk:
+                    if ticket_id in resolved:
+                        tickets.append({**resolved[ticket_id], 'similarity': round(similarity, 4)})
+                if len(tickets) >= limit:
+                    break
+        
+        tickets = tickets[:limit]
+        return {
+            'success': True,
+            'count': len(tickets),
             'tickets': tickets
         }
     except Exception as e:
@@ -335,15 +1446,317 @@ def get_customer_history(customer_id: int) -> Dict[str, Any]:
         }
 
 
+def ticket_stats(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 group_by: Optional[List[str]] = None, status: Optional[str] = None,
+                 priority: Optional[str] = None) -> Dict[str, Any]:
+    """Count tickets per status/priority/day by summing ticket_daily_stats buckets."""
+    try:
+        group_by = list(dict.fromkeys(group_by or []))
+        if any(column not in ['status', 'priority', 'day'] for column in group_by):
+            return {
+                'success': False,
+                'error': 'group_by may only contain "status", "priority" and "day"'
+            }
+        if status and status not in ['open', 'in_progress', 'resolved']:
+            return {
+                'success': False,
+                'error': 'Status must be "open", "in_progress", or "resolved"'
+            }
+        if priority and priority not in ['low', 'medium', 'high']:
+            return {
+                'success': False,
+                'error': 'Priority must be "low", "medium", or "high"'
+            }
+        try:
+            start = datetime.fromisoformat(start_date).date() if start_date else None
+            end = datetime.fromisoformat(end_date).date() if end_date else None
+        except ValueError:
+            return {
+                'success': False,
+                'error': 'start_date and end_date must be ISO dates, e.g. 2025-01-31'
+            }
+        if start and end and start > end:
+            return {
+                'success': False,
+                'error': 'start_date must not be after end_date'
+            }
+        if 'day' in group_by and (not start or not end or (end - start).days >= MAX_STATS_DAYS):
+            return {
+                'success': False,
+                'error': f'Grouping by day needs start_date and end_date at most {MAX_STATS_DAYS} days apart'
+            }
+        
+        conditions = []
+        params: List[Any] = []
+        if start:
+            conditions.append('day >= ?')
+            params.append(start.isoformat())
+        if end:
+            conditions.append('day <= ?')
+            params.append(end.isoformat())
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        if priority:
+            conditions.append('priority = ?')
+            params.append(priority)
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        columns = ''.join(f'{column}, ' for column in group_by)
+        grouping = f"GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else ''
+        # The (day, status, priority) primary key turns the date range into
+        # one range scan over at most 9 buckets per day
+        query = f'''
+            SELECT {columns}SUM(ticket_count) AS ticket_count
+            FROM ticket_daily_stats
+            {where_clause}
+            {grouping}
+        '''
+        
+        with get_db_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        groups = [row_to_dict(row) for row in rows if row['ticket_count']]
+        
+        return {
+            'success': True,
+            'start_date': start.isoformat() if start else None,
+            'end_date': end.isoformat() if end else None,
+            'group_by': group_by,
+            'total': sum(group['ticket_count'] for group in groups),
+            'groups': groups
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Database error: {str(e)}'
+        }
+
+
+# Streaming Tool Variants
+#
+# Each returns (summary, chunks). chunks lazily walks a live SQLite cursor and
+# yields lists of at most STREAM_CHUNK_SIZE row dicts, so memory stays flat
+# regardless of result size. On invalid input chunks is None and summary holds
+# the error.
+
+StreamResult = Tuple[Dict[str, Any], Optional[Iterator[List[Dict[str, Any]]]]]
+
+
+def _iter_row_chunks(query: str, params: List[Any],
+                     header: Optional[Tuple[str, List[Any]]] = None) -> Iterator[Any]:
+    """Yield query results in chunks, holding one pooled connection throughout.
+
+    With header, a single-row (query, params) pair, its row is yielded first
+    (as a dict, or None when there is none) from the same read snapshot as
+    the chunks, so the two always agree.
+    """
+    with get_db_connection() as conn, read_snapshot(conn):
+        if header is not None:
+            row = conn.execute(*header).fetchone()
+            yield row_to_dict(row) if row else None
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(STREAM_CHUNK_SIZE)
+            if not rows:
+                return
+            yield [row_to_dict(row) for row in rows]
+
+
+def stream_list_customers(status: Optional[str] = None, limit: Optional[int] = None,
+                          cursor: Optional[str] = None, include_ticket_stats: bool = False,
+                          fields: Optional[List[str]] = None) -> StreamResult:
+    """Streaming variant of list_customers with no page-size cap."""
+    conditions = []
+    params: List[Any] = []
+    
+    if limit is not None and limit < 1:
+        return {
+            'success': False,
+            'error': 'limit must be at least 1'
+        }, None
+    try:
+        columns = projected_columns(fields, CUSTOMER_COLUMNS)
+    except ValueError as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }, None
+    
+    if status:
+        if status not in ['active', 'disabled']:
+            return {
+                'success': False,
+                'error': 'Status must be "active" or "disabled"'
+            }, None
+        conditions.append('status = ?')
+        params.append(status)
+    
+    if cursor:
+        try:
+            after_name, after_id = decode_cursor('customers', cursor, CUSTOMER_CURSOR)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }, None
+        conditions.append('(name, id) > (?, ?)')
+        params.extend([after_name, after_id])
+    
+    query = customer_select(include_ticket_stats, tuple(columns))
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY name, id LIMIT ?'
+    params.append(-1 if limit is None else limit)
+    
+    return {'success': True}, _iter_row_chunks(query, params)
+
+
+def stream_customer_history(customer_id: int, limit: Optional[int] = None,
+                            cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> StreamResult:
+    """Streaming variant of get_customer_history with no page-size cap.
+
+    The customer header and the tickets are read from one snapshot.
+    """
+    if limit is not None and limit < 1:
+        return {
+            'success': False,
+            'error': 'limit must be at least 1'
+        }, None
+    try:
+        columns = projected_columns(fields, TICKET_COLUMNS)
+    except ValueError as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }, None
+    
+    params: List[Any] = [customer_id]
+    keyset = ''
+    if cursor:
+        try:
+            before_created, before_id = decode_cursor('tickets', cursor, TICKET_CURSOR)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }, None
+        keyset = ' AND (created_at, id) < (?, ?)'
+        params.extend([before_created, before_id])
+    params.append(-1 if limit is None else limit)
+    
+    query = f'''
+        SELECT {', '.join(columns)} FROM tickets
+        WHERE customer_id = ?{keyset}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    '''
+    chunks = _iter_row_chunks(query, params, (customer_select() + ' WHERE customers.id = ?', [customer_id]))
+    customer = next(chunks)
+    if customer is None:
+        chunks.close()
+        return {
+            'success': False,
+            'error': f'Customer with ID {customer_id} not found'
+        }, None
+    return {'success': True, 'customer': customer}, chunks
+
+
+# Tool Registry
+#
+# Built once at import: each MCP_TOOLS entry is paired with its implementation
+# and a validator compiled from its inputSchema, so tools/call can reject bad
+# arguments before any database work.
+
+TOOL_FUNCTIONS = {
+    "get_customer": get_customer,
+    "list_customers": list_customers,
+    "update_customer": update_customer,
+    "create_ticket": create_ticket,
+    "get_customer_history": get_customer_history,
+    "get_customers_batch": get_customers_batch,
+    "find_customer": find_customer,
+    "get_customer_histories_batch": get_customer_histories_batch,
+    "find_customers_by_tickets": find_customers_by_tickets,
+    "search_tickets": search_tickets,
+    "find_similar_resolved_tickets": find_similar_resolved_tickets,
+    "ticket_stats": ticket_stats,
+}
+
+TOOL_REGISTRY = {
+    tool["name"]: (TOOL_FUNCTIONS[tool["name"]], compile_schema(tool["inputSchema"]))
+    for tool in MCP_TOOLS
+}
+
+
+def invalid_params_error(message: Dict[str, Any], errors: List[str]) -> Dict[str, Any]:
+    """Build a JSON-RPC -32602 response for arguments that fail validation."""
+    return {
+        "jsonrpc": "2.0",
+        "id": message.get("id"),
+        "error": {
+            "code": -32602,
+            "message": f"Invalid params: {'; '.join(errors)}",
+            "data": {"errors": errors}
+        }
+    }
+
+
 # MCP Protocol Implementation
 
 def create_sse_message(data: Dict[str, Any]) -> str:
     """Format a message for Server-Sent Events (SSE)."""
-    return f"data: {json.dumps(data)}\n\n"
+    return f"data: {dumps(data)}\n\n"
+
+
+def open_session(output_format: str) -> str:
+    """Register a session with its negotiated output format and return its ID."""
+    session_id = uuid.uuid4().hex
+    with _sessions_lock:
+        _sessions[session_id] = output_format
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return session_id
+
+
+def session_output_format(session_id: Optional[str]) -> str:
+    """Return the output format negotiated for a session, or the default."""
+    if not session_id:
+        return DEFAULT_OUTPUT_FORMAT
+    with _sessions_lock:
+        return _sessions.get(session_id, DEFAULT_OUTPUT_FORMAT)
+
+
+def output_format_for(message: Dict[str, Any]) -> str:
+    """Resolve a call's output format: params._meta.outputFormat, else the session's."""
+    meta = (message.get("params") or {}).get("_meta") or {}
+    return meta.get("outputFormat") or request_output_format.get()
+
+
+def output_format_errors(message: Dict[str, Any]) -> List[str]:
+    """Validate the requested output format of a call."""
+    output_format = output_format_for(message)
+    if output_format not in OUTPUT_FORMATS:
+        return [f"_meta.outputFormat: must be one of {', '.join(OUTPUT_FORMATS)}"]
+    return []
 
 
 def handle_initialize(message: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle MCP initialize request."""
+    """Handle MCP initialize request.
+
+    Clients may choose a tool result format for the session by sending
+    capabilities.experimental.outputFormat; the choice is echoed back under
+    the server's experimental capabilities.
+    """
+    params = message.get("params") or {}
+    experimental = (params.get("capabilities") or {}).get("experimental") or {}
+    requested = experimental.get("outputFormat")
+    
+    if requested is not None and requested not in OUTPUT_FORMATS:
+        return invalid_params_error(
+            message, [f"capabilities.experimental.outputFormat: must be one of {', '.join(OUTPUT_FORMATS)}"]
+        )
+    
     return {
         "jsonrpc": "2.0",
         "id": message.get("id"),
@@ -351,6 +1764,12 @@ def handle_initialize(message: Dict[str, Any]) -> Dict[str, Any]:
             "protocolVersion": "2024-11-05",
             "capabilities": {
                 "tools": {},
+                "experimental": {
+                    "outputFormat": {
+                        "supported": list(OUTPUT_FORMATS),
+                        "selected": requested or DEFAULT_OUTPUT_FORMAT
+                    }
+                }
             },
             "serverInfo": {
                 "name": "customer-management-mcp-server",
@@ -371,22 +1790,83 @@ def handle_tools_list(message: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def tool_result(message: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap a tool's result dict in a JSON-RPC tools/call response."""
+    return {
+        "jsonrpc": "2.0",
+        "id": message.get("id"),
+        "result": {
+            "content": [
+                {
+                    "type": "text",
+                    "text": encode_result(result, output_format_for(message))
+                }
+            ]
+        }
+    }
+
+
+# Cache tags attached to each cacheable read tool's result. Lists and set
+# queries depend on every customer's fields, so they carry the coarse
+# "customers"/"tickets" tags; per-ID lookups carry per-ID tags.
+CACHE_TAGS = {
+    "get_customer": lambda args: {f"customer:{args.get('customer_id')}"} | (
+        {f"tickets:{args.get('customer_id')}"} if args.get('include_ticket_stats') else set()
+    ),
+    "list_customers": lambda args: {"customers"} | ({"tickets"} if args.get('include_ticket_stats') else set()),
+    "get_customer_history": lambda args: {
+        f"customer:{args.get('customer_id')}", f"tickets:{args.get('customer_id')}"
+    },
+    "get_customers_batch": lambda args: {
+        f"customer:{cid}" for cid in args.get('customer_ids') or []
+    },
+    "get_customer_histories_batch": lambda args: {
+        tag for cid in args.get('customer_ids') or []
+        for tag in (f"customer:{cid}", f"tickets:{cid}")
+    },
+    "find_customer": lambda args: {"customers"},
+    "find_customers_by_tickets": lambda args: {"customers", "tickets"},
+    "search_tickets": lambda args: {"tickets"},
+    "find_similar_resolved_tickets": lambda args: {"tickets"},
+    "ticket_stats": lambda args: {"tickets"},
+}
+
+# Tags invalidated by each write tool after it succeeds
+CACHE_INVALIDATIONS = {
+    "update_customer": lambda args: {f"customer:{args.get('customer_id')}", "customers"},
+    "create_ticket": lambda args: {f"tickets:{args.get('customer_id')}", "tickets"},
+}
+
+
+def invalidate_cache_for(tool_name: str, arguments: Dict[str, Any], publish: bool = True):
+    """Drop cached results affected by a successful call to a write tool.
+
+    With shared invalidation enabled the tags are also published to the other
+    server processes, inside the caller's transaction when there is one.
+    """
+    if tool_name in CACHE_INVALIDATIONS:
+        tags = CACHE_INVALIDATIONS[tool_name](arguments)
+        result_cache.invalidate(tags)
+        if publish and invalidation_log is not None:
+            invalidation_log.publish(tags)
+
+
+def run_write(tool_name: str, tool_function, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a write tool on the write queue, publishing its cache invalidation in the same batch."""
+    result = tool_function(**arguments)
+    if result.get('success') and invalidation_log is not None and tool_name in CACHE_INVALIDATIONS:
+        invalidation_log.publish(CACHE_INVALIDATIONS[tool_name](arguments))
+    return result
+
+
 def handle_tools_call(message: Dict[str, Any]) -> Dict[str, Any]:
     """Handle tools/call request."""
     params = message.get("params", {})
     tool_name = params.get("name")
     arguments = params.get("arguments", {})
     
-    # Map tool names to functions
-    tool_functions = {
-        "get_customer": lambda: get_customer(**arguments),
-        "list_customers": lambda: list_customers(**arguments),
-        "update_customer": lambda: update_customer(**arguments),
-        "create_ticket": lambda: create_ticket(**arguments),
-        "get_customer_history": lambda: get_customer_history(**arguments),
-    }
-    
-    if tool_name not in tool_functions:
+    entry = TOOL_REGISTRY.get(tool_name)
+    if entry is None:
         return {
             "jsonrpc": "2.0",
             "id": message.get("id"),
@@ -396,23 +1876,156 @@ def handle_tools_call(message: Dict[str, Any]) -> Dict[str, Any]:
             }
         }
     
+    started = time.perf_counter()
+    tool_function, validate = entry
+    errors = validate(arguments) + output_format_errors(message)
+    if errors:
+        request_metrics.observe_tool(tool_name, time.perf_counter() - started, error=True)
+        return invalid_params_error(message, errors)
+    
     try:
-        result = tool_functions[tool_name]()
+        # Calls inside an enclosing snapshot or transaction (a batch) must see
+        # that snapshot, so they neither use the result cache nor join reads
+        # running outside it
+        enclosed = get_pool().bound() is not None
+        cacheable = tool_name in CACHE_TAGS and result_cache.max_entries > 0 and not enclosed
+        coalescing = read_flights is not None and tool_name in READ_ONLY_TOOLS and not enclosed
+        if cacheable or coalescing:
+            cache_key = ResultCache.make_key(tool_name, arguments)
+        if cacheable:
+            if invalidation_log is not None:
+                invalidation_log.sync(result_cache)
+            hit, result = result_cache.get(cache_key)
+            if hit:
+                encode_started = time.perf_counter()
+                response = tool_result(message, result)
+                finished = time.perf_counter()
+                request_metrics.observe_tool(tool_name, finished - started, error=False, cache_hit=True,
+                                             serialization=finished - encode_started)
+                return response
+        generation = result_cache.generation()
+        
+        # Writes outside an enclosing transaction (e.g. a batch) go through
+        # the group-commit queue and return once their batch has committed
+        queued = write_queue is not None and tool_name not in READ_ONLY_TOOLS and not enclosed
+        database_started = time.perf_counter()
+        coalesced = False
+        if queued:
+            result = write_queue.submit(run_write, tool_name, tool_function, arguments)
+        elif coalescing:
+            # Identical reads already running share one execution. The cache
+            # generation in the key keeps a call arriving after a write's
+            # invalidation from joining a read that started before the write
+            result, coalesced = read_flights.do(f"{generation}:{cache_key}",
+                                                lambda: tool_function(**arguments))
+        else:
+            result = tool_function(**arguments)
+        database_seconds = time.perf_counter() - database_started
+        
+        if result.get('success'):
+            if cacheable and not coalesced:
+                result_cache.set(cache_key, result, CACHE_TAGS[tool_name](arguments), generation)
+            invalidate_cache_for(tool_name, arguments, publish=not queued)
         
+        encode_started = time.perf_counter()
+        response = tool_result(message, result)
+        finished = time.perf_counter()
+        request_metrics.observe_tool(tool_name, finished - started, error=not result.get('success'),
+                                     coalesced=coalesced, database=database_seconds,
+                                     serialization=finished - encode_started)
+        return response
+    except Exception as e:
+        request_metrics.observe_tool(tool_name, time.perf_counter() - started, error=True)
         return {
             "jsonrpc": "2.0",
             "id": message.get("id"),
-            "result": {
-                "content": [
-                    {
-                        "type": "text",
-                        "text": json.dumps(result, indent=2)
-                    }
-                ]
+            "error": {
+                "code": -32603,
+                "message": f"Tool execution error: {str(e)}"
             }
         }
+
+
+# Tools that can stream rows, and the summary field that receives the row count
+STREAMING_TOOLS = {
+    "list_customers": (stream_list_customers, "count"),
+    "get_customer_history": (stream_customer_history, "ticket_count"),
+}
+
+
+def stream_tools_call(message: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Handle a streaming tools/call request.
+
+    Rows are sent as notifications/progress events, each carrying the next
+    chunk as text content, followed by the final response whose content is a
+    summary (row count plus any non-row fields such as the customer).
+    """
+    params = message.get("params", {})
+    arguments = params.get("arguments", {})
+    progress_token = params["_meta"]["progressToken"]
+    tool_name = params["name"]
+    stream_fn, count_field = STREAMING_TOOLS[tool_name]
+    started = time.perf_counter()
+    
+    errors = TOOL_REGISTRY[tool_name][1](arguments) + output_format_errors(message)
+    if errors:
+        request_metrics.observe_tool(tool_name, time.perf_counter() - started, error=True)
+        yield invalid_params_error(message, errors)
+        return
+    
+    output_format = output_format_for(message)
+    # Time spent fetching rows and encoding chunks, excluding time the
+    # consumer holds each event
+    database_seconds = serialization_seconds = 0.0
+    
+    try:
+        phase_started = time.perf_counter()
+        summary, chunks = stream_fn(**arguments)
+        database_seconds += time.perf_counter() - phase_started
+        if chunks is None:
+            response = tool_result(message, summary)
+            request_metrics.observe_tool(tool_name, time.perf_counter() - started,
+                                         error=not summary.get('success'), database=database_seconds)
+            yield response
+            return
+        
+        count = 0
+        while True:
+            phase_started = time.perf_counter()
+            chunk = next(chunks, None)
+            encode_started = time.perf_counter()
+            database_seconds += encode_started - phase_started
+            if chunk is None:
+                break
+            count += len(chunk)
+            text = encode_result(chunk, output_format)
+            serialization_seconds += time.perf_counter() - encode_started
+            yield {
+                "jsonrpc": "2.0",
+                "method": "notifications/progress",
+                "params": {
+                    "progressToken": progress_token,
+                    "progress": count,
+                    "message": f"{count} rows sent",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": text
+                        }
+                    ]
+                }
+            }
+        
+        summary.update({count_field: count, 'streamed': True})
+        encode_started = time.perf_counter()
+        response = tool_result(message, summary)
+        finished = time.perf_counter()
+        request_metrics.observe_tool(tool_name, finished - started, error=False, database=database_seconds,
+                                     serialization=serialization_seconds + finished - encode_started)
+        yield response
     except Exception as e:
-        return {
+        request_metrics.observe_tool(tool_name, time.perf_counter() - started, error=True)
+        yield {
             "jsonrpc": "2.0",
             "id": message.get("id"),
             "error": {
@@ -422,8 +2035,48 @@ def handle_tools_call(message: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
+def is_streaming_call(message: Dict[str, Any]) -> bool:
+    """Return True if the client asked for a streamable tool to be streamed.
+
+    Clients opt in per call by sending a progressToken in params._meta, as
+    with any MCP progress-reporting request.
+    """
+    if message.get("method") != "tools/call":
+        return False
+    params = message.get("params") or {}
+    meta = params.get("_meta") or {}
+    return params.get("name") in STREAMING_TOOLS and meta.get("progressToken") is not None
+
+
+def stream_mcp_message(message: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Process an MCP message, yielding progress events before the response."""
+    if is_streaming_call(message):
+        started = time.perf_counter()
+        response = None
+        for response in stream_tools_call(message):
+            yield response
+        request_metrics.observe_request("tools/call", time.perf_counter() - started,
+                                        error="error" in response)
+    else:
+        yield process_mcp_message(message)
+
+
+# Methods reported under their own label on /metrics; anything else is "other"
+METRIC_METHODS = {"initialize", "tools/list", "tools/call"}
+
+
 def process_mcp_message(message: Dict[str, Any]) -> Dict[str, Any]:
-    """Process an MCP message and route to appropriate handler."""
+    """Process an MCP message and record its method's count, errors and latency."""
+    started = time.perf_counter()
+    response = dispatch_mcp_message(message)
+    method = message.get("method")
+    request_metrics.observe_request(method if method in METRIC_METHODS else "other",
+                                    time.perf_counter() - started, error="error" in response)
+    return response
+
+
+def dispatch_mcp_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Route an MCP message to the appropriate handler."""
     method = message.get("method")
     
     if method == "initialize":
@@ -443,50 +2096,351 @@ def process_mcp_message(message: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
+def is_write_call(message: Any) -> bool:
+    """Return True for tools/call messages that target a mutating tool."""
+    if not isinstance(message, dict) or message.get("method") != "tools/call":
+        return False
+    params = message.get("params") or {}
+    return params.get("name") in TOOL_REGISTRY and params.get("name") not in READ_ONLY_TOOLS
+
+
+def process_mcp_batch(messages: List[Any]) -> Iterator[Dict[str, Any]]:
+    """Process a JSON-RPC batch, yielding each response as it completes.
+
+    Write tool calls run first and share a single transaction; each write is a
+    single statement, so a failing call leaves the others intact. Read-only calls then
+    run together over one connection inside a single read snapshot, so they
+    observe the batch's writes and a consistent view of the database; they
+    bypass the result cache, whose entries may predate the snapshot.
+    """
+    if not messages:
+        yield {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {
+                "code": -32600,
+                "message": "Invalid Request: empty batch"
+            }
+        }
+        return
+    
+    writes = [m for m in messages if is_write_call(m)]
+    reads = [m for m in messages if not is_write_call(m)]
+    
+    if writes:
+        responses = []
+        try:
+            with get_db_connection() as conn, transaction(conn):
+                for message in writes:
+                    responses.append(process_mcp_message(message))
+            # Invalidate again now that the writes are visible to other
+            # connections, so no reader can have cached the pre-commit state
+            for message in writes:
+                params = message.get("params") or {}
+                invalidate_cache_for(params.get("name"), params.get("arguments") or {}, publish=False)
+        except Exception as e:
+            responses = [
+                {
+                    "jsonrpc": "2.0",
+                    "id": message.get("id"),
+                    "error": {
+                        "code": -32603,
+                        "message": f"Batch transaction failed: {str(e)}"
+                    }
+                }
+                for message in writes
+            ]
+        # Write results are only final once the shared transaction commits
+        yield from responses
+    
+    if reads:
+        with get_db_connection() as conn, read_snapshot(conn):
+            for message in reads:
+                if not isinstance(message, dict):
+                    yield {
+                        "jsonrpc": "2.0",
+                        "id": None,
+                        "error": {
+                            "code": -32600,
+                            "message": "Invalid Request: batch entries must be objects"
+                        }
+                    }
+                    continue
+                yield from stream_mcp_message(message)
+
+
+# HTTP Transport
+#
+# Shared by the Flask routes below and the ASGI app in mcp_asgi.py.
+
+def is_initialize(message: Any) -> bool:
+    """Return True for a single (non-batch) initialize request."""
+    return isinstance(message, dict) and message.get("method") == "initialize"
+
+
+def initialize_session(message: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Process an initialize request and open a session for its output format.
+
+    Returns the response and the HTTP headers to send with it.
+    """
+    response = process_mcp_message(message)
+    headers = {}
+    if "result" in response:
+        selected = response["result"]["capabilities"]["experimental"]["outputFormat"]["selected"]
+        headers["Mcp-Session-Id"] = open_session(selected)
+    return response, headers
+
+
+def sse_events(message: Any, session_id: Optional[str]) -> Iterator[str]:
+    """Process a POSTed message or batch, yielding SSE events as responses complete."""
+    request_output_format.set(session_output_format(session_id))
+    request_metrics.inc("mcp_requests_in_flight")
+    try:
+        responses = process_mcp_batch(message) if isinstance(message, list) else stream_mcp_message(message)
+        for response in responses:
+            encode_started = time.perf_counter()
+            event = create_sse_message(response)
+            request_metrics.inc("mcp_response_encode_seconds_total", time.perf_counter() - encode_started)
+            yield event
+    except Exception as e:
+        error_response = {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {
+                "code": -32700,
+                "message": f"Parse error: {str(e)}"
+            }
+        }
+        yield create_sse_message(error_response)
+    finally:
+        request_metrics.inc("mcp_requests_in_flight", -1)
+
+
+def change_feed_start(after: Optional[str], last_event_id: Optional[str],
+                      tables: Optional[str]) -> Tuple[int, Optional[List[str]]]:
+    """Resolve where a /changes subscription starts and which tables it follows.
+
+    Last-Event-ID, sent by reconnecting EventSource clients, takes precedence
+    over the after query parameter; with neither the feed starts at the
+    current end of the log. Raises ValueError for invalid values.
+    """
+    position = last_event_id or after
+    if not position:
+        return change_feed.bounds()[1], parse_tables(tables)
+    try:
+        start = int(position)
+    except ValueError:
+        raise ValueError('after must be a change sequence number')
+    if start < 0:
+        raise ValueError('after must be a change sequence number')
+    return start, parse_tables(tables)
+
+
+def change_feed_poll(after: int, tables: Optional[List[str]]) -> Tuple[List[str], int]:
+    """Read the next changes after a sequence number as SSE events.
+
+    Returns the events and the new position; the position is unchanged when
+    the subscriber is caught up.
+    """
+    changes, position, gap = change_feed.read(after, tables)
+    events = [reset_event(after)] if gap else []
+    events.extend(change_event(change) for change in changes)
+    return events, position
+
+
+def change_feed_events(after: int, tables: Optional[List[str]]) -> Iterator[str]:
+    """Follow the change log from a sequence number, yielding SSE events.
+
+    Polls while caught up and reads back to back while behind. Blocks its
+    thread for the life of the subscription; mcp_asgi awaits between polls
+    instead.
+    """
+    change_feed.subscribed(1)
+    try:
+        # Reconnect after a second; EventSource resumes with Last-Event-ID
+        yield "retry: 1000\n\n"
+        last_sent = time.monotonic()
+        while True:
+            events, position = change_feed_poll(after, tables)
+            if events:
+                yield "".join(events)
+                last_sent = time.monotonic()
+            if position != after:
+                after = position
+                continue
+            if time.monotonic() - last_sent >= CHANGE_FEED_HEARTBEAT:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(CHANGE_FEED_POLL_INTERVAL)
+    finally:
+        change_feed.subscribed(-1)
+
+
+def health_status() -> Dict[str, Any]:
+    """Build the /health payload."""
+    database = get_pool().health()
+    payload = {
+        "status": "healthy" if database["status"] == "healthy" else "degraded",
+        "server": "customer-management-mcp-server",
+        "version": "1.0.0",
+        "tools": len(MCP_TOOLS),
+        "database": database,
+        "cache": result_cache.stats()
+    }
+    if invalidation_log is not None:
+        payload["cache"]["shared_invalidation"] = invalidation_log.stats()
+    if read_flights is not None:
+        payload["cache"]["coalesced_reads"] = read_flights.stats()
+    if write_queue is not None:
+        payload["write_queue"] = write_queue.stats()
+    slow_query_log = get_pool().slow_query_log
+    if slow_query_log is not None:
+        payload["slow_queries"] = {**slow_query_log.stats(), "recent": slow_query_log.recent()[-10:]}
+    payload["changes"] = change_feed.stats()
+    for name, provider in HEALTH_EXTENSIONS.items():
+        payload[name] = provider()
+    return payload
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Return this process's metrics together with its pool, cache and write queue stats."""
+    return {
+        "metrics": request_metrics.snapshot(),
+        "database": get_pool().stats(),
+        "cache": result_cache.stats(),
+        "write_queue": write_queue.stats() if write_queue is not None else {},
+    }
+
+
+def metrics_text() -> str:
+    """Build the /metrics payload in Prometheus text format."""
+    snapshots = METRICS_SOURCE()
+    return render_prometheus(
+        merge_snapshots([s["metrics"] for s in snapshots]),
+        {section: [s[section] for s in snapshots] for section in ("database", "cache", "write_queue")},
+    )
+
+
 # Flask Routes
 
 @app.route('/mcp', methods=['POST'])
 def mcp_endpoint():
     """Main MCP endpoint for communication."""
     message = request.get_json()
+    session_id = request.headers.get("Mcp-Session-Id")
     
-    def generate():
-        try:
-            response = process_mcp_message(message)
-            yield create_sse_message(response)
-        except Exception as e:
-            error_response = {
-                "jsonrpc": "2.0",
-                "id": None,
-                "error": {
-                    "code": -32700,
-                    "message": f"Parse error: {str(e)}"
-                }
-            }
-            yield create_sse_message(error_response)
+    if is_initialize(message):
+        response, headers = initialize_session(message)
+        return Response(create_sse_message(response), mimetype='text/event-stream', headers=headers)
     
-    return Response(generate(), mimetype='text/event-stream')
+    return Response(sse_events(message, session_id), mimetype='text/event-stream')
+
+
+@app.route('/changes', methods=['GET'])
+def changes_endpoint():
+    """Change-data-capture feed: customer and ticket changes as SSE events."""
+    try:
+        after, tables = change_feed_start(request.args.get('after'), request.headers.get('Last-Event-ID'),
+                                          request.args.get('tables'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(change_feed_events(after, tables), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({
-        "status": "healthy",
-        "server": "customer-management-mcp-server",
-        "version": "1.0.0",
-        "tools": len(MCP_TOOLS)
-    })
+    return jsonify(health_status())
+
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics endpoint."""
+    return Response(metrics_text(), content_type=PROMETHEUS_CONTENT_TYPE)
 
-def start_mcp_server(host='127.0.0.1', port=5000):
-    """Start the MCP server."""
-    print(f"Starting MCP Server on {host}:{port}")
+
+def migrate_database():
+    """Apply any pending schema migrations to DB_PATH."""
+    db = DatabaseSetup(DB_PATH)
+    try:
+        db.connect()
+        db.migrate()
+    finally:
+        db.close()
+
+
+def start_mcp_server(host='127.0.0.1', port=5000, pool_size=None, pragmas=None, backend=None,
+                     workers=None):
+    """Start the MCP server.
+
+    Args:
+        host: Interface to bind
+        port: Port to listen on
+        pool_size: Database connection pool size (per worker process)
+        pragmas: SQLite pragma overrides for pooled connections
+        backend: "asgi" (uvicorn, default when installed) or "flask"
+        workers: Number of worker processes; above 1 serves in prefork mode
+            (see mcp_prefork.py)
+    """
+    if backend is None:
+        try:
+            import mcp_asgi  # noqa: F401
+            backend = "asgi"
+        except ImportError:
+            backend = "flask"
+    
+    migrate_database()
+    
+    if workers is not None and workers > 1:
+        import mcp_prefork
+        print(f"Starting MCP Server on {host}:{port} ({backend}, {workers} workers)")
+        print(f"MCP Endpoint: http://{host}:{port}/mcp")
+        print(f"Health Check: http://{host}:{port}/health")
+        print(f"Metrics: http://{host}:{port}/metrics")
+        print(f"Change Feed: http://{host}:{port}/changes")
+        # Workers open their own pools after fork; none is created here
+        mcp_prefork.serve(host=host, port=port, workers=workers, backend=backend,
+                          pool_size=pool_size, pragmas=pragmas)
+        return
+    
+    configure_pool(pool_size=pool_size, pragmas=pragmas)
+    configure_write_queue()
+    build_similarity_index()
+    print(f"Starting MCP Server on {host}:{port} ({backend})")
     print(f"MCP Endpoint: http://{host}:{port}/mcp")
     print(f"Health Check: http://{host}:{port}/health")
+    print(f"Metrics: http://{host}:{port}/metrics")
+    print(f"Change Feed: http://{host}:{port}/changes")
     print(f"Available Tools: {len(MCP_TOOLS)}")
-    app.run(host=host, port=port, debug=False, use_reloader=False)
+    print(f"Database Pool: {DB_POOL_SIZE} connections ({DB_PATH})")
+    
+    if backend == "asgi":
+        import mcp_asgi
+        mcp_asgi.run(host=host, port=port)
+    elif backend == "flask":
+        app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
 
 
 if __name__ == "__main__":
-    start_mcp_server()
+    import argparse
+    # Run through the importable module, whose state mcp_asgi and mcp_prefork share
+    import mcp_server
+    
+    parser = argparse.ArgumentParser(description="Customer management MCP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--backend", choices=["asgi", "flask"], default=None)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (prefork mode when > 1)")
+    parser.add_argument("--pool-size", type=int, default=None)
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--slow-query-ms", type=float, default=SLOW_QUERY_THRESHOLD * 1000,
+                        help="Log statements taking at least this long (0 disables)")
+    args = parser.parse_args()
+    mcp_server.DB_PATH = args.db
+    mcp_server.SLOW_QUERY_THRESHOLD = args.slow_query_ms / 1000
+    mcp_server.start_mcp_server(host=args.host, port=args.port, pool_size=args.pool_size,
+                                backend=args.backend, workers=args.workers)
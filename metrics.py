@@ -0,0 +1,213 @@
+"""Request metrics for the MCP server in Prometheus text format.
+
+MetricsRegistry keeps counters and fixed-bucket latency histograms keyed by
+metric name and labels. Recording an observation is one lock acquisition and a
+bisect, cheap enough to leave on for every call. snapshot() returns plain
+JSON-serializable data so prefork workers can publish theirs and any worker
+can render the totals (see merge_snapshots and render_prometheus).
+"""
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Help text and type of the metrics recorded through MetricsRegistry
+METRICS = {
+    "mcp_requests_total": ("counter", "JSON-RPC messages processed, by method"),
+    "mcp_request_errors_total": ("counter", "JSON-RPC messages answered with an error, by method"),
+    "mcp_request_duration_seconds": ("histogram", "Time to process a JSON-RPC message, by method"),
+    "mcp_tool_calls_total": ("counter", "Tool calls, by tool"),
+    "mcp_tool_errors_total": ("counter", "Tool calls that failed validation, raised or returned success=false"),
+    "mcp_tool_cache_hits_total": ("counter", "Tool calls answered from the result cache"),
+    "mcp_tool_coalesced_total": ("counter", "Read tool calls that shared the result of an identical call in flight"),
+    "mcp_tool_duration_seconds": ("histogram", "Total time of a tool call, by tool"),
+    "mcp_tool_phase_seconds": ("histogram", "Time of a tool call spent in the database or encoding its result"),
+    "mcp_response_encode_seconds_total": ("counter", "Time spent encoding JSON-RPC responses as SSE events"),
+    "mcp_requests_in_flight": ("gauge", "HTTP requests to /mcp currently being processed"),
+}
+
+# Fields of the /health stats sections exported as metrics: section -> field -> (name, type, help)
+STATS_METRICS = {
+    "database": {
+        "open": ("mcp_db_pool_connections_open", "gauge", "Open pooled SQLite connections"),
+        "in_use": ("mcp_db_pool_connections_in_use", "gauge", "Pooled connections currently borrowed"),
+        "acquisitions": ("mcp_db_pool_acquisitions_total", "counter", "Connections borrowed from the pool"),
+        "waits": ("mcp_db_pool_waits_total", "counter", "Borrows that had to wait for a free connection"),
+        "timeouts": ("mcp_db_pool_timeouts_total", "counter", "Borrows that gave up waiting"),
+        "slow_queries": ("mcp_db_slow_queries_total", "counter", "Statements at or above the slow query threshold"),
+    },
+    "cache": {
+        "entries": ("mcp_cache_entries", "gauge", "Entries in the result cache"),
+        "hits": ("mcp_cache_hits_total", "counter", "Result cache hits"),
+        "misses": ("mcp_cache_misses_total", "counter", "Result cache misses"),
+        "evictions": ("mcp_cache_evictions_total", "counter", "Entries evicted by the LRU limit"),
+        "expirations": ("mcp_cache_expirations_total", "counter", "Entries dropped after their TTL"),
+        "invalidations": ("mcp_cache_invalidations_total", "counter", "Entries dropped by write invalidation"),
+    },
+    "write_queue": {
+        "pending": ("mcp_write_queue_pending", "gauge", "Write calls waiting for the writer thread"),
+        "batches": ("mcp_write_queue_batches_total", "counter", "Group-commit transactions"),
+        "writes": ("mcp_write_queue_writes_total", "counter", "Write calls committed through the queue"),
+        "failed_batches": ("mcp_write_queue_failed_batches_total", "counter", "Group-commit transactions that failed"),
+    },
+}
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and latency histograms."""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], float] = {}
+        # Per-bucket (not cumulative) counts with one overflow bucket, then the sum
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        """Add to a counter, or to a gauge when value is negative."""
+        with self._lock:
+            self._bump(name, _labels(labels), value)
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        """Record one observation in a histogram."""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._bump_histogram(name, _labels(labels), index, seconds)
+
+    def observe_request(self, method: str, seconds: float, error: bool):
+        """Record a processed JSON-RPC message."""
+        key = (("method", method),)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._bump("mcp_requests_total", key)
+            if error:
+                self._bump("mcp_request_errors_total", key)
+            self._bump_histogram("mcp_request_duration_seconds", key, index, seconds)
+
+    def observe_tool(self, tool: str, seconds: float, error: bool, cache_hit: bool = False,
+                     coalesced: bool = False, database: Optional[float] = None,
+                     serialization: Optional[float] = None):
+        """Record a tool call and, when measured, its database and encoding time."""
+        key = (("tool", tool),)
+        with self._lock:
+            self._bump("mcp_tool_calls_total", key)
+            if error:
+                self._bump("mcp_tool_errors_total", key)
+            if cache_hit:
+                self._bump("mcp_tool_cache_hits_total", key)
+            if coalesced:
+                self._bump("mcp_tool_coalesced_total", key)
+            self._bump_histogram("mcp_tool_duration_seconds", key,
+                                 bisect.bisect_left(self.buckets, seconds), seconds)
+            for phase, phase_seconds in (("database", database), ("serialization", serialization)):
+                if phase_seconds is not None:
+                    self._bump_histogram("mcp_tool_phase_seconds", (("phase", phase), ("tool", tool)),
+                                         bisect.bisect_left(self.buckets, phase_seconds), phase_seconds)
+
+    def _bump(self, name: str, labels: Labels, value: float = 1.0):
+        """Add to a counter. Caller holds the lock."""
+        key = (name, labels)
+        self._values[key] = self._values.get(key, 0.0) + value
+
+    def _bump_histogram(self, name: str, labels: Labels, index: int, seconds: float):
+        """Record a histogram observation in a known bucket. Caller holds the lock."""
+        histogram = self._histograms.get((name, labels))
+        if histogram is None:
+            histogram = self._histograms[(name, labels)] = [0.0] * (len(self.buckets) + 2)
+        histogram[index] += 1
+        histogram[-1] += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current values as JSON-serializable data."""
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "values": [[name, dict(labels), value] for (name, labels), value in self._values.items()],
+                "histograms": [[name, dict(labels), list(histogram)]
+                               for (name, labels), histogram in self._histograms.items()],
+            }
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum registry snapshots from several processes (same buckets assumed)."""
+    values: Dict[Tuple[str, Labels], float] = {}
+    histograms: Dict[Tuple[str, Labels], List[float]] = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["values"]:
+            key = (name, _labels(labels))
+            values[key] = values.get(key, 0.0) + value
+        for name, labels, counts in snapshot["histograms"]:
+            key = (name, _labels(labels))
+            total = histograms.setdefault(key, [0.0] * len(counts))
+            for i, count in enumerate(counts):
+                total[i] += count
+    return {
+        "buckets": snapshots[0]["buckets"] if snapshots else list(LATENCY_BUCKETS),
+        "values": [[name, dict(labels), value] for (name, labels), value in values.items()],
+        "histograms": [[name, dict(labels), counts] for (name, labels), counts in histograms.items()],
+    }
+
+
+def _format_labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = sorted(labels.items())
+    if extra is not None:
+        items.append(extra)
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(registry: Dict[str, Any], stats: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Render a (merged) registry snapshot plus stats sections as Prometheus text.
+
+    Args:
+        registry: Output of MetricsRegistry.snapshot() or merge_snapshots()
+        stats: Section name -> stats dicts to sum (one per process), for the
+            sections listed in STATS_METRICS
+    """
+    families: Dict[str, List[str]] = {}
+    for name, labels, value in registry["values"]:
+        families.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    bounds = [_format_value(bound) for bound in registry["buckets"]] + ["+Inf"]
+    for name, labels, counts in registry["histograms"]:
+        lines = families.setdefault(name, [])
+        cumulative = 0.0
+        for bound, count in zip(bounds, counts[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {_format_value(cumulative)}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(counts[-1])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+
+    output = []
+    for name, (kind, help_text) in METRICS.items():
+        if name in families:
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(families[name])
+
+    for section, fields in STATS_METRICS.items():
+        sections = stats.get(section) or []
+        for field, (name, kind, help_text) in fields.items():
+            values = [s[field] for s in sections if isinstance(s.get(field), (int, float))]
+            if not values:
+                continue
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.append(f"{name} {_format_value(sum(values))}")
+    return "\n".join(output) + "\n"
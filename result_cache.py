@@ -0,0 +1,284 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+
+class ResultCache:
+    """Thread-safe LRU cache with TTL expiry and tag-based invalidation.
+
+    Each entry is stored with a set of tags (e.g. "customer:5"). Writers call
+    invalidate() with the tags they touched, which drops exactly the entries
+    carrying any of those tags.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        """Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of cached results before LRU eviction
+            ttl: Seconds an entry stays valid; bounds staleness from writers
+                outside this process
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[str, Tuple[float, Any, Set[str]]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+        # Generation at which each tag was last invalidated, bounded in size.
+        # Forgetting a tag raises _floor so older reads are still rejected.
+        self._tag_generation: "OrderedDict[str, int]" = OrderedDict()
+        self._generation = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+        self._rejected = 0
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Build a cache key from a tool name and its arguments."""
+        return f"{tool_name}:{json.dumps(arguments, sort_keys=True, separators=(',', ':'))}"
+
+    def generation(self) -> int:
+        """Return the current invalidation generation.
+
+        Read it before running the query whose result will be cached and pass
+        it to set(), so results read before a concurrent write are not stored.
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        """Look up a key, returning (hit, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def set(self, key: str, value: Any, tags: Iterable[str], read_generation: int):
+        """Store a value unless one of its tags was invalidated since read_generation."""
+        tags = set(tags)
+        with self._lock:
+            if read_generation < self._floor or any(
+                self._tag_generation.get(tag, 0) > read_generation for tag in tags
+            ):
+                self._rejected += 1
+                return
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """Drop every entry carrying any of the given tags; return how many."""
+        removed = 0
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                self._tag_generation[tag] = self._generation
+                self._tag_generation.move_to_end(tag)
+                for key in list(self._tag_index.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+            while len(self._tag_generation) > self.max_entries:
+                _, forgotten = self._tag_generation.popitem(last=False)
+                self._floor = max(self._floor, forgotten)
+            self._invalidations += removed
+        return removed
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tag_index.clear()
+            self._tag_generation.clear()
+            self._floor = self._generation
+
+    def _remove(self, key: str):
+        """Remove a key and its tag index entries. Caller holds the lock."""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "rejected_stale_sets": self._rejected,
+            }
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one execution.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it runs wait for and share its result (or exception)
+    instead of running it again. Nothing is kept once the call finishes, so
+    this complements ResultCache: it absorbs bursts of identical misses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._executions = 0
+        self._shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (fn() or the result of the identical call in flight, shared)."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._executions += 1
+            else:
+                self._shared += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return execution and sharing counters."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self._executions,
+                "shared": self._shared,
+            }
+
+
+class CacheInvalidationLog:
+    """Shares cache invalidations between processes through the database.
+
+    Each process publishes the tags it invalidates to the cache_invalidations
+    table and, before serving from its own cache, applies tags published by
+    other processes since its last sync. The log is append-only and ordered by
+    its AUTOINCREMENT sequence, so a sync is one rowid range query.
+
+    Syncs run at most once per min_interval, so a cache hit usually costs no
+    query; an entry invalidated by another process may therefore still be
+    served for up to min_interval (50 ms by default) after that write commits.
+    """
+
+    def __init__(self, connection, origin: int, retain: int = 10000, min_interval: float = 0.05):
+        """Start following the log from its current end.
+
+        Args:
+            connection: Zero-argument callable returning a connection context
+                manager (e.g. mcp_server.get_db_connection)
+            origin: Identifier of this process; its own entries are skipped
+            retain: Number of most recent entries kept when trimming
+            min_interval: Seconds after a sync during which sync() returns
+                without querying the log
+        """
+        self._connection = connection
+        self.origin = origin
+        self.retain = retain
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._synced_at = float("-inf")
+        self._published = 0
+        self._applied = 0
+        with self._connection() as conn:
+            row = conn.execute("SELECT MAX(seq) FROM cache_invalidations").fetchone()
+        self._last_seq = row[0] or 0
+
+    def publish(self, tags: Iterable[str]):
+        """Record invalidated tags for the other processes."""
+        with self._connection() as conn:
+            seq = conn.execute(
+                "INSERT INTO cache_invalidations (origin, tags) VALUES (?, ?) RETURNING seq",
+                (self.origin, json.dumps(sorted(tags))),
+            ).fetchall()[0][0]
+            if seq % 1000 == 0:
+                conn.execute("DELETE FROM cache_invalidations WHERE seq <= ?", (seq - self.retain,))
+        with self._lock:
+            self._published += 1
+
+    def sync(self, cache: ResultCache):
+        """Apply entries published by other processes since the last sync.
+
+        Returns without querying when the previous sync was less than
+        min_interval ago.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._synced_at < self.min_interval:
+                return
+            self._synced_at = now
+            last_seq = self._last_seq
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, origin, tags FROM cache_invalidations WHERE seq > ? ORDER BY seq",
+                (last_seq,),
+            ).fetchall()
+        if not rows:
+            return
+        applied = 0
+        for seq, origin, tags in rows:
+            if origin != self.origin:
+                cache.invalidate(json.loads(tags))
+                applied += 1
+        with self._lock:
+            self._last_seq = max(self._last_seq, rows[-1][0])
+            self._applied += applied
+
+    def stats(self) -> Dict[str, Any]:
+        """Return publish/apply counters."""
+        with self._lock:
+            return {
+                "last_seq": self._last_seq,
+                "published": self._published,
+                "applied": self._applied,
+            }
@@ -0,0 +1,107 @@
+from typing import Any, Callable, Dict, List
+
+# A compiled check appends human-readable problems for `value` at `path`
+Check = Callable[[Any, str, List[str]], None]
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any], List[str]]:
+    """Compile a JSON Schema into a validator returning a list of errors.
+
+    Supports the subset used by MCP tool input schemas: type, enum,
+    properties, required, additionalProperties, items, minItems, maxItems,
+    minimum and maximum. Unlike plain JSON Schema, objects reject unknown
+    properties unless additionalProperties is explicitly true, so misspelled
+    argument names fail fast instead of reaching the tool.
+    """
+    check = _compile(schema)
+
+    def validate(value: Any) -> List[str]:
+        errors: List[str] = []
+        check(value, "arguments", errors)
+        return errors
+
+    return validate
+
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    """Build the check for one schema node."""
+    checks: List[Check] = []
+
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        type_check = _TYPE_CHECKS[schema_type]
+
+        def check_type(value, path, errors):
+            if not type_check(value):
+                errors.append(f"{path}: expected {schema_type}, got {type(value).__name__}")
+                return False
+            return True
+    else:
+        def check_type(value, path, errors):
+            return True
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+        allowed_set = set(allowed)
+
+        def check_enum(value, path, errors):
+            if not isinstance(value, (str, int, float, bool)) or value not in allowed_set:
+                errors.append(f"{path}: must be one of {', '.join(map(str, allowed))}")
+        checks.append(check_enum)
+
+    if "minimum" in schema or "maximum" in schema:
+        minimum, maximum = schema.get("minimum"), schema.get("maximum")
+
+        def check_range(value, path, errors):
+            if minimum is not None and value < minimum:
+                errors.append(f"{path}: must be >= {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{path}: must be <= {maximum}")
+        checks.append(check_range)
+
+    if schema_type == "object":
+        properties = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = schema.get("required", [])
+        allow_extra = schema.get("additionalProperties", False) is True
+
+        def check_object(value, path, errors):
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: required")
+            for name, item in value.items():
+                if name in properties:
+                    properties[name](item, f"{path}.{name}", errors)
+                elif not allow_extra:
+                    errors.append(f"{path}.{name}: unknown field")
+        checks.append(check_object)
+
+    if schema_type == "array":
+        items = _compile(schema["items"]) if "items" in schema else None
+        min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+
+        def check_array(value, path, errors):
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: must contain at least {min_items} item(s)")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: must contain at most {max_items} items")
+            if items is not None:
+                for index, item in enumerate(value):
+                    items(item, f"{path}[{index}]", errors)
+        checks.append(check_array)
+
+    def check(value, path, errors):
+        if check_type(value, path, errors):
+            for step in checks:
+                step(value, path, errors)
+
+    return check
@@ -0,0 +1,81 @@
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+# Output formats for tool results
+OUTPUT_FORMATS = ("json", "pretty", "columnar")
+DEFAULT_OUTPUT_FORMAT = "json"
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+# Compact encoder used for tool results and SSE envelopes; see set_encoder()
+_dumps: Callable[[Any], str] = _orjson_dumps if orjson is not None else _stdlib_dumps
+
+
+def set_encoder(encoder: Callable[[Any], str]):
+    """Plug in a different compact JSON encoder (must return str)."""
+    global _dumps
+    _dumps = encoder
+
+
+def encoder_name() -> str:
+    """Return the name of the active compact encoder."""
+    if _dumps is _orjson_dumps:
+        return "orjson"
+    if _dumps is _stdlib_dumps:
+        return "json"
+    return getattr(_dumps, "__name__", "custom")
+
+
+def dumps(obj: Any) -> str:
+    """Encode obj as compact JSON with the active encoder."""
+    return _dumps(obj)
+
+
+def is_row_list(value: Any) -> bool:
+    """Return True for a non-empty list of flat dicts that share the same keys."""
+    if not isinstance(value, list) or not value or not isinstance(value[0], dict):
+        return False
+    keys = value[0].keys()
+    return all(
+        isinstance(row, dict) and row.keys() == keys and all(isinstance(v, _SCALARS) for v in row.values())
+        for row in value
+    )
+
+
+def to_columnar(value: Any) -> Any:
+    """Rewrite every list of uniform row dicts as {"columns": [...], "rows": [[...], ...]}.
+
+    Column names are sent once instead of once per row, which is what makes
+    the format smaller for the LLM to read. Other values are left as-is.
+    """
+    if is_row_list(value):
+        columns = list(value[0].keys())
+        return {"columns": columns, "rows": [list(row.values()) for row in value]}
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_columnar(item) for item in value]
+    return value
+
+
+def encode_result(result: Any, output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+    """Encode a tool result in the requested output format."""
+    if output_format == "pretty":
+        return json.dumps(result, indent=2)
+    if output_format == "columnar":
+        return dumps(to_columnar(result))
+    return dumps(result)
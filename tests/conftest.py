@@ -0,0 +1,55 @@
+"""Shared fixtures: a small generated dataset and an mcp_server configured against a copy of it."""
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import mcp_server
+from database_setup import generate
+from ticket_similarity import TicketSimilarityIndex
+
+# Dataset size for the tests: big enough for every query variant to return
+# rows and paginate, small enough to generate in well under a second
+TEST_CUSTOMERS = 300
+TEST_TICKETS = 3000
+
+
+@pytest.fixture(scope="session")
+def generated_db(tmp_path_factory):
+    """Path of a generated dataset shared by the session; tests must not modify it."""
+    path = tmp_path_factory.mktemp("dataset") / "generated.db"
+    generate(str(path), customers=TEST_CUSTOMERS, tickets=TEST_TICKETS, seed=7)
+    return path
+
+
+@pytest.fixture
+def db_path(generated_db, tmp_path):
+    """Path of a private copy of the generated dataset."""
+    path = tmp_path / "support.db"
+    shutil.copyfile(generated_db, path)
+    return path
+
+
+@pytest.fixture
+def server(db_path, monkeypatch):
+    """mcp_server pointed at a private dataset copy, with fresh caches and no write queue."""
+    monkeypatch.setattr(mcp_server, "DB_PATH", str(db_path))
+    monkeypatch.setattr(mcp_server, "invalidation_log", None)
+    monkeypatch.setattr(mcp_server, "similarity_index", TicketSimilarityIndex())
+    mcp_server.configure_pool(pool_size=4, slow_query_threshold=0)
+    mcp_server.configure_cache()
+    mcp_server.configure_write_queue(max_batch=0)
+    yield mcp_server
+    mcp_server.configure_write_queue(max_batch=0)
+    mcp_server.get_pool().close()
+
+
+def tool_call(name, arguments, request_id=1):
+    """Build a JSON-RPC tools/call message."""
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": name, "arguments": arguments}}
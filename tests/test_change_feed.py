@@ -0,0 +1,60 @@
+"""change_log capture and the /changes feed's reads, gaps and positions."""
+from change_feed import parse_tables
+
+import pytest
+
+
+def latest_seq(server):
+    return server.change_feed.bounds()[1]
+
+
+def test_writes_are_captured_in_commit_order(server):
+    start = latest_seq(server)
+    server.update_customer(1, {"email": "first@example.com"})
+    ticket = server.create_ticket(1, "Captured ticket", "high")["ticket"]
+    changes, position, gap = server.change_feed.read(start)
+    assert not gap and position == changes[-1]["seq"]
+    assert [(change["table"], change["operation"], change["id"]) for change in changes] == [
+        ("customers", "update", 1), ("tickets", "insert", ticket["id"])]
+    assert changes[0]["data"]["email"] == "first@example.com"
+    assert changes[1]["customer_id"] == 1
+
+
+def test_table_filter_still_advances_position(server):
+    start = latest_seq(server)
+    server.update_customer(1, {"email": "filtered@example.com"})
+    changes, position, _ = server.change_feed.read(start, ["tickets"])
+    assert changes == []
+    assert position == latest_seq(server) > start
+
+
+@pytest.mark.parametrize("trimmed_from_zero", [True, False])
+def test_trimmed_entries_are_reported_as_a_gap(server, trimmed_from_zero):
+    for index in range(5):
+        server.update_customer(1, {"email": f"gap{index}@example.com"})
+    oldest, latest = server.change_feed.bounds()
+    with server.get_db_connection() as conn:
+        conn.execute("DELETE FROM change_log WHERE seq < ?", (latest - 1,))
+    after = 0 if trimmed_from_zero else oldest
+    changes, _, gap = server.change_feed.read(after)
+    assert gap
+    assert [change["seq"] for change in changes] == [latest - 1, latest]
+    events, _ = server.change_feed_poll(after, None)
+    assert events[0].startswith("event: reset")
+    assert not server.change_feed.read(latest - 2)[2]
+
+
+def test_feed_from_zero_without_trimming_has_no_gap(server):
+    server.update_customer(1, {"email": "whole-log@example.com"})
+    assert server.change_feed.bounds()[0] == 1
+    assert not server.change_feed.read(0)[2]
+
+
+def test_start_position(server):
+    server.update_customer(1, {"email": "start@example.com"})
+    assert server.change_feed_start(None, None, None) == (latest_seq(server), None)
+    assert server.change_feed_start("3", "7", "tickets") == (7, ["tickets"])
+    with pytest.raises(ValueError):
+        server.change_feed_start("-1", None, None)
+    with pytest.raises(ValueError):
+        parse_tables("orders")
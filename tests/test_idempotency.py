@@ -0,0 +1,38 @@
+"""Idempotent writes: replays, key reuse and the expiry trigger."""
+
+
+def test_retry_replays_the_stored_result(server):
+    first = server.create_ticket(1, "Charged twice", "high", idempotency_key="turn-1")
+    retry = server.create_ticket(1, "Charged twice", "high", idempotency_key="turn-1")
+    assert first["success"] and retry["idempotent_replay"]
+    assert retry["ticket"] == first["ticket"]
+    with server.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tickets WHERE issue = 'Charged twice'").fetchone()[0] == 1
+
+
+def test_key_reused_for_different_arguments_is_rejected(server):
+    assert server.update_customer(1, {"email": "a@example.com"}, idempotency_key="turn-2")["success"]
+    reused = server.update_customer(1, {"email": "b@example.com"}, idempotency_key="turn-2")
+    assert not reused["success"] and "different request" in reused["error"]
+    assert server.get_customer(1)["customer"]["email"] == "a@example.com"
+
+
+def test_failed_write_is_not_stored(server):
+    assert not server.create_ticket(10 ** 9, "No such customer", "low", idempotency_key="turn-3")["success"]
+    with server.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0] == 0
+
+
+def test_storing_a_key_deletes_expired_keys(server):
+    with server.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO idempotency_keys (key, tool, request_hash, result, created_at) "
+            "VALUES (?, 'create_ticket', '', '{}', datetime('now', ?))",
+            [("old", f"-{server.IDEMPOTENCY_TTL + 60} seconds"), ("stale", f"-{server.IDEMPOTENCY_TTL} seconds"),
+             ("recent", "-60 seconds")]
+        )
+    # The expired key can be used again for a different request
+    assert server.create_ticket(1, "Fresh request", "low", idempotency_key="old")["success"]
+    with server.get_db_connection() as conn:
+        keys = conn.execute("SELECT key FROM idempotency_keys ORDER BY key").fetchall()
+    assert [row[0] for row in keys] == ["old", "recent"]
@@ -0,0 +1,88 @@
+"""Keyset cursors of list_customers and get_customer_history, and search_tickets' offset cursor."""
+import base64
+import json
+
+import pytest
+
+
+def pages(tool, **arguments):
+    """Follow next_cursor through every page, returning the pages' results."""
+    results, cursor = [], None
+    while True:
+        result = tool(**arguments, cursor=cursor)
+        assert result["success"], result
+        results.append(result)
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return results
+
+
+def raw_cursor(kind, values):
+    return base64.urlsafe_b64encode(json.dumps({"k": kind, "v": values}).encode()).decode()
+
+
+def busiest_customer(server):
+    with server.get_db_connection() as conn:
+        return conn.execute(
+            "SELECT customer_id FROM customer_ticket_stats ORDER BY total_tickets DESC LIMIT 1"
+        ).fetchone()[0]
+
+
+def test_list_customers_pages_cover_every_customer_once(server):
+    customers = [customer for page in pages(server.list_customers, status="active", limit=37)
+                 for customer in page["customers"]]
+    with server.get_db_connection() as conn:
+        expected = [row[0] for row in conn.execute(
+            "SELECT id FROM customers WHERE status = 'active' ORDER BY name, id")]
+    assert [customer["id"] for customer in customers] == expected
+
+
+def test_customer_history_pages_are_newest_first(server):
+    customer_id = busiest_customer(server)
+    tickets = [ticket for page in pages(server.get_customer_history, customer_id=customer_id, limit=7)
+               for ticket in page["tickets"]]
+    with server.get_db_connection() as conn:
+        expected = [row[0] for row in conn.execute(
+            "SELECT id FROM tickets WHERE customer_id = ? ORDER BY created_at DESC, id DESC", (customer_id,))]
+    assert len(expected) > 7
+    assert [ticket["id"] for ticket in tickets] == expected
+
+
+def test_search_cursor_is_bound_to_query_and_filters(server):
+    first = server.search_tickets("payment", limit=2)
+    assert first["next_cursor"]
+    assert server.search_tickets("payment", limit=2, cursor=first["next_cursor"])["success"]
+    assert server.search_tickets("payment", status="open", cursor=first["next_cursor"]) == {
+        "success": False, "error": "Invalid cursor"}
+
+
+@pytest.mark.parametrize("cursor", [
+    raw_cursor("customers", [1]),
+    raw_cursor("customers", ["Ann", 1, 2]),
+    raw_cursor("customers", [["Ann"], 1]),
+    raw_cursor("customers", ["Ann", True]),
+    raw_cursor("tickets", ["2025-01-01", 1]),
+    "not a cursor",
+], ids=["too short", "too long", "list name", "bool id", "other kind", "not base64"])
+def test_malformed_customer_cursor_is_rejected(server, cursor):
+    assert server.list_customers(cursor=cursor) == {"success": False, "error": "Invalid cursor"}
+    assert server.stream_list_customers(cursor=cursor)[0] == {"success": False, "error": "Invalid cursor"}
+
+
+@pytest.mark.parametrize("cursor", [
+    raw_cursor("tickets", [1]),
+    raw_cursor("tickets", ["2025-01-01", "7"]),
+    raw_cursor("tickets", [None, 7]),
+    raw_cursor("customers", ["Ann", 1]),
+], ids=["too short", "string id", "null timestamp", "other kind"])
+def test_malformed_ticket_cursor_is_rejected(server, cursor):
+    assert server.get_customer_history(1, cursor=cursor) == {"success": False, "error": "Invalid cursor"}
+    assert server.stream_customer_history(1, cursor=cursor)[0] == {"success": False, "error": "Invalid cursor"}
+
+
+@pytest.mark.parametrize("values", [[5], ['"payment"*', None, None], ['"payment"*', None, None, -1],
+                                    ['"payment"*', None, None, "5"]],
+                         ids=["too short", "no offset", "negative offset", "string offset"])
+def test_malformed_search_cursor_is_rejected(server, values):
+    cursor = raw_cursor("search_tickets", values)
+    assert server.search_tickets("payment", cursor=cursor) == {"success": False, "error": "Invalid cursor"}
@@ -0,0 +1,36 @@
+"""fields projection on get_customer, list_customers and get_customer_history."""
+import pytest
+
+from test_pagination import busiest_customer, pages
+
+
+def test_get_customer_returns_only_requested_fields(server):
+    full = server.get_customer(1)["customer"]
+    projected = server.get_customer(1, fields=["email", "id", "email"])["customer"]
+    assert projected == {"email": full["email"], "id": 1}
+    stats = server.get_customer(1, include_ticket_stats=True, fields=["name"])["customer"]
+    assert stats["name"] == full["name"] and "total_tickets" in stats and "email" not in stats
+
+
+def test_projection_keeps_pagination_intact(server):
+    full = [c["id"] for page in pages(server.list_customers, limit=40) for c in page["customers"]]
+    projected = pages(server.list_customers, limit=40, fields=["status"])
+    assert all(set(c) == {"status"} for page in projected for c in page["customers"])
+    assert len(projected) == len(pages(server.list_customers, limit=40))
+    assert sum(page["count"] for page in projected) == len(full)
+
+
+def test_history_fields(server):
+    customer_id = busiest_customer(server)
+    full = [t for page in pages(server.get_customer_history, customer_id=customer_id, limit=3)
+            for t in page["tickets"]]
+    projected = [t for page in pages(server.get_customer_history, customer_id=customer_id, limit=3,
+                                     fields=["priority"]) for t in page["tickets"]]
+    assert projected == [{"priority": t["priority"]} for t in full]
+
+
+@pytest.mark.parametrize("fields", [[], ["password"], "name", ["name", 1]])
+def test_invalid_fields_are_rejected(server, fields):
+    for result in (server.get_customer(1, fields=fields), server.list_customers(fields=fields),
+                   server.get_customer_history(1, fields=fields)):
+        assert not result["success"] and result["error"].startswith("fields must be")
@@ -0,0 +1,49 @@
+"""Query plan regression tests: every tool scenario of check_query_plans must plan cleanly."""
+import sqlite3
+
+import pytest
+
+import check_query_plans as plans
+
+# Tool names only; the calls are rebuilt against the generated dataset
+SCENARIO_TOOLS = [tool for tool, _ in plans.scenarios({"busiest": 1, "ids": [1], "day": None})]
+
+
+@pytest.fixture(scope="module")
+def plan_check(generated_db):
+    capture = plans.prepare(str(generated_db))
+    explain = sqlite3.connect(f"file:{generated_db}?mode=ro", uri=True)
+    yield capture, explain, plans.scenarios(plans.sample_ids(explain))
+    explain.close()
+
+
+@pytest.mark.parametrize("index", range(len(SCENARIO_TOOLS)),
+                         ids=[f"{index}-{tool}" for index, tool in enumerate(SCENARIO_TOOLS)])
+def test_scenario_plans(plan_check, index):
+    capture, explain, scenarios = plan_check
+    tool, call = scenarios[index]
+    results = plans.check_scenario(explain, capture, tool, call, set())
+    assert results, f"{tool} ran no statements"
+    assert {result["sql"]: result["failed"] for result in results if result["failed"]} == {}
+
+
+def test_id_lookup_through_secondary_index_is_flagged(generated_db):
+    explain = sqlite3.connect(f"file:{generated_db}?mode=ro", uri=True)
+    ids = [row[0] for row in explain.execute("SELECT id FROM tickets ORDER BY id DESC LIMIT 200")]
+    placeholders = ", ".join("?" * len(ids))
+    _, problems = plans.plan_problems(
+        explain, f"SELECT id FROM tickets WHERE id IN ({placeholders}) AND status = 'resolved'", ids)
+    _, fixed = plans.plan_problems(
+        explain, f"SELECT id FROM tickets WHERE id IN ({placeholders}) AND +status = 'resolved'", ids)
+    explain.close()
+    assert any("INTEGER PRIMARY KEY" in problem for problem in problems)
+    assert fixed == []
+
+
+def test_index_prefix_ignoring_a_filtered_column_is_flagged(generated_db):
+    explain = sqlite3.connect(f"file:{generated_db}?mode=ro", uri=True)
+    _, problems = plans.plan_problems(
+        explain, "SELECT t.customer_id FROM tickets t WHERE t.status = ? AND t.created_at >= ?",
+        ("resolved", "2025-01-01"))
+    explain.close()
+    assert any("created_at is also filtered" in problem for problem in problems)
@@ -0,0 +1,45 @@
+"""search_tickets' query building and bm25 ranking over tickets_fts."""
+import pytest
+
+from mcp_server import _fts_query
+
+
+@pytest.mark.parametrize("text, match, expected", [
+    ("failures", "all", '("failures" OR "fail"*)'),
+    ("string", "all", '("string" OR "str"*)'),
+    ("login", "all", '"login"'),
+    ('payment "OR" NEAR(x)', "all", '"payment" AND "or" AND "near" AND "x"'),
+    ("login refunds", "any", '"login" OR ("refunds" OR "refund"*)'),
+])
+def test_fts_query(text, match, expected):
+    assert _fts_query(text, match) == expected
+
+
+def issue_ids(result):
+    assert result["success"], result
+    return [ticket["id"] for ticket in result["tickets"]]
+
+
+def create(server, issue):
+    return server.create_ticket(1, issue, "low")["ticket"]["id"]
+
+
+def test_inflections_match_through_the_root(server):
+    failed = create(server, "Zephyrquux export failed overnight")
+    failing = create(server, "Zephyrquux export keeps failing")
+    assert set(issue_ids(server.search_tickets("zephyrquux failures"))) == {failed, failing}
+
+
+def test_exact_word_ranks_ahead_of_root_matches(server):
+    stream = create(server, "Qwobble stream dropped")
+    string = create(server, "Qwobble string truncated")
+    strap = create(server, "Qwobble strap snapped")
+    ranked = issue_ids(server.search_tickets("qwobble string"))
+    assert ranked[0] == string
+    assert set(ranked) == {string, stream, strap}
+
+
+def test_uninflected_word_is_not_broadened(server):
+    create(server, "Vexlar login is slow")
+    exact = create(server, "Vexlar log is missing")
+    assert issue_ids(server.search_tickets("vexlar log")) == [exact]
@@ -0,0 +1,66 @@
+"""Row streaming of list_customers and get_customer_history."""
+import json
+import sqlite3
+
+import pytest
+
+from conftest import tool_call
+
+
+def streamed(stream_result):
+    summary, chunks = stream_result
+    assert summary["success"], summary
+    return summary, [row for chunk in chunks for row in chunk]
+
+
+def test_stream_list_customers_has_no_page_cap(server):
+    _, customers = streamed(server.stream_list_customers())
+    with server.get_db_connection() as conn:
+        expected = [row[0] for row in conn.execute("SELECT id FROM customers ORDER BY name, id")]
+    assert len(expected) > server.MAX_PAGE_SIZE
+    assert [customer["id"] for customer in customers] == expected
+    _, limited = streamed(server.stream_list_customers(limit=3))
+    assert [customer["id"] for customer in limited] == expected[:3]
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_stream_rejects_limit_below_one(server, limit):
+    error = {"success": False, "error": "limit must be at least 1"}
+    assert server.stream_list_customers(limit=limit) == (error, None)
+    assert server.stream_customer_history(1, limit=limit) == (error, None)
+
+
+def test_customer_header_and_tickets_share_a_snapshot(server, db_path):
+    summary, chunks = server.stream_customer_history(1)
+    writer = sqlite3.connect(db_path)
+    writer.execute("UPDATE customers SET name = 'Renamed Meanwhile' WHERE id = 1")
+    writer.execute("INSERT INTO tickets (customer_id, issue, priority) VALUES (1, 'Filed meanwhile', 'low')")
+    writer.commit()
+    writer.close()
+    tickets = [ticket for chunk in chunks for ticket in chunk]
+    assert summary["customer"]["name"] != "Renamed Meanwhile"
+    assert "Filed meanwhile" not in [ticket["issue"] for ticket in tickets]
+
+
+def test_stream_customer_history_unknown_customer(server):
+    assert server.stream_customer_history(10 ** 9) == (
+        {"success": False, "error": f"Customer with ID {10 ** 9} not found"}, None)
+
+
+def test_streamed_tools_call_sends_progress_then_summary(server):
+    message = tool_call("list_customers", {"status": "active"})
+    message["params"]["_meta"] = {"progressToken": "t1"}
+    assert server.is_streaming_call(message)
+    events = list(server.stream_tools_call(message))
+    progress, final = events[:-1], events[-1]
+    rows = [row for event in progress for row in json.loads(event["params"]["content"][0]["text"])]
+    summary = json.loads(final["result"]["content"][0]["text"])
+    assert summary["streamed"] and summary["count"] == len(rows) > 0
+    assert all(row["status"] == "active" for row in rows)
+
+
+def test_streamed_tools_call_validates_limit(server):
+    message = tool_call("get_customer_history", {"customer_id": 1, "limit": 0})
+    message["params"]["_meta"] = {"progressToken": "t1"}
+    [response] = list(server.stream_tools_call(message))
+    assert response["error"]["code"] == -32602
@@ -0,0 +1,88 @@
+"""TicketSimilarityIndex scoring, incremental updates and edit tracking."""
+import math
+
+import numpy as np
+
+from ticket_similarity import TicketSimilarityIndex, featurize
+
+ISSUES = [
+    "payment failed at checkout",
+    "cannot login to my account",
+    "refund request for double charge",
+    "password reset email never arrives",
+    "checkout page crashes on payment",
+    "account locked after login attempts",
+]
+
+
+def brute_force(tickets, text):
+    """Cosine similarities computed directly from the TF-IDF definition."""
+    documents = [featurize(issue) for _, issue in tickets]
+    df = {}
+    for features in documents:
+        for feature in features:
+            df[feature] = df.get(feature, 0) + 1
+    idf = {feature: math.log((1 + len(documents)) / (1 + count)) + 1 for feature, count in df.items()}
+    query = featurize(text)
+
+    def vector(features):
+        weights = {feature: tf * idf.get(feature, math.log(1 + len(documents)) + 1)
+                   for feature, tf in features.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {feature: weight / norm for feature, weight in weights.items()}
+
+    query_vector = vector(query)
+    return [sum(weight * query_vector.get(feature, 0.0) for feature, weight in vector(features).items())
+            for features in documents]
+
+
+def test_scores_match_tf_idf_definition():
+    tickets = list(enumerate(ISSUES, start=1))
+    index = TicketSimilarityIndex()
+    index.add(tickets)
+    ids, similarities = index.scores("payment failed during checkout")
+    assert ids.tolist() == [ticket_id for ticket_id, _ in tickets]
+    np.testing.assert_allclose(similarities, brute_force(tickets, "payment failed during checkout"), rtol=1e-5)
+
+
+def test_rows_added_since_reweight_are_scored():
+    index = TicketSimilarityIndex()
+    index.add(list(enumerate(ISSUES * 10, start=1)))
+    weighted = index.stats()["weighted_tickets"]
+    index.add([(1000, "printer toner smudges invoices")])
+    assert index.stats()["weighted_tickets"] == weighted  # below REWEIGHT_GROWTH
+    assert index.top_candidates("toner smudges", 3)[0][0] == 1000
+
+
+def test_edited_issue_replaces_indexed_text():
+    index = TicketSimilarityIndex()
+    index.add(list(enumerate(ISSUES, start=1)))
+    index.edit([(2, "invoice shows the wrong currency"), (3, ISSUES[2])])
+    assert 2 not in [ticket_id for ticket_id, _ in index.top_candidates("cannot login to my account", 10)]
+    assert index.top_candidates("wrong currency on invoice", 1)[0][0] == 2
+    assert index.stats()["edited"] == 1  # ticket 3's text did not change
+
+
+def test_find_similar_resolved_tickets_only_returns_resolved(server):
+    created = server.create_ticket(1, "Scanner jams when feeding duplex pages", "low")["ticket"]
+    unresolved = server.find_similar_resolved_tickets("scanner jams on duplex pages")["tickets"]
+    assert created["id"] not in [ticket["id"] for ticket in unresolved]
+    with server.get_db_connection() as conn:
+        conn.execute("UPDATE tickets SET status = 'resolved' WHERE id = ?", (created["id"],))
+    result = server.find_similar_resolved_tickets("scanner jams on duplex pages")
+    assert result["success"]
+    assert result["tickets"][0]["id"] == created["id"]
+    assert all(ticket["status"] == "resolved" for ticket in result["tickets"])
+
+
+def test_find_similar_resolved_tickets_sees_edited_issue(server):
+    created = server.create_ticket(1, "Scanner jams when feeding duplex pages", "low")["ticket"]
+    with server.get_db_connection() as conn:
+        conn.execute("UPDATE tickets SET status = 'resolved' WHERE id = ?", (created["id"],))
+    assert server.find_similar_resolved_tickets("scanner jams duplex")["tickets"][0]["id"] == created["id"]
+    with server.get_db_connection() as conn:
+        conn.execute("UPDATE tickets SET issue = 'Webhook retries flood the audit log' WHERE id = ?",
+                     (created["id"],))
+    assert server.find_similar_resolved_tickets("webhook retries flood audit log")["tickets"][0]["id"] == created["id"]
+    assert created["id"] not in [ticket["id"] for ticket in
+                                 server.find_similar_resolved_tickets("scanner jams duplex")["tickets"]]
@@ -0,0 +1,75 @@
+"""Group commit: queued writes share a transaction, each under its own savepoint."""
+import json
+import threading
+
+from conftest import tool_call
+from write_queue import WriteQueue
+
+
+def run_concurrently(calls):
+    """Start every call on its own thread and return their results in order."""
+    results = [None] * len(calls)
+
+    def run(index, call):
+        results[index] = call()
+
+    threads = [threading.Thread(target=run, args=item) for item in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def insert_ticket(server, issue):
+    """A queued write; it runs on the writer's connection inside the batch."""
+    def write():
+        with server.get_db_connection() as conn:
+            return conn.execute(
+                "INSERT INTO tickets (customer_id, issue, status, priority) VALUES (1, ?, 'open', 'low')", (issue,)
+            ).lastrowid
+    return write
+
+
+def failing_write(server):
+    def write():
+        insert_ticket(server, "Queued ticket that fails")()
+        raise RuntimeError("write failed")
+    return write
+
+
+def submit_outcome(queue, write):
+    """Submit write, returning its result or the exception it raised."""
+    try:
+        return queue.submit(write)
+    except RuntimeError as e:
+        return e
+
+
+def test_failed_write_rolls_back_only_its_savepoint(server):
+    queue = WriteQueue(server.get_db_connection, max_batch=3, max_delay=5)
+    try:
+        writes = [insert_ticket(server, "Queued ticket 1"), failing_write(server), insert_ticket(server, "Queued ticket 2")]
+        outcomes = run_concurrently([lambda write=write: submit_outcome(queue, write) for write in writes])
+        stats = queue.stats()
+    finally:
+        queue.close()
+    assert isinstance(outcomes[1], RuntimeError)
+    assert all(isinstance(outcome, int) for outcome in outcomes[::2])
+    assert stats["batches"] == 1 and stats["largest_batch"] == 3
+    with server.get_db_connection() as conn:
+        issues = {row[0] for row in conn.execute("SELECT issue FROM tickets WHERE issue LIKE 'Queued ticket%'")}
+    assert issues == {"Queued ticket 1", "Queued ticket 2"}
+
+
+def test_tool_calls_are_committed_in_batches(server):
+    server.configure_write_queue(max_batch=4, max_delay=5)
+    messages = [tool_call("create_ticket", {"customer_id": 1, "issue": f"Batched ticket {index}", "priority": "low"},
+                          request_id=index) for index in range(4)]
+    responses = run_concurrently([lambda message=message: server.process_mcp_message(message)
+                                  for message in messages])
+    tickets = [json.loads(response["result"]["content"][0]["text"])["ticket"] for response in responses]
+    assert sorted(ticket["issue"] for ticket in tickets) == [f"Batched ticket {index}" for index in range(4)]
+    assert server.write_queue.stats()["batches"] == 1
+    history = server.get_customer_history(1, limit=4)["tickets"]
+    assert {ticket["id"] for ticket in history} == {ticket["id"] for ticket in tickets}
@@ -0,0 +1,327 @@
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from itertools import chain
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Size of the hashed feature space (word unigrams and bigrams)
+NUM_FEATURES = 1 << 18
+
+_WORD = re.compile(r'\w+')
+
+
+def featurize(text: str) -> Dict[int, float]:
+    """Hash a text's word unigrams and bigrams to sublinear term frequencies.
+
+    crc32 rather than hash() so feature ids are the same in every process.
+    """
+    words = _WORD.findall(text.lower())
+    terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    counts = Counter(zlib.crc32(term.encode()) % NUM_FEATURES for term in terms)
+    return {feature: 1.0 + math.log(count) for feature, count in counts.items()}
+
+
+# Growth in indexed rows after which IDF and every stored weight are recomputed
+# and the inverted index is rebuilt
+REWEIGHT_GROWTH = 1.1
+
+
+class TicketSimilarityIndex:
+    """Incrementally updated TF-IDF index over ticket issue text.
+
+    Rows live in a sparse matrix kept as CSR arrays (one row per ticket, in id
+    order) holding each ticket's term frequencies and its unit-length TF-IDF
+    weights. Document frequencies are counted as rows are added; new rows are
+    weighted with the IDF vector cached at the last reweight. Once the index
+    has grown by REWEIGHT_GROWTH, IDF and all weights are recomputed and an
+    inverted copy (CSC: feature -> rows) is rebuilt, so adding a ticket is
+    amortized O(its terms). A query reads the postings of its own features
+    from the inverted copy, plus the rows added since the last reweight, and
+    nothing is copied or renormalized per query.
+
+    Tickets whose issue is edited after indexing are found through change_log:
+    the old row is zeroed and the new text is kept in a small overlay that is
+    scored alongside the matrix.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held for a whole sync, so concurrent callers wait for the one running
+        # instead of each featurizing the same tickets
+        self._sync_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        """Drop every indexed ticket."""
+        self._ids = np.zeros(1024, dtype=np.int64)
+        self._digests = np.zeros(1024, dtype=np.uint32)
+        self._indptr = np.zeros(1025, dtype=np.int64)
+        self._indices = np.zeros(16384, dtype=np.int32)
+        self._tf = np.zeros(16384, dtype=np.float32)
+        self._weights = np.zeros(16384, dtype=np.float32)
+        self._df = np.zeros(NUM_FEATURES, dtype=np.int32)
+        self._idf = np.ones(NUM_FEATURES, dtype=np.float32)
+        self._rows = 0
+        self._nnz = 0
+        self._max_id = 0
+        self._weighted_rows = 0
+        # Inverted copy of rows 0.._weighted_rows-1: postings of feature f are
+        # _post_rows/_post_weights[_post_ptr[f]:_post_ptr[f + 1]]
+        self._post_ptr = np.zeros(NUM_FEATURES + 1, dtype=np.int64)
+        self._post_rows = np.zeros(0, dtype=np.int32)
+        self._post_weights = np.zeros(0, dtype=np.float32)
+        # Rows zeroed by edits since the inverted copy was built
+        self._dead_rows: List[int] = []
+        # ticket_id -> (issue crc32, feature ids, term frequencies, weights)
+        self._edited: Dict[int, Tuple[int, np.ndarray, np.ndarray, np.ndarray]] = {}
+        # Last change_log entry checked for edited issues; None before the first sync
+        self._change_seq = None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def _reserve(self, rows: int, nnz: int):
+        """Grow the backing arrays geometrically. Caller holds the lock."""
+        if self._rows + rows > len(self._ids):
+            size = max(len(self._ids) * 2, self._rows + rows)
+            self._ids = np.resize(self._ids, size)
+            self._digests = np.resize(self._digests, size)
+            self._indptr = np.resize(self._indptr, size + 1)
+        if self._nnz + nnz > len(self._indices):
+            size = max(len(self._indices) * 2, self._nnz + nnz)
+            self._indices = np.resize(self._indices, size)
+            self._tf = np.resize(self._tf, size)
+            self._weights = np.resize(self._weights, size)
+
+    def _weigh(self, first: int, last: int):
+        """Store unit-length TF-IDF weights for rows first..last-1. Caller holds the lock."""
+        if first == last:
+            return
+        indptr = self._indptr[first:last + 1]
+        start, end = indptr[0], indptr[-1]
+        weights = self._tf[start:end] * self._idf[self._indices[start:end]]
+        norms = np.sqrt(np.add.reduceat(weights * weights, indptr[:-1] - start))
+        norms[norms == 0] = 1.0  # rows zeroed by an edit
+        weights /= np.repeat(norms, np.diff(indptr))
+        self._weights[start:end] = weights
+
+    def _overlay_entry(self, digest: int, features: Dict[int, float]) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """Build an overlay entry weighted with the cached IDF. Caller holds the lock."""
+        indices = np.fromiter(features.keys(), dtype=np.int32, count=len(features))
+        tf = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+        weights = tf * self._idf[indices]
+        norm = np.linalg.norm(weights)
+        return digest, indices, tf, weights / norm if norm else weights
+
+    def _reweight(self):
+        """Recompute IDF and every row's weights and rebuild the inverted copy. Caller holds the lock.
+
+        Everything goes into new arrays, so a query running on the old ones is
+        unaffected.
+        """
+        rows, nnz = self._rows, self._nnz
+        self._idf = (np.log((1.0 + rows) / (1.0 + self._df)) + 1.0).astype(np.float32)
+        self._weights = np.zeros_like(self._weights)
+        self._weigh(0, rows)
+        indices = self._indices[:nnz]
+        order = np.argsort(indices, kind='stable')
+        entry_rows = np.repeat(np.arange(rows, dtype=np.int32), np.diff(self._indptr[:rows + 1]))
+        self._post_rows = entry_rows[order]
+        self._post_weights = self._weights[:nnz][order]
+        post_ptr = np.zeros(NUM_FEATURES + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=NUM_FEATURES), out=post_ptr[1:])
+        self._post_ptr = post_ptr
+        self._dead_rows = []
+        for ticket_id, (digest, indices, tf, _) in self._edited.items():
+            self._edited[ticket_id] = self._overlay_entry(digest, dict(zip(indices.tolist(), tf.tolist())))
+        self._weighted_rows = self._rows
+
+    def add(self, tickets: List[Tuple[int, str]], reweight: bool = True):
+        """Append (ticket_id, issue) pairs in id order; ids already indexed are skipped.
+
+        With reweight=False the growth check is left to the caller (see
+        sync), so a bulk load reweights once at the end.
+        """
+        rows = [(ticket_id, zlib.crc32(issue.encode()), featurize(issue)) for ticket_id, issue in tickets]
+        with self._lock:
+            # Skip ids already added by a concurrent sync, and texts with
+            # nothing to match on, e.g. punctuation only
+            rows = [row for row in rows if row[0] > self._max_id]
+            if not rows:
+                return
+            self._max_id = rows[-1][0]
+            rows = [row for row in rows if row[2]]
+            counts = np.fromiter((len(features) for _, _, features in rows), dtype=np.int64, count=len(rows))
+            total = int(counts.sum())
+            self._reserve(len(rows), total)
+            first, start = self._rows, self._nnz
+            last, end = first + len(rows), start + total
+            self._indices[start:end] = np.fromiter(
+                chain.from_iterable(features.keys() for _, _, features in rows), dtype=np.int32, count=total)
+            self._tf[start:end] = np.fromiter(
+                chain.from_iterable(features.values() for _, _, features in rows), dtype=np.float32, count=total)
+            np.add.at(self._df, self._indices[start:end], 1)
+            self._ids[first:last] = [ticket_id for ticket_id, _, _ in rows]
+            self._digests[first:last] = [digest for _, digest, _ in rows]
+            self._indptr[first + 1:last + 1] = start + np.cumsum(counts)
+            self._rows, self._nnz = last, end
+            self._weigh(first, self._rows)
+            if reweight:
+                self._reweight_if_grown()
+
+    def _reweight_if_grown(self):
+        """Reweight once the index has grown by REWEIGHT_GROWTH. Caller holds the lock."""
+        if self._rows > self._weighted_rows * REWEIGHT_GROWTH:
+            self._reweight()
+
+    def edit(self, tickets: List[Tuple[int, str]]):
+        """Re-index (ticket_id, issue) pairs whose issue may have changed.
+
+        Tickets not indexed yet are skipped (sync adds them with their current
+        text), as are tickets whose text is unchanged, e.g. status updates.
+        """
+        with self._lock:
+            for ticket_id, issue in tickets:
+                if ticket_id > self._max_id:
+                    continue
+                digest = zlib.crc32(issue.encode())
+                if ticket_id in self._edited:
+                    previous = self._edited[ticket_id]
+                    if previous[0] == digest:
+                        continue
+                    self._df[previous[1]] -= 1
+                else:
+                    row = int(np.searchsorted(self._ids[:self._rows], ticket_id))
+                    if row < self._rows and self._ids[row] == ticket_id:
+                        if self._digests[row] == digest:
+                            continue
+                        start, end = self._indptr[row], self._indptr[row + 1]
+                        self._df[self._indices[start:end]] -= 1
+                        self._tf[start:end] = 0
+                        self._weights[start:end] = 0
+                        self._dead_rows.append(row)
+                features = featurize(issue)
+                entry = self._overlay_entry(digest, features)
+                self._df[entry[1]] += 1
+                self._edited[ticket_id] = entry
+
+    def sync(self, connection: Callable[[], Any], chunk_size: int = 5000):
+        """Index tickets inserted, and re-index issues edited, since the last sync.
+
+        Edits are read from change_log. If entries after the last one checked
+        were already trimmed from it, edits may have been missed and the
+        index is rebuilt from scratch.
+
+        Args:
+            connection: Zero-argument callable returning a connection context
+                manager (e.g. mcp_server.get_db_connection); a connection is
+                only borrowed once any sync already running has finished
+            chunk_size: Tickets read and featurized per query
+        """
+        with self._sync_lock, connection() as conn:
+            oldest, latest = conn.execute(
+                "SELECT (SELECT MIN(seq) FROM change_log), (SELECT MAX(seq) FROM change_log)"
+            ).fetchone()
+            latest = latest or 0
+            if self._change_seq is not None and oldest is not None and oldest > self._change_seq + 1:
+                with self._lock:
+                    self._clear()
+            if self._change_seq is None:
+                # Indexing reads current text, so only later edits matter
+                self._change_seq = latest
+            while True:
+                rows = conn.execute(
+                    'SELECT id, issue FROM tickets WHERE id > ? ORDER BY id LIMIT ?',
+                    (self._max_id, chunk_size),
+                ).fetchall()
+                if not rows:
+                    break
+                self.add([(row[0], row[1]) for row in rows], reweight=False)
+            with self._lock:
+                self._reweight_if_grown()
+            if latest > self._change_seq:
+                edits = conn.execute(
+                    "SELECT row_id, json_extract(data, '$.issue') FROM change_log "
+                    "WHERE seq > ? AND seq <= ? AND table_name = 'tickets' AND operation = 'update' ORDER BY seq",
+                    (self._change_seq, latest),
+                ).fetchall()
+                self.edit([(row[0], row[1] or '') for row in edits])
+                self._change_seq = latest
+
+    def scores(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ticket_ids, cosine similarities) for every indexed ticket."""
+        query = featurize(text)
+        with self._lock:
+            # Views, not copies: rows are only appended past nnz, and a
+            # reweight swaps in new arrays
+            rows, nnz, base = self._rows, self._nnz, self._weighted_rows
+            ids, indptr = self._ids[:rows], self._indptr[:rows]
+            indices, weights, idf = self._indices[:nnz], self._weights[:nnz], self._idf
+            post_ptr, post_rows, post_weights = self._post_ptr, self._post_rows, self._post_weights
+            dead_rows = list(self._dead_rows)
+            edited = list(self._edited.items())
+        if not query or not (rows or edited):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        features = np.fromiter(query.keys(), dtype=np.int64, count=len(query))
+        query_weights = np.fromiter(query.values(), dtype=np.float32, count=len(query)) * idf[features]
+        norm = np.linalg.norm(query_weights)
+        if not norm:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query_weights /= norm
+
+        # Stored rows are unit length, so summed products are cosine similarities
+        similarities = np.zeros(rows, dtype=np.float32)
+        if base:
+            postings = [(post_ptr[feature], post_ptr[feature + 1]) for feature in features]
+            matched = np.concatenate([post_rows[start:end] for start, end in postings])
+            products = np.concatenate([post_weights[start:end] * weight
+                                       for (start, end), weight in zip(postings, query_weights)])
+            similarities[:base] = np.bincount(matched, weights=products, minlength=base)
+        if rows > base:
+            query_vector = np.zeros(NUM_FEATURES, dtype=np.float32)
+            query_vector[features] = query_weights
+            tail = indptr[base:]
+            start = tail[0]
+            products = query_vector[indices[start:]]
+            products *= weights[start:]
+            # Every stored row has at least one entry, so reduceat segments are non-empty
+            similarities[base:] = np.add.reduceat(products, tail - start)
+        if dead_rows:
+            similarities[dead_rows] = 0
+        if edited:
+            overlay = np.zeros(NUM_FEATURES, dtype=np.float32)
+            overlay[features] = query_weights
+            ids = np.concatenate([ids, np.array([ticket_id for ticket_id, _ in edited], dtype=np.int64)])
+            similarities = np.concatenate([similarities, np.array(
+                [float(entry[3] @ overlay[entry[1]]) for _, entry in edited], dtype=np.float32)])
+        return ids, similarities
+
+    def top_candidates(self, text: str, count: int) -> List[Tuple[int, float]]:
+        """Return up to count (ticket_id, similarity) pairs with similarity > 0, best first."""
+        ids, similarities = self.scores(text)
+        matching = np.flatnonzero(similarities > 0)
+        if len(matching) > count:
+            best = np.argpartition(-similarities[matching], count - 1)[:count]
+            matching = matching[best]
+        order = matching[np.argsort(-similarities[matching], kind='stable')]
+        return [(int(ids[i]), float(similarities[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size counters."""
+        with self._lock:
+            return {
+                "tickets": self._rows,
+                "nonzeros": self._nnz,
+                "max_ticket_id": self._max_id,
+                "edited": len(self._edited),
+                "weighted_tickets": self._weighted_rows,
+                "memory_bytes": int(self._ids.nbytes + self._digests.nbytes + self._indptr.nbytes
+                                    + self._indices.nbytes + self._tf.nbytes + self._weights.nbytes
+                                    + self._df.nbytes + self._idf.nbytes + self._post_ptr.nbytes
+                                    + self._post_rows.nbytes + self._post_weights.nbytes),
+            }
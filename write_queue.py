@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+from db_pool import transaction
+
+# A queued write: the callable, its positional arguments and the caller's future
+_Write = Tuple[Callable[..., Any], Tuple[Any, ...], Future]
+
+
+class WriteQueue:
+    """Group commit: a single writer thread runs queued writes in shared transactions.
+
+    Callers block in submit() while the writer collects up to max_batch
+    pending writes, waiting at most max_delay seconds after the first one,
+    and runs them in one BEGIN IMMEDIATE transaction with a savepoint per
+    write. One commit (and one WAL sync) then covers the whole batch, and the
+    writer never contends with other connections in this process for the
+    write lock. Each caller gets back its own write's return value once the
+    batch has committed.
+    """
+
+    def __init__(self, connection: Callable[[], Any], max_batch: int = 64, max_delay: float = 0.001):
+        """Start the writer thread.
+
+        Args:
+            connection: Zero-argument callable returning a connection context
+                manager (e.g. mcp_server.get_db_connection)
+            max_batch: Most writes committed in one transaction
+            max_delay: Seconds to wait for more writes after the first one
+                arrives; 0 commits whatever is already queued
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self._connection = connection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._writes = 0
+        self._largest_batch = 0
+        self._failed_batches = 0
+
+        self._thread = threading.Thread(target=self._run, name="mcp-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) in the next batch and return its result after commit."""
+        if not self._thread.is_alive():
+            raise RuntimeError("Write queue is closed")
+        future: Future = Future()
+        self._queue.put((fn, args, future))
+        return future.result()
+
+    def _collect(self, first: _Write) -> Tuple[List[_Write], bool]:
+        """Gather a batch starting with first; also report whether close() was seen."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        """Writer thread: commit batches until close()."""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, closing = self._collect(first)
+            self._commit(batch)
+            if closing:
+                return
+
+    def _commit(self, batch: List[_Write]):
+        """Run one batch in a single transaction and resolve its callers."""
+        outcomes = []
+        try:
+            with self._connection() as conn, transaction(conn):
+                for fn, args, future in batch:
+                    # A savepoint per write, so one that raises is rolled back
+                    # without taking the rest of the batch with it
+                    try:
+                        with transaction(conn):
+                            outcomes.append((future, fn(*args), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            with self._lock:
+                self._failed_batches += 1
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._writes += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Commit the writes already queued, then stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch counters."""
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_delay_ms": self.max_delay * 1000,
+                "pending": self._queue.qsize(),
+                "batches": self._batches,
+                "writes": self._writes,
+                "avg_batch_size": round(self._writes / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "failed_batches": self._failed_batches,
+            }